@@ -0,0 +1,31 @@
+"""add media upload metadata
+
+Revision ID: a3d9e6c1f5b2
+Revises: f2c8d4b6a017
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a3d9e6c1f5b2"
+down_revision = "f2c8d4b6a017"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("media", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("content_type", sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column("size_bytes", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("sha256", sa.String(length=64), nullable=True))
+        batch_op.create_index("ix_media_sha256", ["sha256"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("media", schema=None) as batch_op:
+        batch_op.drop_index("ix_media_sha256")
+        batch_op.drop_column("sha256")
+        batch_op.drop_column("size_bytes")
+        batch_op.drop_column("content_type")
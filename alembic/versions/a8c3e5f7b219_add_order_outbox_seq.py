@@ -0,0 +1,33 @@
+"""add per-order outbox sequence counter
+
+Revision ID: a8c3e5f7b219
+Revises: e4b7d1c9a362
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a8c3e5f7b219"
+down_revision = "e4b7d1c9a362"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ("orders", "orders_archive"):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column("outbox_seq", sa.Integer(), nullable=False, server_default="0"))
+    # licznik startuje od ostatniego seq, który już jest w outboxie
+    for table in ("orders", "orders_archive"):
+        op.execute(
+            f"UPDATE {table} SET outbox_seq = COALESCE("
+            f"(SELECT MAX(seq) FROM outbox_events WHERE outbox_events.order_id = {table}.id), 0)"
+        )
+
+
+def downgrade() -> None:
+    for table in ("orders_archive", "orders"):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column("outbox_seq")
@@ -0,0 +1,44 @@
+"""never reuse order/item/payment attempt ids on SQLite
+
+Revision ID: b4d7e2a9c613
+Revises: a8c3e5f7b219
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b4d7e2a9c613"
+down_revision = "a8c3e5f7b219"
+branch_labels = None
+depends_on = None
+
+# (gorąca tabela, tabela archiwum) - id z obu muszą być zajęte w sqlite_sequence
+TABLES = (
+    ("orders", "orders_archive"),
+    ("order_items", "order_items_archive"),
+    ("payment_attempts", "payment_attempts_archive"),
+)
+
+
+def upgrade() -> None:
+    # INTEGER PRIMARY KEY bez AUTOINCREMENT oddaje max(id)+1, więc id zarchiwizowanego
+    # najnowszego zamówienia wracało do obiegu. Inne bazy mają sekwencje - nic do zrobienia.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table, archive in TABLES:
+        with op.batch_alter_table(table, recreate="always", table_kwargs={"sqlite_autoincrement": True}):
+            pass
+        op.execute(f"DELETE FROM sqlite_sequence WHERE name = '{table}'")
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', MAX("
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0), COALESCE((SELECT MAX(id) FROM {archive}), 0))"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table, _ in reversed(TABLES):
+        with op.batch_alter_table(table, recreate="always", table_kwargs={"sqlite_autoincrement": False}):
+            pass
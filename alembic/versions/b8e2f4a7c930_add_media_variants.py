@@ -0,0 +1,36 @@
+"""add media variants
+
+Revision ID: b8e2f4a7c930
+Revises: a3d9e6c1f5b2
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b8e2f4a7c930"
+down_revision = "a3d9e6c1f5b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "media_variants",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("media_id", sa.Integer(), sa.ForeignKey("media.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("format", sa.String(length=16), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("url", sa.String(length=512), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("media_id", "width", "format", name="uq_media_variant"),
+    )
+    op.create_index("ix_media_variants_media_id", "media_variants", ["media_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_variants_media_id", table_name="media_variants")
+    op.drop_table("media_variants")
@@ -0,0 +1,30 @@
+"""add filename indexes used by the media GC
+
+Revision ID: c2e9a5d8f147
+Revises: b4d7e2a9c613
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c2e9a5d8f147"
+down_revision = "b4d7e2a9c613"
+branch_labels = None
+depends_on = None
+
+# (nazwa, tabela, kolumny) - app/db/media_gc.py sprawdza paczki plików przez filename IN (...)
+INDEXES = [
+    ("ix_media_filename", "media", ["filename"]),
+    ("ix_media_variants_filename", "media_variants", ["filename"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,46 @@
+"""add order status counters
+
+Revision ID: c41e7a9b2d10
+Revises: a7f1c9d5e4b7
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c41e7a9b2d10"
+down_revision = "a7f1c9d5e4b7"
+branch_labels = None
+depends_on = None
+
+STATUSES = ("NEW", "IN_PREPARATION", "PAID", "SHIPPED", "CANCELED")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_status_counters",
+        sa.Column("status", sa.String(length=32), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # seed every status, then backfill from existing orders
+    counters = sa.table("order_status_counters", sa.column("status", sa.String), sa.column("count", sa.Integer))
+    op.bulk_insert(counters, [{"status": s, "count": 0} for s in STATUSES])
+    op.execute(
+        """
+        UPDATE order_status_counters
+        SET count = (SELECT COUNT(*) FROM orders WHERE orders.status = order_status_counters.status)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO order_status_counters (status, count)
+        SELECT status, COUNT(*) FROM orders
+        WHERE status NOT IN ('NEW', 'IN_PREPARATION', 'PAID', 'SHIPPED', 'CANCELED')
+        GROUP BY status
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("order_status_counters")
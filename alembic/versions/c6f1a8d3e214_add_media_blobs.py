@@ -0,0 +1,32 @@
+"""add media blobs
+
+Revision ID: c6f1a8d3e214
+Revises: b8e2f4a7c930
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c6f1a8d3e214"
+down_revision = "b8e2f4a7c930"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Istniejące pliki przenosi na adresy <sha256>.<ext>: python -m app.db.media_blobs
+    op.create_table(
+        "media_blobs",
+        sa.Column("sha256", sa.String(length=64), primary_key=True),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("content_type", sa.String(length=64), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("media_blobs")
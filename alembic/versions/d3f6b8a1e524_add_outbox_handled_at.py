@@ -0,0 +1,29 @@
+"""track local handler processing of outbox events
+
+Revision ID: d3f6b8a1e524
+Revises: c2e9a5d8f147
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d3f6b8a1e524"
+down_revision = "c2e9a5d8f147"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("outbox_events", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("handled_at", sa.DateTime(timezone=True), nullable=True))
+    # starsze zdarzenia obsłużyły już BackgroundTasks - nie odpalamy handlerów drugi raz
+    op.execute("UPDATE outbox_events SET handled_at = created_at")
+    op.create_index("ix_outbox_events_unhandled", "outbox_events", ["handled_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_unhandled", table_name="outbox_events")
+    with op.batch_alter_table("outbox_events", schema=None) as batch_op:
+        batch_op.drop_column("handled_at")
@@ -0,0 +1,76 @@
+"""add order archive tables
+
+Revision ID: d5a2e8f1c306
+Revises: c41e7a9b2d10
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d5a2e8f1c306"
+down_revision = "c41e7a9b2d10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orders_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("cart_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=128), nullable=True),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("full_name", sa.String(length=255), nullable=False),
+        sa.Column("buyer_first_name", sa.String(length=60), nullable=False),
+        sa.Column("buyer_last_name", sa.String(length=80), nullable=False),
+        sa.Column("buyer_phone", sa.String(length=20), nullable=False),
+        sa.Column("buyer_email", sa.String(length=255), nullable=False),
+        sa.Column("shipping_address_line1", sa.String(length=120), nullable=False),
+        sa.Column("shipping_address_line2", sa.String(length=120), nullable=True),
+        sa.Column("shipping_city", sa.String(length=80), nullable=False),
+        sa.Column("shipping_postal_code", sa.String(length=10), nullable=False),
+        sa.Column("total_pln", sa.Integer(), nullable=False),
+        sa.Column("shipping_method", sa.Enum("INPOST_LOCKER", "COURIER", "PICKUP", name="shippingmethod", create_type=False), nullable=False),
+        sa.Column("shipping_cost_pln", sa.Integer(), nullable=False),
+        sa.Column("shipping_country", sa.String(length=2), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_orders_archive_created_at", "orders_archive", ["created_at"])
+    op.create_index("ix_orders_archive_email", "orders_archive", ["email"])
+
+    op.create_table(
+        "order_items_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders_archive.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("unit_price_pln", sa.Integer(), nullable=False),
+        sa.Column("line_total_pln", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_order_items_archive_order_id", "order_items_archive", ["order_id"])
+
+    op.create_table(
+        "payment_attempts_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders_archive.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("provider", sa.String(length=50), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=128), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_payment_attempts_archive_order_id", "payment_attempts_archive", ["order_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_payment_attempts_archive_order_id", table_name="payment_attempts_archive")
+    op.drop_table("payment_attempts_archive")
+    op.drop_index("ix_order_items_archive_order_id", table_name="order_items_archive")
+    op.drop_table("order_items_archive")
+    op.drop_index("ix_orders_archive_email", table_name="orders_archive")
+    op.drop_index("ix_orders_archive_created_at", table_name="orders_archive")
+    op.drop_table("orders_archive")
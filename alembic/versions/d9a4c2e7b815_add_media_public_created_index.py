@@ -0,0 +1,22 @@
+"""add media (is_public, created_at) index
+
+Revision ID: d9a4c2e7b815
+Revises: c6f1a8d3e214
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d9a4c2e7b815"
+down_revision = "c6f1a8d3e214"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_media_public_created", "media", ["is_public", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_media_public_created", table_name="media")
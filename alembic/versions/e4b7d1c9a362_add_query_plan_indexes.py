@@ -0,0 +1,34 @@
+"""add indexes for order history, admin lists, archiving and payment attempts
+
+Revision ID: e4b7d1c9a362
+Revises: d9a4c2e7b815
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4b7d1c9a362"
+down_revision = "d9a4c2e7b815"
+branch_labels = None
+depends_on = None
+
+# (nazwa, tabela, kolumny) - media (is_public, created_at) jest już w d9a4c2e7b815
+INDEXES = [
+    ("ix_orders_email_created", "orders", ["email", "created_at"]),
+    ("ix_orders_created_at", "orders", ["created_at"]),
+    ("ix_orders_status_created", "orders", ["status", "created_at"]),
+    ("ix_payment_attempts_order_provider", "payment_attempts", ["order_id", "provider"]),
+    ("ix_media_created_at", "media", ["created_at"]),
+    ("ix_media_url", "media", ["url"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
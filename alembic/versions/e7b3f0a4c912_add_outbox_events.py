@@ -0,0 +1,37 @@
+"""add outbox events
+
+Revision ID: e7b3f0a4c912
+Revises: d5a2e8f1c306
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e7b3f0a4c912"
+down_revision = "d5a2e8f1c306"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(length=64), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("delivered_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.UniqueConstraint("order_id", "seq", name="uq_outbox_order_seq"),
+    )
+    op.create_index("ix_outbox_events_pending", "outbox_events", ["delivered_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_pending", table_name="outbox_events")
+    op.drop_table("outbox_events")
@@ -0,0 +1,38 @@
+"""add payment inbox
+
+Revision ID: f2c8d4b6a017
+Revises: e7b3f0a4c912
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f2c8d4b6a017"
+down_revision = "e7b3f0a4c912"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "payment_inbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("provider", sa.String(length=50), nullable=False),
+        sa.Column("event_id", sa.String(length=128), nullable=False),
+        sa.Column("event_type", sa.String(length=64), nullable=False),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("result", sa.String(length=32), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.UniqueConstraint("provider", "event_id", name="uq_payment_inbox_provider_event"),
+    )
+    op.create_index("ix_payment_inbox_pending", "payment_inbox", ["processed_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_payment_inbox_pending", table_name="payment_inbox")
+    op.drop_table("payment_inbox")
@@ -1,14 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import select, desc
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 from app.db.deps import get_db
 from app.api.deps import require_admin
-from app.db.models import ProductDB, OrderDB, OrderStatus
-from app.schemas.admin import ProductCreate, ProductUpdate, OrderStatusUpdate, AdminOrderOut
+from app.db.models import ProductDB, OrderDB, OrderArchiveDB, OrderStatus, UserDB
+from app.schemas.admin import (
+    ProductCreate,
+    ProductUpdate,
+    OrderStatusUpdate,
+    AdminOrderOut,
+    OrderStatusCountsOut,
+    OrderCountersReconcileOut,
+    AdminUserUpdate,
+    AdminUserOut,
+)
 from app.schemas.product import Product as ProductOut
 from app.schemas.order import OrderOut
 from app.api.orders import _order_out
+from app.core.config import settings
+from app.core.rate_limit import login_throttle
+from app.db.database import async_engine, async_read_engine, engine, read_engine
+from app.db.pool_metrics import pool_stats
+from app.db.slow_queries import slow_query_log
+from app.db.order_counters import bump_order_status, read_order_counters, reconcile_order_counters
+from app.db.order_archive import archive_orders, find_order, list_recent_orders
+from app.db.outbox import add_order_event, ORDER_STATUS_CHANGED
 
 router = APIRouter(prefix="/admin/api", tags=["admin"])
 
@@ -25,7 +43,6 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db), _=Depe
     p = ProductDB(**payload.model_dump())
     db.add(p)
     db.commit()
-    db.refresh(p)
     return p
 
 @router.patch("/products/{product_id}", response_model=ProductOut)
@@ -39,7 +56,6 @@ def update_product(product_id: int, payload: ProductUpdate, db: Session = Depend
         setattr(p, k, v)
 
     db.commit()
-    db.refresh(p)
     return p
 
 @router.delete("/products/{product_id}")
@@ -48,30 +64,61 @@ def delete_product(product_id: int, db: Session = Depends(get_db), _=Depends(req
     if not p:
         raise HTTPException(404, "Product not found")
     
-    # Soft delete (dezaktywacja) jest bezpieczniejsza, ale tutaj robimy hard delete zgodnie z prośbą
-    # Uwaga: jeśli produkt jest w zamówieniach, to może naruszyć FK (chyba że masz cascade)
-    # Lepiej: p.is_active = False
+    # Soft delete (dezaktywacja) jest bezpieczniejsza, ale tutaj robimy hard delete zgodnie z prośbą.
+    # Produkt z koszyków/zamówień blokuje FK (sqlite_foreign_keys, PostgreSQL) -> 409 zamiast 500
     db.delete(p)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "Product is referenced by carts or orders; deactivate it instead")
     return {"ok": True}
 
+# --- USERS ---
+
+@router.patch("/users/{user_id}", response_model=AdminUserOut)
+def update_user(user_id: int, payload: AdminUserUpdate, db: Session = Depends(get_db), _=Depends(require_admin)):
+    # Dezaktywacja / nadanie admina - cache zalogowanych userów unieważnia się przy commicie
+    user = db.get(UserDB, user_id)
+    if not user:
+        raise HTTPException(404, "User not found")
+
+    for k, v in payload.model_dump(exclude_unset=True).items():
+        setattr(user, k, v)
+
+    db.commit()
+    return user
+
 # --- ORDERS ---
 
 @router.get("/orders", response_model=list[AdminOrderOut])
 def list_orders(db: Session = Depends(get_db), _=Depends(require_admin)):
-    stmt = (
-        select(OrderDB)
-        .options(selectinload(OrderDB.items))
-        .order_by(desc(OrderDB.created_at))
-        .limit(100)
-    )
-    orders = db.execute(stmt).scalars().all()
-    return orders
+    return list_recent_orders(db, limit=100)
+
+@router.get("/orders/stats", response_model=OrderStatusCountsOut)
+def order_stats(db: Session = Depends(get_db), _=Depends(require_admin)):
+    # Czytamy liczniki zamiast COUNT(*) GROUP BY po całej tabeli orders
+    counts = read_order_counters(db)
+    return OrderStatusCountsOut(counts=counts, total=sum(counts.values()))
+
+@router.post("/orders/stats/reconcile", response_model=OrderCountersReconcileOut)
+def reconcile_order_stats(db: Session = Depends(get_db), _=Depends(require_admin)):
+    drift = reconcile_order_counters(db)
+    counts = read_order_counters(db)
+    return OrderCountersReconcileOut(counts=counts, total=sum(counts.values()), drift=drift)
+
+@router.post("/orders/archive")
+def run_order_archive(
+    older_than_days: int | None = None,
+    db: Session = Depends(get_db),
+    _=Depends(require_admin),
+):
+    archived = archive_orders(db, older_than_days=older_than_days)
+    return {"ok": True, "archived": archived}
 
 @router.get("/orders/{order_id}", response_model=OrderOut)
 def get_order(order_id: int, db: Session = Depends(get_db), _=Depends(require_admin)):
-    stmt = select(OrderDB).where(OrderDB.id == order_id).options(selectinload(OrderDB.items))
-    order = db.execute(stmt).scalar_one_or_none()
+    order = find_order(db, order_id)
     if not order:
         raise HTTPException(404, "Order not found")
     return _order_out(order)
@@ -91,8 +138,46 @@ def update_order_status(
 
     order = db.get(OrderDB, order_id)
     if not order:
+        if db.get(OrderArchiveDB, order_id):
+            raise HTTPException(409, "Order is archived")
         raise HTTPException(404, "Order not found")
 
+    old_status = order.status
+    bump_order_status(db, old_status, new_status)
     order.status = new_status
+    if old_status != new_status:
+        add_order_event(db, order, ORDER_STATUS_CHANGED, previous_status=str(old_status))
     db.commit()
     return {"ok": True, "id": order.id, "status": order.status}
+
+# --- METRICS ---
+
+@router.get("/metrics/login-throttle")
+def login_throttle_metrics(_=Depends(require_admin)):
+    return login_throttle.metrics()
+
+
+@router.get("/metrics/db-pool")
+def db_pool_metrics(_=Depends(require_admin)):
+    # zajętość pul i histogram czasu czekania na połączenie (sync + async silnik, osobno pule odczytu)
+    out = {"sync": pool_stats(engine.pool), "async": pool_stats(async_engine.sync_engine.pool)}
+    if read_engine is not engine:
+        out["read"] = pool_stats(read_engine.pool)
+        out["async_read"] = pool_stats(async_read_engine.sync_engine.pool)
+    return out
+
+
+@router.get("/metrics/slow-queries")
+def slow_query_metrics(limit: int = 50, _=Depends(require_admin)):
+    # fingerprinty SQL posortowane po łącznym czasie; puste, gdy slow_query_log_enabled=False
+    return {
+        "enabled": settings.slow_query_log_enabled,
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.dump(limit),
+    }
+
+
+@router.post("/metrics/slow-queries/reset")
+def reset_slow_query_metrics(_=Depends(require_admin)):
+    slow_query_log.reset()
+    return {"ok": True}
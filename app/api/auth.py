@@ -1,44 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import select
 
 from app.db.deps import get_db
 from app.db.models import UserDB
+from app.db.queries import user_by_email
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenOut, UserOut
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import create_access_token, password_needs_rehash
+from app.core.password_pool import password_hasher, PasswordHasherBusy
+from app.core.rate_limit import client_ip, login_throttle
 from app.api.deps import get_current_user
+from app.core.user_cache import CurrentUser
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# bcrypt liczy się w puli procesów (password_hasher), a handlery są async,
+# więc logowanie nie zajmuje wątków potrzebnych katalogowi i koszykowi.
+
 
 @router.post("/register", response_model=UserOut, status_code=201)
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
-    exists = db.execute(select(UserDB).where(UserDB.email == payload.email)).scalar_one_or_none()
+async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
+    exists = await run_in_threadpool(_get_user_by_email, db, payload.email)
     if exists:
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    user = UserDB(
-        email=payload.email,
-        password_hash=hash_password(payload.password),
-        full_name=payload.full_name,
-        is_active=True,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    password_hash = await _hasher_call(password_hasher.hash(payload.password))
+    return await run_in_threadpool(_create_user, db, payload, password_hash)
 
 
 @router.post("/login", response_model=TokenOut)
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
-    user = db.execute(select(UserDB).where(UserDB.email == payload.email)).scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginRequest, request: Request, db: Session = Depends(get_db)):
+    # Limit prób sprawdzamy przed jakimkolwiek zapytaniem i bcryptem
+    ip = client_ip(request.client.host if request.client else None, request.headers.get("x-forwarded-for"))
+    if login_throttle.blocking:
+        retry_after = await run_in_threadpool(login_throttle.check, ip, payload.email)
+    else:
+        retry_after = login_throttle.check(ip, payload.email)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    user = await run_in_threadpool(_get_user_by_email, db, payload.email)
+    if not user or not await _hasher_call(password_hasher.verify(payload.password, user.password_hash)):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # zmiana settings.bcrypt_rounds -> przeliczamy hash przy najbliższym udanym logowaniu
+    if password_needs_rehash(user.password_hash, password_hasher.rounds):
+        try:
+            new_hash = await password_hasher.hash(payload.password)
+        except PasswordHasherBusy:
+            pass  # spróbujemy przy następnym logowaniu
+        else:
+            await run_in_threadpool(_update_password_hash, db, user, new_hash)
+
     token = create_access_token(sub=user.email)
     return TokenOut(access_token=token)
 
 
 @router.get("/me", response_model=UserOut)
-def get_me(current_user: UserDB = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+def get_me(current_user: CurrentUser = Depends(get_current_user)):
+    return current_user
+
+
+async def _hasher_call(coro):
+    try:
+        return await coro
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+
+
+def _get_user_by_email(db: Session, email: str) -> UserDB | None:
+    return db.execute(user_by_email(email)).scalar_one_or_none()
+
+
+def _create_user(db: Session, payload: RegisterRequest, password_hash: str) -> UserDB:
+    user = UserDB(
+        email=payload.email,
+        password_hash=password_hash,
+        full_name=payload.full_name,
+        is_active=True,
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _update_password_hash(db: Session, user: UserDB, password_hash: str) -> None:
+    user.password_hash = password_hash
+    db.commit()
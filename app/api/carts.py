@@ -1,38 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.deps import get_db
+from app.db.deps import get_async_db, stick_to_primary
 from app.db.models import CartDB, CartItemDB, ProductDB, ShippingMethod
 from app.schemas.cart import CartItemAdd, CartOut, CartItemOut, CartItemUpdate
 from app.core.shipping import calculate_shipping
 from app.db.cart_service import get_or_create_cart
+from app.db.queries import cart_item
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
 
 @router.get("", response_model=CartOut)
-def get_cart(request: Request, response: Response, db: Session = Depends(get_db)):
-    cart = get_or_create_cart(db, request, response)
-    return _cart_out(cart, db)
+async def get_cart(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cart = await db.run_sync(get_or_create_cart, request, response)
+    return await _cart_out(cart, db)
 
 
-@router.post("/items", response_model=CartOut, status_code=201)
-def add_item(payload: CartItemAdd, request: Request, response: Response, db: Session = Depends(get_db)):
-    cart = get_or_create_cart(db, request, response)
+@router.post("/items", response_model=CartOut, status_code=201, dependencies=[Depends(stick_to_primary)])
+async def add_item(payload: CartItemAdd, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cart = await db.run_sync(get_or_create_cart, request, response)
 
-    product = db.get(ProductDB, payload.product_id)
+    product = await db.get(ProductDB, payload.product_id)
     if not product or not product.is_active:
         raise HTTPException(status_code=404, detail="Product not found")
     if product.stock_qty < payload.qty:
         raise HTTPException(status_code=400, detail="Not enough stock")
 
     # jeśli produkt już jest w koszyku -> zwiększ qty
-    stmt = select(CartItemDB).where(
-        CartItemDB.cart_id == cart.id,
-        CartItemDB.product_id == payload.product_id,
-    )
-    item = db.execute(stmt).scalars().first()
+    item = (await db.scalars(cart_item(cart.id, payload.product_id))).first()
 
     if item:
         if item.qty + payload.qty > product.stock_qty:
@@ -40,41 +36,40 @@ def add_item(payload: CartItemAdd, request: Request, response: Response, db: Ses
         item.qty += payload.qty
     else:
         item = CartItemDB(
-            cart_id=cart.id,
-            product_id=payload.product_id,
+            product=product,
             qty=payload.qty,
             unit_price_pln=product.price_pln,
         )
-        db.add(item)
+        cart.items.append(item)
 
-    db.commit()
-    return _cart_out(cart, db)
+    await db.commit()
+    return await _cart_out(cart, db)
 
 
-@router.delete("/items/{item_id}", status_code=204)
-def delete_item(item_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
-    cart = get_or_create_cart(db, request, response)
-    item = db.get(CartItemDB, item_id)
+@router.delete("/items/{item_id}", status_code=204, dependencies=[Depends(stick_to_primary)])
+async def delete_item(item_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cart = await db.run_sync(get_or_create_cart, request, response)
+    item = await db.get(CartItemDB, item_id)
     if not item or item.cart_id != cart.id:
         raise HTTPException(status_code=404, detail="Item not found")
-    db.delete(item)
-    db.commit()
+    cart.items.remove(item)  # delete-orphan
+    await db.commit()
     return
 
 
-@router.patch("/items/{item_id}", response_model=CartOut)
-def update_item(item_id: int, payload: CartItemUpdate, request: Request, response: Response, db: Session = Depends(get_db)):
-    cart = get_or_create_cart(db, request, response)
-    item = db.get(CartItemDB, item_id)
+@router.patch("/items/{item_id}", response_model=CartOut, dependencies=[Depends(stick_to_primary)])
+async def update_item(item_id: int, payload: CartItemUpdate, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    cart = await db.run_sync(get_or_create_cart, request, response)
+    item = await db.get(CartItemDB, item_id)
     if not item or item.cart_id != cart.id:
         raise HTTPException(status_code=404, detail="Item not found")
 
     if payload.qty == 0:
-        db.delete(item)
-        db.commit()
-        return _cart_out(cart, db)
+        cart.items.remove(item)  # delete-orphan
+        await db.commit()
+        return await _cart_out(cart, db)
 
-    product = db.get(ProductDB, item.product_id)
+    product = await db.get(ProductDB, item.product_id)
     if not product or not product.is_active:
         raise HTTPException(status_code=404, detail="Product not found")
     if payload.qty > product.stock_qty:
@@ -82,13 +77,12 @@ def update_item(item_id: int, payload: CartItemUpdate, request: Request, respons
 
     item.qty = payload.qty
     db.add(item)
-    db.commit()
-    return _cart_out(cart, db)
+    await db.commit()
+    return await _cart_out(cart, db)
 
 
-def _cart_out(cart: CartDB, db: Session) -> CartOut:
-    # Przeładowujemy itemy, żeby mieć pewność co do stanu
-    db.refresh(cart, attribute_names=["items"])
+async def _cart_out(cart: CartDB, db: AsyncSession) -> CartOut:
+    # cart.items (selectin) jest aktualne: zapisy wyżej zmieniają kolekcję, a nie tylko wiersze
     items = cart.items
 
     out_items: list[CartItemOut] = []
@@ -118,7 +112,7 @@ def _cart_out(cart: CartDB, db: Session) -> CartOut:
             if shipping_cost != cart.shipping_cost_pln:
                 cart.shipping_cost_pln = shipping_cost
                 db.add(cart)
-                db.flush()
+                await db.flush()
 
     return CartOut(
         id=cart.id,
@@ -1,22 +1,29 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import jwt
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.deps import get_db
+from app.db.deps import get_async_db
 from app.core.config import settings
 from app.core.security import JWT_ALG
-from app.db.models import UserDB
+from app.core.user_cache import CurrentUser, principal_cache
+from app.db.queries import user_by_email
 
 bearer = HTTPBearer(auto_error=True)
 bearer_optional = HTTPBearer(auto_error=False)
 
-def get_current_user(
+async def get_current_user(
     creds: HTTPAuthorizationCredentials = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> UserDB:
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    # Async sesja: trafienie cache nie dotyka bazy, a chybienie nie zajmuje wątku z puli
+    # ani drugiego (sync) połączenia obok async sesji handlera
     token = creds.credentials
+    # Cache trafia tylko dla tokenów, które już raz przeszły weryfikację podpisu i exp
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[JWT_ALG])
         email = payload.get("sub")
@@ -25,23 +32,26 @@ def get_current_user(
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.execute(select(UserDB).where(UserDB.email == email)).scalar_one_or_none()
+    user = (await db.execute(user_by_email(email))).scalar_one_or_none()
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User not found/inactive")
-    return user
+
+    principal = CurrentUser.from_user(user)
+    principal_cache.put(token, principal, token_exp=payload.get("exp"))
+    return principal
 
 
-def require_admin(current_user: UserDB = Depends(get_current_user)) -> UserDB:
+def require_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
     return current_user
 
 
-def get_current_user_optional(
+async def get_current_user_optional(
     creds: HTTPAuthorizationCredentials | None = Depends(bearer_optional),
-    db: Session = Depends(get_db),
-) -> UserDB | None:
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser | None:
     # If no Authorization header, return None gracefully
     if creds is None:
         return None
-    return get_current_user(creds, db)
+    return await get_current_user(creds, db)
@@ -1,68 +1,271 @@
-import shutil
+import logging
 import os
-from uuid import uuid4
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+import time
+from dataclasses import asdict
+from datetime import datetime, UTC
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import and_, or_, select
 
-from app.db.deps import get_db
+from app.db.deps import get_db, get_read_db, stick_to_primary
 from app.db.models import MediaDB
-from app.schemas.media import MediaOut
+from app.db.media_variants import record_variants
+from app.db.media_blobs import acquire_blob, copy_sibling_variants, release_blob, remove_released_files
+from app.db.media_gc import collect_media_garbage
+from app.schemas.media import MediaOut, UploadSessionCreate, UploadSessionOut
 from app.core.config import settings
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.core.uploads import StoredUpload, UploadRejected, receive_upload
+from app.core.resumable_uploads import UploadSession, UploadSessionStore
+from app.core.images import RESIZABLE_TYPES, check_image_pixels, image_pipeline
+from app.core.static_files import stat_cache as static_stat_cache
 from app.api.deps import get_current_user_optional, require_admin
-from app.db.models import UserDB
+from app.core.user_cache import CurrentUser
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/media", tags=["media"])
 
 UPLOAD_DIR = "app/static/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+upload_sessions = UploadSessionStore(
+    settings.media_upload_sessions_dir or os.path.join(UPLOAD_DIR, ".sessions"),
+    settings.media_max_upload_bytes, settings.media_upload_session_ttl_s
+)
 
-@router.post("", response_model=MediaOut, status_code=201)
-def upload_media(
-    file: UploadFile = File(...),
-    caption: str | None = Form(None),
-    is_public: bool = Form(True),
-    db: Session = Depends(get_db),
-    current_user: UserDB | None = Depends(get_current_user_optional),
-):
-    # Walidacja typu pliku (prosta)
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
-
-    # Generowanie unikalnej nazwy
-    ext = file.filename.split(".")[-1] if file.filename and "." in file.filename else "jpg"
-    filename = f"{uuid4()}.{ext}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-
-    # Zapis pliku
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    # URL do pliku (zakładamy, że /static jest zamontowane w main.py)
-    # Jeśli używasz proxy/nginxa, tu może być potrzebny pełny URL
-    url = f"{settings.api_prefix}/static/uploads/{filename}"
-    # Uwaga: w main.py montujemy static pod "/static", ale api_prefix to "/api".
-    # Żeby było prościej, w main.py zamontujemy static pod "/static" (bez api prefixu)
-    # albo zwrócimy relatywny URL. Tutaj przyjmijmy konwencję:
-    url = f"/static/uploads/{filename}"
 
+def _form_bool(value: str | None, default: bool) -> bool:
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "on", "yes")
+
+
+def _create_media(
+    db: Session, stored: StoredUpload, caption: str | None, is_public: bool, owner_id: int | None
+) -> tuple[MediaDB, bool]:
+    """Insert the media row and take a reference on its blob; returns (media, needs_variants)."""
     media = MediaDB(
-        filename=filename,
-        url=url,
+        filename=stored.filename,
+        # URL względny - static montujemy w main.py pod "/static" (bez api prefixu)
+        url=f"/static/uploads/{stored.filename}",
         caption=caption,
-        owner_id=current_user.id if current_user else None,
+        owner_id=owner_id,
         is_public=is_public,
+        content_type=stored.content_type,
+        size_bytes=stored.size,
+        sha256=stored.sha256,
+        variants=[],  # pochodne dojdą w tle albo z copy_sibling_variants - bez SELECT przy serializacji
     )
     db.add(media)
+    db.flush()
+    refs = acquire_blob(db, stored.sha256, stored.filename, stored.content_type, stored.size)
+    # duplikat: pochodne już są na dysku, kopiujemy tylko wiersze
+    reused = refs > 1 and copy_sibling_variants(db, media)
     db.commit()
-    db.refresh(media)
+    return media, stored.content_type in RESIZABLE_TYPES and not reused
+
+
+@router.post(
+    "",
+    response_model=MediaOut,
+    status_code=201,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {
+                            "file": {"type": "string", "format": "binary"},
+                            "caption": {"type": "string"},
+                            "is_public": {"type": "boolean", "default": True},
+                        },
+                    }
+                }
+            },
+        }
+    },
+    dependencies=[Depends(stick_to_primary)],
+)
+async def upload_media(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser | None = Depends(get_current_user_optional),
+):
+    # Plik idzie strumieniem prosto do UPLOAD_DIR: limit rozmiaru, typ z magic bytes i sha256 w jednym przebiegu;
+    # zapisany jest pod <sha256>.<ext>, więc identyczny plik nie zajmuje drugi raz miejsca
+    try:
+        stored, fields = await receive_upload(request, UPLOAD_DIR, settings.media_max_upload_bytes)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return await _save_media(
+        db,
+        background_tasks,
+        stored,
+        fields.get("caption"),
+        _form_bool(fields.get("is_public"), True),
+        current_user.id if current_user else None,
+    )
+
 
+async def _save_media(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    stored: StoredUpload,
+    caption: str | None,
+    is_public: bool,
+    owner_id: int | None,
+) -> MediaDB:
+    """Common tail of every upload path: MediaDB row + blob reference, then variants."""
+    try:
+        await run_in_threadpool(check_image_pixels, stored.path)
+        media, needs_variants = await run_in_threadpool(_create_media, db, stored, caption, is_public, owner_id)
+    except BaseException as e:
+        if not stored.deduplicated:
+            os.remove(stored.path)
+        if isinstance(e, UploadRejected):
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        raise
+
+    # Pochodne (szerokości x formaty) liczymy po odpowiedzi, w osobnej puli procesów
+    if needs_variants:
+        background_tasks.add_task(_render_variants, media.id, stored.path, db.get_bind())
     return media
 
 
+async def _render_variants(media_id: int, path: str, bind) -> None:
+    try:
+        derivatives = await image_pipeline.render(path)
+    except Exception:
+        logger.exception("Rendering variants failed for media %s", media_id)
+        return
+    await run_in_threadpool(_save_variants, media_id, derivatives, bind)
+
+
+def _save_variants(media_id: int, derivatives, bind) -> None:
+    with sessionmaker(bind=bind)() as db:
+        record_variants(db, media_id, derivatives, url_prefix="/static/uploads")
+        db.commit()
+
+
+# --- RESUMABLE UPLOADS ---
+# POST /media/uploads {size} -> PATCH /media/uploads/{id} (Upload-Offset + surowe bajty, dowolnie wiele razy)
+# -> POST /media/uploads/{id}/complete. Po zerwanym połączeniu: GET /media/uploads/{id} zwraca offset.
+
+def _session_out(session: UploadSession) -> UploadSessionOut:
+    return UploadSessionOut(
+        id=session.id,
+        size=session.size,
+        offset=session.offset,
+        expires_at=datetime.fromtimestamp(session.created_at + upload_sessions.ttl_s, UTC),
+    )
+
+
+async def _get_session(session_id: str, current_user: CurrentUser | None) -> UploadSession:
+    session = await run_in_threadpool(upload_sessions.get, session_id)
+    if session is None or (session.owner_id is not None and (not current_user or current_user.id != session.owner_id)):
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.post("/uploads", response_model=UploadSessionOut, status_code=201)
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    response: Response,
+    current_user: CurrentUser | None = Depends(get_current_user_optional),
+):
+    try:
+        session = await run_in_threadpool(
+            upload_sessions.create,
+            payload.size,
+            current_user.id if current_user else None,
+            payload.caption,
+            payload.is_public,
+        )
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    response.headers["Location"] = f"{settings.api_prefix}/media/uploads/{session.id}"
+    response.headers["Upload-Offset"] = "0"
+    return _session_out(session)
+
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionOut)
+async def get_upload_session(
+    session_id: str,
+    response: Response,
+    current_user: CurrentUser | None = Depends(get_current_user_optional),
+):
+    session = await _get_session(session_id, current_user)
+    response.headers["Upload-Offset"] = str(session.offset)
+    return _session_out(session)
+
+
+@router.patch("/uploads/{session_id}", response_model=UploadSessionOut)
+async def append_upload_chunk(
+    session_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., ge=0),
+    current_user: CurrentUser | None = Depends(get_current_user_optional),
+):
+    session = await _get_session(session_id, current_user)
+    try:
+        session.offset = await upload_sessions.append(session, upload_offset, request.stream())
+    except UploadRejected as e:
+        if e.status_code == 400:
+            await run_in_threadpool(upload_sessions.delete, session.id)  # to nie obraz - sesji nie ma sensu wznawiać
+        current = await run_in_threadpool(upload_sessions.get, session.id)
+        headers = {"Upload-Offset": str(current.offset)} if current else None
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+    response.headers["Upload-Offset"] = str(session.offset)
+    return _session_out(session)
+
+
+@router.post(
+    "/uploads/{session_id}/complete",
+    response_model=MediaOut,
+    status_code=201,
+    dependencies=[Depends(stick_to_primary)],
+)
+async def complete_upload_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser | None = Depends(get_current_user_optional),
+):
+    session = await _get_session(session_id, current_user)
+    try:
+        stored = await run_in_threadpool(upload_sessions.finalize, session, UPLOAD_DIR)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return await _save_media(db, background_tasks, stored, session.caption, session.is_public, session.owner_id)
+
+
+@router.delete("/uploads/{session_id}", status_code=204)
+async def cancel_upload_session(
+    session_id: str, current_user: CurrentUser | None = Depends(get_current_user_optional)
+):
+    session = await _get_session(session_id, current_user)
+    await run_in_threadpool(upload_sessions.delete, session.id)
+
+
 @router.get("", response_model=list[MediaOut])
-def list_media(include_hidden: bool = False, db: Session = Depends(get_db), current_user: UserDB | None = Depends(get_current_user_optional)):
+def list_media(
+    response: Response,
+    include_hidden: bool = False,
+    owner_id: int | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser | None = Depends(get_current_user_optional),
+):
+    # Keyset po (created_at, id) malejąco; następna strona w nagłówku X-Next-Cursor
     stmt = select(MediaDB)
     if not include_hidden:
         stmt = stmt.where(MediaDB.is_public == True)  # noqa: E712
@@ -70,23 +273,54 @@ def list_media(include_hidden: bool = False, db: Session = Depends(get_db), curr
         # only admins can view hidden
         if not current_user or not current_user.is_admin:
             raise HTTPException(status_code=403, detail="Admin only")
-    stmt = stmt.order_by(MediaDB.created_at.desc())
-    return db.execute(stmt).scalars().all()
+    if owner_id is not None:
+        stmt = stmt.where(MediaDB.owner_id == owner_id)
+    if cursor:
+        try:
+            after_created, after_id = decode_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(
+            or_(
+                MediaDB.created_at < after_created,
+                and_(MediaDB.created_at == after_created, MediaDB.id < after_id),
+            )
+        )
+    stmt = stmt.order_by(MediaDB.created_at.desc(), MediaDB.id.desc()).limit(limit + 1)
+    rows = db.execute(stmt).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
 
 
-@router.delete("/{media_id}", status_code=204)
+@router.post("/gc")
+def run_media_gc(
+    delete: bool = False,
+    grace_s: float | None = None,
+    db: Session = Depends(get_db),
+    _=Depends(require_admin),
+):
+    # domyślnie tylko raport; delete=true usuwa osierocone pliki starsze niż grace
+    report = asdict(collect_media_garbage(db, UPLOAD_DIR, delete=delete, grace_s=grace_s))
+    report["expired_upload_sessions"] = upload_sessions.purge_expired() if delete else 0
+    return report
+
+
+@router.delete("/{media_id}", status_code=204, dependencies=[Depends(stick_to_primary)])
 def delete_media(media_id: int, db: Session = Depends(get_db), _=Depends(require_admin)):
     media = db.get(MediaDB, media_id)
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
-    # try remove file
-    file_path = os.path.join(UPLOAD_DIR, media.filename)
-    try:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    except OSError:
-        pass
+    # pliki (oryginał + pochodne) kasujemy dopiero, gdy znika ostatnia referencja do bloba
+    released_at = time.time()
+    last_reference = release_blob(db, media.sha256)
+    sha256 = media.sha256
+    filenames = [media.filename, *(v.filename for v in media.variants)] if last_reference else []
 
     db.delete(media)
     db.commit()
+
+    if filenames and remove_released_files(db, UPLOAD_DIR, sha256, filenames, released_at):
+        static_stat_cache.clear()  # /static nie może serwować właśnie usuniętego pliku z cache'u stat
     return
@@ -1,66 +1,63 @@
-from datetime import datetime, UTC
-from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import select, delete
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete
 
-from app.db.deps import get_db
+from app.db.deps import get_async_db, get_async_read_db, stick_to_primary
 from app.api.deps import get_current_user
+from app.core.user_cache import CurrentUser
 from app.db.models import (
     CartDB,
     CartItemDB,
     OrderDB,
+    OrderArchiveDB,
     OrderItemDB,
     OrderStatus,
-    UserDB,
     PaymentAttemptDB,
     PaymentStatus,
-    ProductDB,
     ShippingMethod,
-    CustomerProfileDB,
 )
+from app.core.config import settings
 from app.core.shipping import calculate_shipping
 from app.schemas.order import OrderCreate, OrderOut, OrderItemOut, CheckoutRequest
 from app.db.cart_service import get_or_create_cart
+from app.db.order_counters import bump_order_status
+from app.db.outbox import add_order_event, process_outbox_handlers_async, ORDER_PLACED
+from app.db.order_archive import find_order, list_orders_for_email
+from app.db import queries
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 checkout_router = APIRouter(prefix="/checkout", tags=["checkout"])
 
 
-@checkout_router.post("", response_model=OrderOut, status_code=201)
-def checkout(
+@checkout_router.post("", response_model=OrderOut, status_code=201, dependencies=[Depends(stick_to_primary)])
+async def checkout(
     request: Request,
     response: Response,
     payload: CheckoutRequest,
-    db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user),
     idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
 ):
     # 1. Idempotency check (sprawdzamy czy już jest płatność/zamówienie z tym kluczem)
     if idempotency_key:
-        existing_payment = db.execute(
-            select(PaymentAttemptDB)
-            .where(PaymentAttemptDB.idempotency_key == idempotency_key)
-        ).scalar_one_or_none()
+        existing_payment = (await db.execute(queries.payment_attempt_by_key(idempotency_key))).scalar_one_or_none()
         
         if existing_payment:
-            existing_order = db.get(OrderDB, existing_payment.order_id)
+            existing_order = await db.get(OrderDB, existing_payment.order_id)
             if existing_order:
                 return _order_out(existing_order)
 
     # 2. Check if cart already has an order (double-click prevention)
     # (Tutaj musimy najpierw pobrać koszyk, żeby znać jego ID)
     if payload.cart_id:
-        cart = db.get(CartDB, payload.cart_id)
+        cart = await db.get(CartDB, payload.cart_id)
         if not cart:
             raise HTTPException(status_code=404, detail="Cart not found")
     else:
-        cart = get_or_create_cart(db, request, response)
+        cart = await db.run_sync(get_or_create_cart, request, response)
     
-    existing_for_cart = db.execute(
-        select(OrderDB)
-        .where(OrderDB.cart_id == cart.id)
-        .options(selectinload(OrderDB.items))
-    ).scalar_one_or_none()
+    existing_for_cart = (await db.execute(queries.order_for_cart(cart.id))).scalar_one_or_none()
     if existing_for_cart:
         return _order_out(existing_for_cart)
 
@@ -77,9 +74,18 @@ def checkout(
     # Stock validation and collection of touched products for decrement
     touched_products = []
 
+    # aktualny stan magazynu wszystkich produktów z koszyka jednym zapytaniem
+    # (populate_existing: produkty z koszyka są już w sesji, a stan mógł się zmienić)
+    products = {
+        p.id: p
+        for p in await db.scalars(
+            queries.products_by_ids(list({it.product_id for it in cart.items})),
+            execution_options={"populate_existing": True},
+        )
+    }
+
     for it in cart.items:
-        # refresh product from DB to ensure current stock
-        product = db.get(ProductDB, it.product_id)
+        product = products.get(it.product_id)
         if not product or not product.is_active:
             raise HTTPException(status_code=400, detail=f"Product {it.product_id} unavailable")
         if it.qty > product.stock_qty:
@@ -117,7 +123,7 @@ def checkout(
         cart.shipping_method = method
         cart.shipping_cost_pln = shipping_cost
         db.add(cart)
-        db.flush()
+        await db.flush()
     else:
         try:
             shipping_cost = calculate_shipping(total_grosze, cart.shipping_method)
@@ -150,39 +156,8 @@ def checkout(
             shipping_country=payload.country,
         )
         db.add(order)
-        db.flush()  # ensure order.id is assigned before payment attempt
-
-        # Upsert customer profile
-        profile = db.execute(
-            select(CustomerProfileDB).where(CustomerProfileDB.user_id == current_user.id)
-        ).scalar_one_or_none()
-        now = datetime.now(UTC)
-        if profile:
-            profile.first_name = payload.first_name
-            profile.last_name = payload.last_name
-            profile.phone = payload.phone
-            profile.address_line1 = payload.address_line1
-            profile.address_line2 = payload.address_line2
-            profile.city = payload.city
-            profile.postal_code = payload.postal_code
-            profile.country = payload.country
-            profile.updated_at = now
-            db.add(profile)
-        else:
-            db.add(
-                CustomerProfileDB(
-                    user_id=current_user.id,
-                    first_name=payload.first_name,
-                    last_name=payload.last_name,
-                    phone=payload.phone,
-                    address_line1=payload.address_line1,
-                    address_line2=payload.address_line2,
-                    city=payload.city,
-                    postal_code=payload.postal_code,
-                    country=payload.country,
-                    updated_at=now,
-                )
-            )
+        await db.flush()  # ensure order.id is assigned before payment attempt
+        await db.run_sync(bump_order_status, None, order.status)
 
         # Mark cart as checked out
         cart.is_checked_out = True
@@ -206,24 +181,35 @@ def checkout(
             db.add(product)
 
         # Clear cart items
-        db.execute(delete(CartItemDB).where(CartItemDB.cart_id == cart.id))
-        
-        db.commit()
-        db.refresh(order)
+        await db.execute(delete(CartItemDB).where(CartItemDB.cart_id == cart.id))
+
+        await db.run_sync(
+            add_order_event,
+            order,
+            ORDER_PLACED,
+            user_id=current_user.id,
+            items=[{"product_id": it.product_id, "qty": it.qty} for it in order_items_db],
+        )
+        await db.commit()
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise
 
+    # Profil klienta, alerty itp. obsługują handlery zdarzenia order.placed z outboxa (trwałe);
+    # bez workera szturchamy je po odpowiedzi, a niedokończone podejmie następne przetwarzanie
+    if not settings.outbox_handler_worker_enabled:
+        background_tasks.add_task(process_outbox_handlers_async, db.bind)
     return _order_out(order)
 
 
-@router.post("", response_model=OrderOut, status_code=201)
-def create_order(
+@router.post("", response_model=OrderOut, status_code=201, dependencies=[Depends(stick_to_primary)])
+async def create_order(
     request: Request,
     response: Response,
     payload: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     # Legacy wrapper using the new logic
     req = CheckoutRequest(
@@ -238,33 +224,27 @@ def create_order(
         country=payload.country,
         shipping_method=payload.shipping_method,
     )
-    return checkout(request, response, req, db=db, current_user=current_user, idempotency_key=None)
+    return await checkout(request, response, req, background_tasks, db=db, current_user=current_user, idempotency_key=None)
 
 
 @router.get("", response_model=list[OrderOut])
-def list_my_orders(
-    db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user),
+async def list_my_orders(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    stmt = (
-        select(OrderDB)
-        .where(OrderDB.email == current_user.email)
-        .options(selectinload(OrderDB.items))
-        .order_by(OrderDB.created_at.desc())
-    )
-    orders = db.execute(stmt).scalars().all()
+    orders = await db.run_sync(list_orders_for_email, current_user.email)
     return [_order_out(o) for o in orders]
 
 
 @router.get("/{order_id}", response_model=OrderOut)
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    order = db.get(OrderDB, order_id)
+async def get_order(order_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    order = await db.run_sync(find_order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return _order_out(order)
 
 
-def _order_out(order: OrderDB) -> OrderOut:
+def _order_out(order: OrderDB | OrderArchiveDB) -> OrderOut:
     out_items = []
     for it in order.items:
         out_items.append(
@@ -1,36 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException
+import math
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import select, delete
+from sqlalchemy import select
 
 from app.db.deps import get_db
-from app.db.models import OrderDB, OrderStatus, PaymentAttemptDB, PaymentStatus, CartItemDB
+from app.api.deps import get_current_user, require_admin
+from app.core.config import settings
+from app.core.user_cache import CurrentUser
+from app.core.payment_provider import HttpPaymentProvider, PaymentProviderError, ProviderUnavailable
+from app.db.models import OrderDB, OrderStatus, PaymentAttemptDB, PaymentStatus
+from app.core.webhook_signatures import SIGNATURE_HEADER, verify_signature
+from app.db.payment_inbox import ingest_payment_event, process_payment_inbox, PAYMENT_SUCCEEDED
+from app.schemas.payment import PaymentWebhookIn, PaymentWebhookAck, PaymentIntentOut
 
-router = APIRouter(prefix="/payments/mock", tags=["payments"])
+router = APIRouter(prefix="/payments", tags=["payments"])
 
-@router.post("/confirm")
-def confirm_mock(payload: dict, db: Session = Depends(get_db)):
-    # payload: {"order_id": 1}
-    order_id = payload.get("order_id")
-    if not order_id:
-        raise HTTPException(400, "Missing order_id")
 
-    pay = db.execute(select(PaymentAttemptDB).where(PaymentAttemptDB.order_id == order_id, PaymentAttemptDB.provider == "mock")).scalar_one_or_none()
-    if not pay:
-        raise HTTPException(404, "Payment attempt not found")
+def get_payment_provider(request: Request) -> HttpPaymentProvider:
+    return request.app.state.payment_provider
+
 
+@router.post("/{order_id}/start", response_model=PaymentIntentOut)
+async def start_payment(
+    order_id: int,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+    provider: HttpPaymentProvider = Depends(get_payment_provider),
+):
+    # async handler: czekanie na providera nie blokuje wątku z threadpoola,
+    # do wątku idzie tylko krótka praca na bazie
+    amount, idempotency_key = await run_in_threadpool(
+        _prepare_attempt, db, order_id, current_user.email, provider.name
+    )
+    try:
+        intent = await provider.create_payment(order_id, amount, idempotency_key)
+    except ProviderUnavailable as exc:
+        raise HTTPException(
+            503, "Payment provider unavailable", headers={"Retry-After": str(math.ceil(exc.retry_after_s))}
+        )
+    except PaymentProviderError:
+        raise HTTPException(502, "Payment provider error")
+
+    return PaymentIntentOut(
+        order_id=order_id,
+        provider=intent.provider,
+        provider_ref=intent.provider_ref,
+        status=intent.status,
+        redirect_url=intent.redirect_url,
+    )
+
+
+def _prepare_attempt(db: Session, order_id: int, email: str, provider: str) -> tuple[int, str]:
+    try:
+        return _load_or_create_attempt(db, order_id, email, provider)
+    finally:
+        # każda ścieżka (także 404/409) kończy transakcję: połączenie wraca do puli,
+        # zanim handler zacznie czekać na providera
+        db.rollback()
+
+
+def _load_or_create_attempt(db: Session, order_id: int, email: str, provider: str) -> tuple[int, str]:
     order = db.get(OrderDB, order_id)
-    if not order:
+    if not order or order.email != email:
         raise HTTPException(404, "Order not found")
+    if order.status != OrderStatus.NEW:
+        raise HTTPException(409, f"Order is {order.status}")
+
+    amount = order.total_pln
+    attempt = db.execute(
+        select(PaymentAttemptDB).where(PaymentAttemptDB.order_id == order_id, PaymentAttemptDB.provider == provider)
+    ).scalar_one_or_none()
+    if attempt:
+        return amount, attempt.idempotency_key
 
-    if pay.status == PaymentStatus.SUCCEEDED and order.status == OrderStatus.PAID:
-        return {"ok": True, "order_id": order.id, "status": order.status}
+    idempotency_key = f"{provider}:{order_id}"
+    db.add(
+        PaymentAttemptDB(
+            order_id=order_id,
+            provider=provider,
+            status=PaymentStatus.PENDING,
+            idempotency_key=idempotency_key,
+        )
+    )
+    db.commit()
+    return amount, idempotency_key
 
-    # Symulacja sukcesu
-    pay.status = PaymentStatus.SUCCEEDED
-    order.status = OrderStatus.PAID
 
-    # Koszyk został już wyczyszczony przy tworzeniu zamówienia w Twoim obecnym flow (app/api/orders.py),
-    # więc tutaj tylko aktualizujemy statusy.
+async def verify_webhook_signature(
+    provider: str,
+    request: Request,
+    signature: str | None = Header(default=None, alias=SIGNATURE_HEADER),
+) -> None:
+    # HMAC liczony z surowego body (FastAPI cache'uje je, więc model payloadu nadal się parsuje)
+    secret = settings.payment_webhook_secrets.get(provider)
+    if not verify_signature(secret, await request.body(), signature):
+        raise HTTPException(401, "Invalid webhook signature")
 
-    db.commit()
-    return {"ok": True, "order_id": order.id, "status": order.status}
\ No newline at end of file
+
+@router.post(
+    "/webhooks/{provider}",
+    response_model=PaymentWebhookAck,
+    status_code=202,
+    dependencies=[Depends(verify_webhook_signature)],
+)
+def payment_webhook(provider: str, payload: PaymentWebhookIn, db: Session = Depends(get_db)):
+    # Zapis do inboxa i potwierdzenie - statusy zmienia worker (app/db/payment_inbox.py),
+    # a gdy jest wyłączony, przetwarzamy inbox od razu w tym żądaniu.
+    # Retry providera z tym samym id zdarzenia nie jest przetwarzany ponownie.
+    return _ingest(provider, payload, db)
+
+
+def _ingest(provider: str, payload: PaymentWebhookIn, db: Session) -> PaymentWebhookAck:
+    inserted = ingest_payment_event(
+        db,
+        provider=provider,
+        event_id=payload.id,
+        event_type=payload.type,
+        order_id=payload.order_id,
+        payload=payload.model_dump(),
+    )
+    if inserted and not settings.payment_inbox_worker_enabled:
+        process_payment_inbox(db)  # bez workera nikt inny nie zastosuje zdarzenia
+    return PaymentWebhookAck(duplicate=not inserted)
+
+
+@router.post(
+    "/mock/confirm", response_model=PaymentWebhookAck, status_code=202, dependencies=[Depends(require_admin)]
+)
+def confirm_mock(payload: dict, db: Session = Depends(get_db)):
+    # payload: {"order_id": 1, "event_id": "opcjonalne"}
+    order_id = payload.get("order_id")
+    if not order_id:
+        raise HTTPException(400, "Missing order_id")
+
+    # Bez event_id każde potwierdzenie zamówienia to to samo zdarzenie -> deduplikacja po stronie inboxa
+    event = PaymentWebhookIn(
+        id=str(payload.get("event_id") or f"confirm-{order_id}"),
+        type=PAYMENT_SUCCEEDED,
+        order_id=order_id,
+    )
+    return _ingest("mock", event, db)
@@ -1,40 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.product import Product, ProductCreate, ProductUpdate
-from app.db.deps import get_db
+from app.db.deps import get_async_db, get_async_read_db, stick_to_primary
 from app.db.models import ProductDB
+from app.db import queries
+from app.db.media_variants import srcsets_by_url
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
-@router.get("", response_model=List[Product])
-def list_products(active_only: bool = True, db: Session = Depends(get_db)):
-    stmt = select(ProductDB)
-    if active_only:
-        stmt = stmt.where(ProductDB.is_active == True)  # noqa: E712
-    rows = db.execute(stmt).scalars().all()
-    return [
-        Product(
-            id=r.id,
-            name=r.name,
-            description=r.description,
-            price_pln=r.price_pln,
-            is_active=r.is_active,
-            image_url=r.image_url,
-            stock_qty=r.stock_qty,
-        )
-        for r in rows
-    ]
-
-
-@router.get("/{product_id}", response_model=Product)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    row = db.get(ProductDB, product_id)
-    if not row:
-        raise HTTPException(status_code=404, detail="Product not found")
+def _product_out(row: ProductDB, srcsets: dict[str, dict[str, str]]) -> Product:
     return Product(
         id=row.id,
         name=row.name,
@@ -43,12 +20,29 @@ def get_product(product_id: int, db: Session = Depends(get_db)):
         is_active=row.is_active,
         image_url=row.image_url,
         stock_qty=row.stock_qty,
+        image_srcset=srcsets.get(row.image_url, {}),
     )
 
 
-@router.patch("/{product_id}", response_model=Product)
-def update_product(product_id: int, payload: ProductUpdate, db: Session = Depends(get_db)):
-    row = db.get(ProductDB, product_id)
+@router.get("", response_model=List[Product])
+async def list_products(active_only: bool = True, db: AsyncSession = Depends(get_async_read_db)):
+    rows = (await db.scalars(queries.products(active_only))).all()
+    # srcset dla wszystkich zdjęć jednym zapytaniem
+    srcsets = await db.run_sync(srcsets_by_url, [r.image_url for r in rows])
+    return [_product_out(r, srcsets) for r in rows]
+
+
+@router.get("/{product_id}", response_model=Product)
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    row = await db.get(ProductDB, product_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return _product_out(row, await db.run_sync(srcsets_by_url, [row.image_url]))
+
+
+@router.patch("/{product_id}", response_model=Product, dependencies=[Depends(stick_to_primary)])
+async def update_product(product_id: int, payload: ProductUpdate, db: AsyncSession = Depends(get_async_db)):
+    row = await db.get(ProductDB, product_id)
     if not row:
         raise HTTPException(status_code=404, detail="Product not found")
 
@@ -66,34 +60,25 @@ def update_product(product_id: int, payload: ProductUpdate, db: Session = Depend
         setattr(row, k, v)
 
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    await db.commit()
 
-    return Product(
-        id=row.id,
-        name=row.name,
-        description=row.description,
-        price_pln=row.price_pln,
-        is_active=row.is_active,
-        image_url=row.image_url,
-        stock_qty=row.stock_qty,
-    )
+    return _product_out(row, await db.run_sync(srcsets_by_url, [row.image_url]))
 
 
-@router.delete("/{product_id}", status_code=204)
-def delete_product(product_id: int, db: Session = Depends(get_db)):
-    row = db.get(ProductDB, product_id)
+@router.delete("/{product_id}", status_code=204, dependencies=[Depends(stick_to_primary)])
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    row = await db.get(ProductDB, product_id)
     if not row:
         raise HTTPException(status_code=404, detail="Product not found")
 
     row.is_active = False
     db.add(row)
-    db.commit()
+    await db.commit()
     return
 
 
-@router.post("", response_model=Product, status_code=201)
-def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
+@router.post("", response_model=Product, status_code=201, dependencies=[Depends(stick_to_primary)])
+async def create_product(payload: ProductCreate, db: AsyncSession = Depends(get_async_db)):
     row = ProductDB(
         name=payload.name,
         description=payload.description,
@@ -103,14 +88,5 @@ def create_product(payload: ProductCreate, db: Session = Depends(get_db)):
         stock_qty=payload.stock_qty,
     )
     db.add(row)
-    db.commit()
-    db.refresh(row)
-    return Product(
-        id=row.id,
-        name=row.name,
-        description=row.description,
-        price_pln=row.price_pln,
-        is_active=row.is_active,
-        image_url=row.image_url,
-        stock_qty=row.stock_qty,
-    )
+    await db.commit()
+    return _product_out(row, await db.run_sync(srcsets_by_url, [row.image_url]))
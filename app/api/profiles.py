@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
-from app.db.deps import get_db
+from app.db.deps import get_read_db
 from app.api.deps import get_current_user
-from app.db.models import CustomerProfileDB, UserDB
+from app.core.user_cache import CurrentUser
+from app.db.models import CustomerProfileDB
 from app.schemas.customer import CheckoutProfileOut
 
 router = APIRouter(prefix="/me", tags=["me"])
@@ -12,8 +13,8 @@ router = APIRouter(prefix="/me", tags=["me"])
 
 @router.get("/checkout-profile", response_model=CheckoutProfileOut | None)
 def get_checkout_profile(
-    db: Session = Depends(get_db),
-    current_user: UserDB = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     profile = db.execute(
         select(CustomerProfileDB).where(CustomerProfileDB.user_id == current_user.id)
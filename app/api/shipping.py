@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app.db.deps import get_db
+from app.db.deps import get_db, get_read_db, stick_to_primary
 from app.db.models import CartDB, ShippingMethod
 from app.core.shipping import (
     SHIPPING_PRICES,
@@ -20,7 +20,7 @@ router = APIRouter(tags=["shipping"])
 
 
 @router.get("/shipping/methods", response_model=ShippingMethodsResponse)
-def list_shipping_methods(cart_id: int = Query(...), db: Session = Depends(get_db)):
+def list_shipping_methods(cart_id: int = Query(...), db: Session = Depends(get_read_db)):
     cart = db.get(CartDB, cart_id)
     if not cart:
         raise HTTPException(status_code=404, detail="Cart not found")
@@ -56,7 +56,7 @@ def list_shipping_methods(cart_id: int = Query(...), db: Session = Depends(get_d
     )
 
 
-@router.post("/cart/shipping", response_model=CartShippingSummary)
+@router.post("/cart/shipping", response_model=CartShippingSummary, dependencies=[Depends(stick_to_primary)])
 def set_cart_shipping(payload: SetShippingRequest, cart_id: int = Query(...), db: Session = Depends(get_db)):
     cart = db.get(CartDB, cart_id)
     if not cart:
@@ -80,7 +80,6 @@ def set_cart_shipping(payload: SetShippingRequest, cart_id: int = Query(...), db
 
     db.add(cart)
     db.commit()
-    db.refresh(cart)
 
     return CartShippingSummary(
         cart_id=cart.id,
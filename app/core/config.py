@@ -1,6 +1,10 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List
 
+# lokalny zastępca providera płatności (devtools/mock_provider.py) - tylko dla app_env == "development"
+DEV_PAYMENT_PROVIDER_URL = "http://127.0.0.1:9100"
+
 
 class Settings(BaseSettings):
     app_name: str = "Lanari Candle"
@@ -12,6 +16,114 @@ class Settings(BaseSettings):
     # dodaj to:
     secret_key: str = "change-me"
     database_url: str = "sqlite:///local.db"
+    # odczyty GET (get_read_db): replika; bez niej plik SQLite dostaje osobną pulę tylko do odczytu.
+    # Po zapisie klient czyta z primary przez db_read_your_writes_s (ciasteczko, działa między workerami)
+    database_read_url: str | None = None
+    db_read_your_writes_s: float = 10.0
+    # licznik zapytań na żądanie (app/db/query_stats.py): Server-Timing w debug,
+    # ostrzeżenie gdy ten sam fingerprint SQL powtarza się > próg razy (0 = wyłączone)
+    sql_n_plus_one_threshold: int = 10
+    # log wolnych zapytań (app/db/slow_queries.py) - opt-in; agregaty per fingerprint w pamięci procesu
+    slow_query_log_enabled: bool = False
+    slow_query_threshold_ms: float = 200.0
+    slow_query_max_fingerprints: int = 1000
+    # pula połączeń (app/db/database.py, metryki: app/db/pool_metrics.py); recycle -1 = bez limitu wieku
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_s: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_s: int = 1800
+    # profil PRAGMA dla SQLite, ustawiany przy każdym nowym połączeniu (app/db/sqlite_tuning.py);
+    # None = domyślna wartość SQLite, cache_size < 0 = KiB
+    sqlite_tuning_enabled: bool = True
+    sqlite_journal_mode: str | None = "WAL"
+    sqlite_synchronous: str | None = "NORMAL"
+    sqlite_busy_timeout_ms: int | None = 5000
+    sqlite_mmap_size: int | None = 256 * 1024 * 1024
+    sqlite_cache_size: int | None = -64 * 1024
+    sqlite_temp_store: str | None = "MEMORY"
+    sqlite_foreign_keys: bool = True  # FK jak w PostgreSQL: hard delete używanego produktu -> 409
+
+    # bcrypt: koszt + osobna pula procesów (app/core/password_pool.py)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+
+    # cache zweryfikowanych tokenów -> CurrentUser (app/core/user_cache.py)
+    auth_cache_size: int = 10_000
+    auth_cache_ttl_s: float = 60.0
+
+    # pliki statyczne (app/core/static_files.py): max-age dla nie-hashowanych nazw, TTL cache'u stat,
+    # generowanie .gz/.br obok plików przy starcie
+    static_max_age_s: int = 3600
+    static_stat_cache_ttl_s: float = 2.0
+    static_precompress_on_startup: bool = True
+
+    # uploady mediów (app/core/uploads.py)
+    media_max_upload_bytes: int = 10 * 1024 * 1024
+    # wznawialne uploady (app/core/resumable_uploads.py); None = ukryty <UPLOAD_DIR>/.sessions -
+    # ten sam system plików co uploady, więc finalizacja to atomowe os.replace (nie kopia)
+    media_upload_sessions_dir: str | None = None
+    media_upload_session_ttl_s: float = 24 * 3600.0
+    # pochodne responsywne (app/core/images.py), generowane w puli procesów po uploadzie
+    media_derivative_widths: List[int] = [320, 640, 1024, 1600]
+    media_derivative_formats: List[str] = ["webp", "jpeg"]
+    media_derivative_quality: int = 80
+    media_derivative_workers: int = 2
+    # maks. liczba pikseli obrazu (ochrona przed decompression bomb), sprawdzana przed zapisem wiersza
+    media_max_image_pixels: int = 50_000_000
+    # sprzątanie osieroconych plików (app/db/media_gc.py); młodsze niż grace mogą być w trakcie uploadu
+    media_gc_grace_s: float = 3600.0
+    media_gc_batch_size: int = 500
+
+    # limit prób logowania (app/core/rate_limit.py); ścieżka SQLite = wspólny stan dla wielu workerów
+    login_throttle_ip_limit: int = 20
+    login_throttle_email_limit: int = 5
+    login_throttle_window_s: float = 60.0
+    login_throttle_max_keys: int = 100_000
+    login_throttle_sqlite_path: str | None = None
+    # adresy reverse proxy, którym ufamy w X-Forwarded-For; bez tego za proxy wszyscy klienci
+    # mają jeden limit IP (alternatywa: uvicorn --proxy-headers --forwarded-allow-ips)
+    login_throttle_trusted_proxies: List[str] = []
+
+    # archiwizacja zamówień (app/db/order_archive.py)
+    order_archive_after_days: int = 180
+    order_archive_batch_size: int = 500
+
+    # próg alertu o niskim stanie magazynowym (handler zdarzenia order.placed z outboxa)
+    low_stock_threshold: int = 3
+
+    # transactional outbox (app/db/outbox.py) - relay wyłączony domyślnie
+    outbox_relay_enabled: bool = False
+    outbox_relay_interval_s: float = 2.0
+    outbox_batch_size: int = 100
+    outbox_file_path: str | None = "var/outbox_events.jsonl"
+    outbox_webhook_url: str | None = None
+    # handlery po checkoucie (profil, alerty) czytają outbox; bez workera odpala je żądanie po odpowiedzi
+    outbox_handler_worker_enabled: bool = False
+    outbox_handler_interval_s: float = 1.0
+
+    # inbox callbacków płatności (app/db/payment_inbox.py); bez workera webhook przetwarza inbox od razu
+    payment_inbox_worker_enabled: bool = False
+    # sekret HMAC per provider (app/core/webhook_signatures.py); provider bez sekretu dostaje 401
+    payment_webhook_secrets: dict[str, str] = {}
+    payment_inbox_interval_s: float = 1.0
+    payment_inbox_batch_size: int = 200
+
+    # provider płatności (app/core/payment_provider.py); wymagany poza development,
+    # lokalnie domyślnie mock: uvicorn devtools.mock_provider:app --port 9100
+    payment_provider_name: str = "mockpay"
+    payment_provider_url: str | None = None
+    payment_provider_timeout_s: float = 5.0
+    payment_provider_connect_timeout_s: float = 2.0
+    payment_provider_max_connections: int = 20
+    payment_provider_max_concurrency: int = 10
+    payment_provider_acquire_timeout_s: float = 1.0
+    payment_provider_retries: int = 2
+    payment_provider_backoff_base_s: float = 0.1
+    payment_provider_backoff_max_s: float = 2.0
+    payment_provider_breaker_failures: int = 5
+    payment_provider_breaker_reset_s: float = 30.0
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -20,5 +132,13 @@ class Settings(BaseSettings):
         extra="ignore",  # opcjonalnie: ignoruje nieznane zmienne z .env
     )
 
+    @model_validator(mode="after")
+    def _require_payment_provider_url(self) -> "Settings":
+        if self.payment_provider_url is None:
+            if self.app_env != "development":
+                raise ValueError("PAYMENT_PROVIDER_URL must be set outside development")
+            self.payment_provider_url = DEV_PAYMENT_PROVIDER_URL
+        return self
+
 
 settings = Settings()
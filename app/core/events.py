@@ -0,0 +1,46 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OrderPlaced:
+    order_id: int
+    user_id: int
+    email: str
+
+
+Handler = Callable[[Session, object], None]
+
+_handlers: dict[type, list[Handler]] = defaultdict(list)
+
+
+def subscribe(event_type: type):
+    """Register a post-commit handler: `handler(db, event)`.
+
+    Handlers are driven by outbox events (app/db/outbox.py), so they run at least once
+    and must be idempotent.
+    """
+    def decorator(fn: Handler) -> Handler:
+        _handlers[event_type].append(fn)
+        return fn
+    return decorator
+
+
+def dispatch(db: Session, event: object) -> None:
+    """Run every handler for `event` in the caller's transaction.
+
+    Each handler gets its own savepoint - one that raises is rolled back and logged
+    without undoing or blocking the others.
+    """
+    for handler in _handlers[type(event)]:
+        try:
+            with db.begin_nested():
+                handler(db, event)
+        except Exception:
+            logger.exception("Post-commit handler %s failed for %r", handler.__name__, event)
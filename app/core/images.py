@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+from app.core.uploads import UploadRejected
+
+# limit dekompresji: PIL rzuca DecompressionBombError powyżej 2x limitu; ustawiany też w procesach puli,
+# bo importują ten moduł
+Image.MAX_IMAGE_PIXELS = settings.media_max_image_pixels
+
+# Typy, dla których generujemy pochodne (GIF może być animowany - zostawiamy oryginał)
+RESIZABLE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+_PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+_EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+
+@dataclass(frozen=True)
+class Derivative:
+    filename: str
+    width: int
+    height: int
+    format: str
+    size_bytes: int
+
+
+def check_image_pixels(path: str) -> None:
+    """Reject images whose declared size exceeds `media_max_image_pixels` (decompression bombs).
+
+    Reads only the header. Files PIL cannot parse are left to the renderer, which logs them.
+    """
+    try:
+        with Image.open(path) as img:
+            pixels = img.width * img.height
+    except Image.DecompressionBombError:
+        raise UploadRejected(413, "Image dimensions too large")
+    except (UnidentifiedImageError, OSError):
+        return
+    if pixels > settings.media_max_image_pixels:
+        raise UploadRejected(413, "Image dimensions too large")
+
+
+def build_srcset(variants) -> dict[str, str]:
+    """{"webp": "<url> 320w, <url> 640w", "jpeg": ...} ready for <source srcset>."""
+    by_format: dict[str, dict[int, str]] = defaultdict(dict)
+    # ta sama treść może mieć kilka wierszy media (deduplikacja) -> jedna pozycja na szerokość
+    for v in variants:
+        by_format[v.format][v.width] = v.url
+    return {
+        fmt: ", ".join(f"{url} {width}w" for width, url in sorted(widths.items()))
+        for fmt, widths in by_format.items()
+    }
+
+
+def render_derivatives(source_path: str, widths: list[int], formats: list[str], quality: int) -> list[Derivative]:
+    """Resize `source_path` to each width (never upscaling) in each format, next to the original.
+
+    Runs in a worker process; files are named `<stem>-<width>w.<ext>`.
+    """
+    directory, name = os.path.split(source_path)
+    stem = os.path.splitext(name)[0]
+    out: list[Derivative] = []
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA") or "transparency" in img.info
+        for width in sorted(set(widths)):
+            if width >= img.width:
+                continue
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                frame = resized
+                if fmt == "jpeg" or not has_alpha:
+                    frame = resized.convert("RGB")
+                filename = f"{stem}-{width}w.{_EXTENSIONS[fmt]}"
+                path = os.path.join(directory, filename)
+                frame.save(path, _PIL_FORMATS[fmt], quality=quality, optimize=True)
+                out.append(Derivative(filename, width, height, fmt, os.path.getsize(path)))
+    return out
+
+
+class ImagePipeline:
+    """Derivative rendering on its own process pool, so resizing never runs on a request thread."""
+
+    def __init__(self, workers: int | None = None):
+        self.workers = workers or settings.media_derivative_workers
+        self._executor: Executor | None = None
+
+    async def render(self, source_path: str) -> list[Derivative]:
+        return await asyncio.wrap_future(
+            self._get_executor().submit(
+                render_derivatives,
+                source_path,
+                settings.media_derivative_widths,
+                settings.media_derivative_formats,
+                settings.media_derivative_quality,
+            )
+        )
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_pipeline = ImagePipeline()
@@ -0,0 +1,61 @@
+import json
+import os
+from typing import Protocol
+
+import httpx
+
+from app.core.config import settings
+
+
+class OutboxSink(Protocol):
+    """Destination for relayed outbox events.
+
+    `deliver` gets a batch ordered by outbox id (so per-order `seq` is ascending)
+    and must raise if the batch was not accepted. Delivery is at-least-once:
+    a batch can be sent again after a partial failure, consumers dedupe on
+    (order_id, seq).
+    """
+
+    name: str
+
+    def deliver(self, events: list[dict]) -> None: ...
+
+
+class JsonlFileSink:
+    """Local stand-in for a queue: appends one JSON line per event."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def deliver(self, events: list[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            for event in events:
+                fh.write(json.dumps(event, ensure_ascii=False) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+
+class WebhookSink:
+    """POSTs the whole batch as `{"events": [...]}`; any non-2xx fails the batch."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout_s: float = 5.0, client: httpx.Client | None = None):
+        self.url = url
+        self._client = client or httpx.Client(timeout=timeout_s)
+
+    def deliver(self, events: list[dict]) -> None:
+        r = self._client.post(self.url, json={"events": events})
+        r.raise_for_status()
+
+
+def sinks_from_settings() -> list[OutboxSink]:
+    sinks: list[OutboxSink] = []
+    if settings.outbox_file_path:
+        sinks.append(JsonlFileSink(settings.outbox_file_path))
+    if settings.outbox_webhook_url:
+        sinks.append(WebhookSink(settings.outbox_webhook_url))
+    return sinks
@@ -0,0 +1,21 @@
+import base64
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque keyset cursor: position of the last row of a page (created_at, id)."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError as e:  # obejmuje też binascii.Error i UnicodeDecodeError
+        raise InvalidCursor(cursor) from e
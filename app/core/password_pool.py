@@ -0,0 +1,62 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from app.core.config import settings
+from app.core.security import hash_password, verify_password
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hash/verify calls queued; callers should answer 503."""
+
+
+class PasswordHasher:
+    """bcrypt on a dedicated, bounded process pool.
+
+    Request handlers await the result instead of burning a threadpool thread on
+    ~250 ms of CPU. At most `max_pending` calls may be running or queued; beyond
+    that `PasswordHasherBusy` is raised immediately so a login burst cannot build
+    an unbounded backlog.
+    """
+
+    def __init__(self, workers: int | None = None, max_pending: int | None = None, rounds: int | None = None):
+        self.workers = workers or settings.password_hash_workers
+        self.max_pending = max_pending or settings.password_hash_max_pending
+        self.rounds = rounds or settings.bcrypt_rounds
+        self._executor: Executor | None = None
+        self._pending = 0  # only touched from the event loop thread
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(verify_password, password, password_hash)
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusy()
+        self._pending += 1
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+        finally:
+            self._pending -= 1
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # spawn: nie forkujemy procesu z działającymi wątkami serwera
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
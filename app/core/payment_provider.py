@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentProviderError(Exception):
+    pass
+
+
+class PaymentRejected(PaymentProviderError):
+    """Provider answered with a non-retryable 4xx - it is healthy, the request is not."""
+
+
+class ProviderUnavailable(PaymentProviderError):
+    """Provider is not being called right now (circuit open or too many calls in flight)."""
+
+    def __init__(self, detail: str, retry_after_s: float = 1.0):
+        super().__init__(detail)
+        self.retry_after_s = retry_after_s
+
+
+@dataclass(frozen=True)
+class PaymentIntent:
+    provider: str
+    provider_ref: str
+    status: str
+    redirect_url: str | None = None
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    While open every call is rejected; after `reset_timeout_s` a single probe is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout_s: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout_s:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout_s - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Give back a half-open probe slot that ended up not calling the provider."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probe_in_flight or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+        self._probe_in_flight = False
+
+
+def build_http_client(base_url: str | None = None, transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """One pooled client per process; created in the app lifespan and closed on shutdown."""
+    return httpx.AsyncClient(
+        base_url=base_url or settings.payment_provider_url,
+        timeout=httpx.Timeout(settings.payment_provider_timeout_s, connect=settings.payment_provider_connect_timeout_s),
+        limits=httpx.Limits(
+            max_connections=settings.payment_provider_max_connections,
+            max_keepalive_connections=settings.payment_provider_max_connections,
+        ),
+        transport=transport,
+    )
+
+
+class HttpPaymentProvider:
+    """Async client for a card/BLIK-style provider REST API.
+
+    Concurrency is capped by a semaphore; a caller that cannot get a slot within
+    `acquire_timeout_s` fails fast instead of queueing behind a slow provider.
+    Transport errors, 429 and 5xx are retried with full-jitter exponential backoff.
+    """
+
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        name: str | None = None,
+        max_concurrency: int | None = None,
+        retries: int | None = None,
+        backoff_base_s: float | None = None,
+        backoff_max_s: float | None = None,
+        acquire_timeout_s: float | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.client = client
+        self.name = name or settings.payment_provider_name
+        self.retries = settings.payment_provider_retries if retries is None else retries
+        self.backoff_base_s = settings.payment_provider_backoff_base_s if backoff_base_s is None else backoff_base_s
+        self.backoff_max_s = settings.payment_provider_backoff_max_s if backoff_max_s is None else backoff_max_s
+        self.acquire_timeout_s = (
+            settings.payment_provider_acquire_timeout_s if acquire_timeout_s is None else acquire_timeout_s
+        )
+        self._slots = asyncio.Semaphore(max_concurrency or settings.payment_provider_max_concurrency)
+        self.breaker = breaker or CircuitBreaker(
+            settings.payment_provider_breaker_failures, settings.payment_provider_breaker_reset_s
+        )
+
+    async def create_payment(self, order_id: int, amount_pln: int, idempotency_key: str) -> PaymentIntent:
+        data = await self._request(
+            "POST",
+            "/payments",
+            json={"order_id": order_id, "amount": amount_pln, "currency": "PLN"},
+            headers={"Idempotency-Key": idempotency_key},
+        )
+        return PaymentIntent(
+            provider=self.name,
+            provider_ref=data["id"],
+            status=data["status"],
+            redirect_url=data.get("redirect_url"),
+        )
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        if not self.breaker.allow():
+            raise ProviderUnavailable("Payment provider circuit open", self.breaker.retry_after())
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout_s)
+        except asyncio.TimeoutError:
+            # nie liczymy jako błąd providera - to nasze własne ograniczenie
+            self.breaker.release()
+            raise ProviderUnavailable("Too many payment provider calls in flight")
+
+        try:
+            response = await self._send_with_retries(method, path, **kwargs)
+        except PaymentRejected:
+            self.breaker.record_success()
+            raise
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        return response.json()
+
+    async def _send_with_retries(self, method: str, path: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, **kwargs)
+                if response.status_code not in self.RETRYABLE_STATUS:
+                    if response.is_error:
+                        raise PaymentRejected(f"Provider returned {response.status_code}")
+                    return response
+                error: Exception = PaymentProviderError(f"Provider returned {response.status_code}")
+            except httpx.TransportError as exc:
+                error = exc
+
+            if attempt >= self.retries:
+                raise PaymentProviderError(f"Payment provider request failed: {error}") from error
+            delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2**attempt))
+            logger.info("Retrying %s %s in %.2fs after %s", method, path, delay, error)
+            await asyncio.sleep(delay)
+            attempt += 1
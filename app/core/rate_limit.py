@@ -0,0 +1,197 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Protocol
+
+from app.core.config import settings
+
+
+class LimiterStore(Protocol):
+    def hit(self, key: str, limit: int, window_s: float, now: float) -> float | None:
+        """Record an attempt for `key` unless it is over the limit.
+
+        Returns None when allowed, otherwise seconds until the next attempt is allowed.
+        """
+        ...
+
+
+class MemoryLimiterStore:
+    """Per-process sliding windows kept as fixed-size ring buffers of timestamps.
+
+    Each key costs one `array('d')` of `limit` floats plus a cursor; the oldest
+    attempt sits under the cursor, so a check is O(1). At most `max_keys` keys are
+    tracked (LRU), which bounds memory under a spray of random emails/IPs.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._rings: OrderedDict[str, list] = OrderedDict()  # key -> [array, cursor]
+
+    def hit(self, key: str, limit: int, window_s: float, now: float) -> float | None:
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None or len(ring[0]) != limit:
+                ring = [array("d", [float("-inf")]) * limit, 0]
+                self._rings[key] = ring
+                if len(self._rings) > self.max_keys:
+                    self._rings.popitem(last=False)
+            else:
+                self._rings.move_to_end(key)
+
+            buf, cursor = ring
+            oldest = buf[cursor]
+            if now - oldest < window_s:
+                return window_s - (now - oldest)
+            buf[cursor] = now
+            ring[1] = (cursor + 1) % limit
+            return None
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+
+class SqliteLimiterStore:
+    """Shared windows in a small SQLite file so every worker process sees the same counts.
+
+    A hit only trims its own key; rows of keys that never come back (one-off IPs and
+    emails) are swept out by a table-wide purge run at most once per window.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = float("-inf")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS login_attempts (key TEXT NOT NULL, ts REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_login_attempts_key_ts ON login_attempts (key, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_login_attempts_ts ON login_attempts (ts)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: int, window_s: float, now: float) -> float | None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if now - self._last_purge >= window_s:
+                conn.execute("DELETE FROM login_attempts WHERE ts <= ?", (now - window_s,))
+                self._last_purge = now
+            else:
+                conn.execute("DELETE FROM login_attempts WHERE key = ? AND ts <= ?", (key, now - window_s))
+            count, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(ts) FROM login_attempts WHERE key = ?", (key,)
+            ).fetchone()
+            if count >= limit:
+                conn.execute("COMMIT")
+                return window_s - (now - oldest)
+            conn.execute("INSERT INTO login_attempts (key, ts) VALUES (?, ?)", (key, now))
+            conn.execute("COMMIT")
+            return None
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(DISTINCT key) FROM login_attempts").fetchone()[0]
+
+
+class LoginThrottle:
+    """Sliding-window limits on login attempts per client IP and per email.
+
+    Checked before the user lookup and bcrypt, so rejected attempts cost no CPU.
+    """
+
+    def __init__(
+        self,
+        store: LimiterStore,
+        ip_limit: int,
+        email_limit: int,
+        window_s: float,
+        clock=time.time,
+    ):
+        self.store = store
+        self.ip_limit = ip_limit
+        self.email_limit = email_limit
+        self.window_s = window_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._metrics = {"allowed": 0, "throttled_ip": 0, "throttled_email": 0}
+
+    @property
+    def blocking(self) -> bool:
+        """True when a check does I/O and should run off the event loop."""
+        return not isinstance(self.store, MemoryLimiterStore)
+
+    def check(self, ip: str | None, email: str) -> float | None:
+        """Returns None if the attempt may proceed, else the Retry-After in seconds."""
+        now = self._clock()
+        if ip:
+            retry = self.store.hit(f"ip:{ip}", self.ip_limit, self.window_s, now)
+            if retry is not None:
+                self._count("throttled_ip")
+                return retry
+        retry = self.store.hit(f"email:{email.strip().lower()}", self.email_limit, self.window_s, now)
+        if retry is not None:
+            self._count("throttled_email")
+            return retry
+        self._count("allowed")
+        return None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            out = dict(self._metrics)
+        out["throttled_total"] = out["throttled_ip"] + out["throttled_email"]
+        out["tracked_keys"] = len(self.store)
+        return out
+
+    def reset_metrics(self) -> None:
+        with self._lock:
+            for k in self._metrics:
+                self._metrics[k] = 0
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+
+def client_ip(client_host: str | None, forwarded_for: str | None) -> str | None:
+    """Address of the real client when the app sits behind trusted reverse proxies.
+
+    X-Forwarded-For is honoured only if the direct peer is in `login_throttle_trusted_proxies`;
+    the rightmost entry that is not a trusted proxy is the client (entries further left
+    are supplied by the client and can be forged).
+    """
+    trusted = settings.login_throttle_trusted_proxies
+    if not client_host or client_host not in trusted or not forwarded_for:
+        return client_host
+    hops = [h.strip() for h in forwarded_for.split(",") if h.strip()]
+    for hop in reversed(hops):
+        if hop not in trusted:
+            return hop
+    return hops[0] if hops else client_host
+
+
+def _build_login_throttle() -> LoginThrottle:
+    if settings.login_throttle_sqlite_path:
+        store: LimiterStore = SqliteLimiterStore(settings.login_throttle_sqlite_path)
+    else:
+        store = MemoryLimiterStore(settings.login_throttle_max_keys)
+    return LoginThrottle(
+        store,
+        ip_limit=settings.login_throttle_ip_limit,
+        email_limit=settings.login_throttle_email_limit,
+        window_s=settings.login_throttle_window_s,
+    )
+
+
+login_throttle = _build_login_throttle()
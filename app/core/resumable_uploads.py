@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from uuid import uuid4
+
+import anyio
+import anyio.to_thread
+
+from app.core.uploads import SNIFF_BYTES, StoredUpload, UploadRejected, place_content_addressed, sniff_image_type
+
+try:  # blokada między procesami; bez fcntl (Windows) zostaje tylko kontrola offsetu
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass
+class UploadSession:
+    id: str
+    size: int
+    created_at: float
+    owner_id: int | None = None
+    caption: str | None = None
+    is_public: bool = True
+    offset: int = 0  # not persisted - always the current size of the data file
+
+
+class UploadSessionStore:
+    """Resumable uploads kept on disk: `<id>.json` (metadata) + `<id>.bin` (bytes so far).
+
+    The data file's length is the authoritative offset, so a session survives restarts
+    and any worker can continue it. Appends to one session are serialised with an
+    exclusive flock; a concurrent PATCH gets 409 instead of interleaving bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl_s: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+
+    def create(self, size: int, owner_id: int | None, caption: str | None, is_public: bool) -> UploadSession:
+        if size <= 0:
+            raise UploadRejected(400, "Upload size must be positive")
+        if size > self.max_bytes:
+            raise UploadRejected(413, f"File exceeds {self.max_bytes} bytes")
+        os.makedirs(self.directory, exist_ok=True)
+        session = UploadSession(
+            id=uuid4().hex, size=size, created_at=time.time(), owner_id=owner_id, caption=caption, is_public=is_public
+        )
+        meta = asdict(session)
+        meta.pop("offset")
+        tmp = self._path(session.id, ".json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        open(self._path(session.id, ".bin"), "xb").close()
+        os.replace(tmp, self._path(session.id, ".json"))
+        return session
+
+    def get(self, session_id: str) -> UploadSession | None:
+        if not _SESSION_ID.match(session_id):
+            return None
+        try:
+            with open(self._path(session_id, ".json")) as f:
+                session = UploadSession(**json.load(f))
+            session.offset = os.path.getsize(self._path(session_id, ".bin"))
+        except FileNotFoundError:
+            return None
+        if session.created_at + self.ttl_s < time.time():
+            self.delete(session_id)
+            return None
+        return session
+
+    async def append(self, session: UploadSession, offset: int, chunks) -> int:
+        """Append the request body at `offset`; returns the new offset.
+
+        A mismatched offset (lost response, duplicate retry) is answered with 409 so the
+        client can ask for the current offset and resend only what is missing.
+        """
+        # blokada i stat to blokujące I/O - poza pętlą zdarzeń
+        fd = await anyio.to_thread.run_sync(self._lock, session.id)
+        try:
+            current = await anyio.to_thread.run_sync(os.path.getsize, self._path(session.id, ".bin"))
+            if offset != current:
+                raise UploadRejected(409, f"Offset mismatch, expected {current}")
+            written = current
+            # typ pliku sprawdzamy od razu na pierwszych bajtach, nie dopiero przy finalizacji
+            head = bytearray() if current == 0 else None
+            # przerwane połączenie: zostaje to, co już doszło - klient wznowi od tego offsetu
+            async with await anyio.open_file(self._path(session.id, ".bin"), "ab") as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if written + len(chunk) > session.size:
+                        raise UploadRejected(413, f"Upload exceeds declared size {session.size}")
+                    if head is not None:
+                        head += chunk[: SNIFF_BYTES - len(head)]
+                        if len(head) >= min(SNIFF_BYTES, session.size):
+                            if sniff_image_type(bytes(head)) is None:
+                                raise UploadRejected(400, "File must be an image")
+                            head = None
+                    await f.write(chunk)
+                    written += len(chunk)
+            return written
+        finally:
+            self._unlock(fd)
+
+    def finalize(self, session: UploadSession, upload_dir: str) -> StoredUpload:
+        """Verify the upload is complete and move it to its content address in `upload_dir`.
+
+        Blocking (hashes the whole file); run it in a worker thread.
+        """
+        with self._locked(session.id):
+            data_path = self._path(session.id, ".bin")
+            size = os.path.getsize(data_path)
+            if size != session.size:
+                raise UploadRejected(409, f"Upload incomplete: {size} of {session.size} bytes")
+            h = hashlib.sha256()
+            with open(data_path, "rb") as f:
+                head = f.read(SNIFF_BYTES)
+                h.update(head)
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            sniffed = sniff_image_type(head)
+            if sniffed is None:
+                raise UploadRejected(400, "File must be an image")
+            content_type, ext = sniffed
+            stored = place_content_addressed(data_path, upload_dir, h.hexdigest(), content_type, ext, size)
+        self.delete(session.id)
+        return stored
+
+    def delete(self, session_id: str) -> None:
+        for suffix in (".json", ".bin", ".lock"):
+            try:
+                os.remove(self._path(session_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def purge_expired(self) -> int:
+        """Remove sessions older than the TTL; returns how many were dropped."""
+        if not os.path.isdir(self.directory):
+            return 0
+        purged = 0
+        cutoff = time.time() - self.ttl_s
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                    self.delete(entry.name[: -len(".json")])
+                    purged += 1
+        return purged
+
+    def _path(self, session_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{session_id}{suffix}")
+
+    def _lock(self, session_id: str) -> int | None:
+        """Take the session's exclusive flock without waiting; 409 if another request holds it."""
+        if fcntl is None:
+            return None
+        fd = os.open(self._path(session_id, ".lock"), os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise UploadRejected(409, "Upload is busy")
+        return fd
+
+    @staticmethod
+    def _unlock(fd: int | None) -> None:
+        if fd is not None:
+            os.close(fd)
+
+    @contextmanager
+    def _locked(self, session_id: str):
+        fd = self._lock(session_id)
+        try:
+            yield
+        finally:
+            self._unlock(fd)
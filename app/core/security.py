@@ -7,14 +7,24 @@ JWT_ALG = "HS256"
 JWT_EXPIRES_MIN = 60 * 24  # 24h
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+def hash_password(password: str, rounds: int | None = None) -> str:
+    salt = bcrypt.gensalt(rounds=rounds or settings.bcrypt_rounds)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
 
 
+def password_needs_rehash(password_hash: str, rounds: int | None = None) -> bool:
+    """True when the hash was made with a different bcrypt cost than configured ($2b$<cost>$...)."""
+    try:
+        cost = int(password_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return cost != (rounds or settings.bcrypt_rounds)
+
+
 def create_access_token(sub: str) -> str:
     now = datetime.now(UTC)
     payload = {
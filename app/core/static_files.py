@@ -0,0 +1,202 @@
+import gzip
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import settings
+
+try:  # brotli jest opcjonalny - bez niego generujemy tylko .gz
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml", ".map"}
+# (kodowanie, rozszerzenie rodzeństwa) w kolejności preferencji
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# <sha256>.<ext>, <sha256>-640w.<ext> (uploady) albo app.3f9a1c2b.js (build)
+_HASHED_NAME = re.compile(r"^[0-9a-f]{64}(-\d+w)?\.\w+$|\.[0-9a-f]{8,}\.\w+$")
+
+
+def cache_control_for(path: str) -> str:
+    name = os.path.basename(path)
+    if _HASHED_NAME.search(name):
+        return IMMUTABLE
+    if name.endswith(".html"):
+        return REVALIDATE
+    return f"public, max-age={settings.static_max_age_s}"
+
+
+class TTLCache:
+    """Small thread-safe LRU whose entries expire after `ttl_s`."""
+
+    def __init__(self, ttl_s: float, maxsize: int = 4096, clock=time.monotonic):
+        self.ttl_s = ttl_s
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                return default
+            return entry[0]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_MISSING = object()
+
+
+class StatCache(TTLCache):
+    """os.stat results (None = file absent) cached for a couple of seconds."""
+
+    def stat(self, path: str) -> os.stat_result | None:
+        result = self.get(path, _MISSING)
+        if result is _MISSING:
+            try:
+                result = os.stat(path)
+            except (FileNotFoundError, NotADirectoryError):
+                result = None
+            self.put(path, result)
+        return result
+
+
+stat_cache = StatCache(settings.static_stat_cache_ttl_s)
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with Cache-Control, precompressed .br/.gz siblings and a stat cache.
+
+    Content-hashed names get a year-long immutable lifetime, HTML must revalidate
+    (ETag/Last-Modified from FileResponse), everything else gets `static_max_age_s`.
+    """
+
+    def __init__(self, *args, stat_cache: StatCache = stat_cache, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stat_cache = stat_cache
+
+    def lookup_path(self, path: str) -> tuple[str, os.stat_result | None]:
+        # ukryte katalogi/pliki (np. uploads/.sessions z niedokończonymi uploadami) nie są serwowane
+        if any(part.startswith(".") for part in path.replace("\\", "/").split("/")):
+            return "", None
+        # Trafienia (realpath + stat) trzymamy krótko; brak pliku nie jest cache'owany,
+        # żeby świeżo wgrany upload był widoczny od razu.
+        key = (id(self), path)
+        found = self.stat_cache.get(key)
+        if found is None:
+            found = super().lookup_path(path)
+            if found[1] is not None:
+                self.stat_cache.put(key, found)
+        return found
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers = {"Cache-Control": cache_control_for(full_path)}
+        served_path, served_stat = full_path, stat_result
+
+        if os.path.splitext(full_path)[1] in COMPRESSIBLE_EXTENSIONS:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted:
+                    continue
+                sibling = self.stat_cache.stat(full_path + suffix)
+                if sibling is not None and sibling.st_mtime >= stat_result.st_mtime:
+                    served_path, served_stat = full_path + suffix, sibling
+                    headers["Content-Encoding"] = encoding
+                    break
+
+        response = FileResponse(
+            served_path,
+            status_code=status_code,
+            stat_result=served_stat,
+            headers=headers,
+            media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def precompress_directory(directory: str, min_size: int = 1024) -> int:
+    """Write .gz (and .br when brotli is installed) next to compressible files that are
+    missing or older than their source; returns the number of files written."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            if st.st_size < min_size:
+                continue
+            data = None
+            for _, suffix in ENCODINGS:
+                if suffix == ".br" and brotli is None:
+                    continue
+                target = path + suffix
+                try:
+                    if os.stat(target).st_mtime >= st.st_mtime:
+                        continue
+                except FileNotFoundError:
+                    pass
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                payload = brotli.compress(data) if suffix == ".br" else gzip.compress(data, compresslevel=9, mtime=0)
+                tmp = f"{target}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, target)
+                written += 1
+    return written
+
+
+if __name__ == "__main__":
+    # Krok builda: python -m app.core.static_files app/static frontend
+    import sys
+
+    for d in sys.argv[1:] or ["app/static", "frontend"]:
+        print(d, precompress_directory(d))
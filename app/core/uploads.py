@@ -0,0 +1,270 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from uuid import uuid4
+
+import anyio
+import anyio.to_thread
+from python_multipart.multipart import MultipartParseError, MultipartParser, parse_options_header
+from starlette.requests import Request
+
+# Sygnatury sprawdzamy na pierwszych bajtach pliku, nie ufamy Content-Type od klienta
+SNIFF_BYTES = 12
+MAX_FORM_FIELD_BYTES = 64 * 1024
+PART_SUFFIX = ".part"
+
+
+class UploadRejected(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    filename: str
+    path: str
+    content_type: str
+    size: int
+    sha256: str
+    deduplicated: bool = False  # identical bytes were already on disk; nothing new was written
+
+
+def sniff_image_type(head: bytes) -> tuple[str, str] | None:
+    """(content_type, extension) from the magic bytes, or None if it is not a supported image."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg", "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png", "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif", "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    return None
+
+
+def content_address(sha256: str, ext: str) -> str:
+    return f"{sha256}.{ext}"
+
+
+def place_content_addressed(
+    temp_path: str, directory: str, sha256: str, content_type: str, ext: str, size: int
+) -> StoredUpload:
+    """Move a fully written temp file to `<directory>/<sha256>.<ext>`, or drop it if that
+    content is already stored. `temp_path` must be on the same filesystem as `directory`."""
+    filename = content_address(sha256, ext)
+    final_path = os.path.join(directory, filename)
+    deduplicated = os.path.exists(final_path)
+    if deduplicated:
+        os.remove(temp_path)
+        os.utime(final_path)  # świeży mtime chroni plik przed GC, zanim powstanie wiersz w bazie
+    else:
+        # temp leży w tym samym systemie plików (ten sam katalog / .sessions), więc rename jest atomowy
+        os.replace(temp_path, final_path)
+    return StoredUpload(
+        filename=filename,
+        path=final_path,
+        content_type=content_type,
+        size=size,
+        sha256=sha256,
+        deduplicated=deduplicated,
+    )
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class StreamingUploadWriter:
+    """Writes an upload chunk by chunk into `directory`, hashing and counting as it goes.
+
+    Bytes land in a `<uuid>.<ext>.part` file opened once the first SNIFF_BYTES have
+    arrived and the type is known. `finish()` renames it to its content address
+    `<sha256>.<ext>`, or drops it if that file already exists. Anything that goes wrong
+    (size cap, unknown type, client disconnect) should be followed by `abort()`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._head: bytearray | None = bytearray()
+        self._hash = hashlib.sha256()
+        self._file = None
+        self._path: str | None = None
+        self._content_type: str | None = None
+        self._ext: str | None = None
+
+    async def write(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadRejected(413, f"File exceeds {self.max_bytes} bytes")
+        if self._head is not None:
+            self._head += chunk
+            if len(self._head) < SNIFF_BYTES:
+                return
+            chunk = await self._open()
+        self._hash.update(chunk)
+        await self._file.write(chunk)
+
+    async def finish(self) -> StoredUpload:
+        if self._head is not None:
+            if not self._head:
+                raise UploadRejected(400, "Empty file")
+            chunk = await self._open()
+            self._hash.update(chunk)
+            await self._file.write(chunk)
+        await self._file.aclose()
+        self._file = None
+
+        # stat/replace/remove na dysku - w wątku, nie w pętli zdarzeń
+        stored = await anyio.to_thread.run_sync(
+            place_content_addressed,
+            self._path,
+            self.directory,
+            self._hash.hexdigest(),
+            self._content_type,
+            self._ext,
+            self.size,
+        )
+        self._path = None
+        return stored
+
+    async def abort(self) -> None:
+        if self._file is not None:
+            await self._file.aclose()
+            self._file = None
+        if self._path is not None:
+            await anyio.to_thread.run_sync(_remove_quietly, self._path)
+
+    async def _open(self) -> bytes:
+        head, self._head = bytes(self._head), None
+        sniffed = sniff_image_type(head)
+        if sniffed is None:
+            raise UploadRejected(400, "File must be an image")
+        self._content_type, self._ext = sniffed
+        self._path = os.path.join(self.directory, f"{uuid4()}.{self._ext}{PART_SUFFIX}")
+        self._file = await anyio.open_file(self._path, "xb")
+        return head
+
+
+class _FormCollector:
+    """python-multipart callbacks: small text fields are kept, bytes of `file_field` are queued."""
+
+    def __init__(self, file_field: str):
+        self.file_field = file_field
+        self.fields: dict[str, str] = {}
+        self.saw_file = False
+        self.pending: list[bytes] = []
+        self._field_bytes = 0
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._name: str | None = None
+        self._is_file = False
+        self._data = bytearray()
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        }
+
+    def drain(self) -> list[bytes]:
+        chunks, self.pending = self.pending, []
+        return chunks
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+        self._name = None
+        self._is_file = False
+        self._data = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name")
+        if name is None:
+            raise UploadRejected(400, "Malformed multipart body")
+        self._name = name.decode("utf-8", "replace")
+        if b"filename" in options:
+            if self._name != self.file_field or self.saw_file:
+                raise UploadRejected(400, f"Expected a single file in field '{self.file_field}'")
+            self._is_file = self.saw_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._is_file:
+            self.pending.append(data[start:end])
+            return
+        self._field_bytes += end - start
+        if self._field_bytes > MAX_FORM_FIELD_BYTES:
+            raise UploadRejected(413, "Form fields too large")
+        self._data += data[start:end]
+
+    def _on_part_end(self) -> None:
+        if not self._is_file and self._name is not None:
+            self.fields[self._name] = self._data.decode("utf-8", "replace")
+
+
+async def receive_upload(
+    request: Request,
+    directory: str,
+    max_bytes: int,
+    file_field: str = "file",
+) -> tuple[StoredUpload, dict[str, str]]:
+    """Streams a multipart/form-data body straight into `directory`.
+
+    The file part is written as it arrives (no spooling), capped at `max_bytes`,
+    type-checked from its first bytes and hashed in the same pass. Returns the stored
+    file and the remaining text fields.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MAX_FORM_FIELD_BYTES:
+        raise UploadRejected(413, f"File exceeds {max_bytes} bytes")
+
+    ctype, params = parse_options_header(request.headers.get("content-type", ""))
+    if ctype != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadRejected(415, "Expected multipart/form-data")
+
+    collector = _FormCollector(file_field)
+    parser = MultipartParser(params[b"boundary"], collector.callbacks())
+    writer = StreamingUploadWriter(directory, max_bytes)
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for data in collector.drain():
+                await writer.write(data)
+        parser.finalize()
+        for data in collector.drain():
+            await writer.write(data)
+        if not collector.saw_file:
+            raise UploadRejected(422, f"Field '{file_field}' is required")
+        stored = await writer.finish()
+    except MultipartParseError:
+        await writer.abort()
+        raise UploadRejected(400, "Malformed multipart body")
+    except BaseException:
+        await writer.abort()
+        raise
+    return stored, collector.fields
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import UserDB
+
+
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """Detached projection of the authenticated user handed to request handlers."""
+
+    id: int
+    email: str
+    full_name: str | None
+    is_active: bool
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user: UserDB) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=user.is_active,
+            is_admin=user.is_admin,
+        )
+
+
+class PrincipalCache:
+    """Bounded LRU of verified token -> CurrentUser with per-entry expiry.
+
+    Entries live for `ttl_s` at most and never past the token's own `exp`.
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[CurrentUser, float]] = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+
+    def get(self, token: str) -> CurrentUser | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= self._clock():
+                self._drop(token)
+                return None
+            self._entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: CurrentUser, token_exp: float | None = None) -> None:
+        expires_at = self._clock() + self.ttl_s
+        if token_exp is not None:
+            expires_at = min(expires_at, self._clock() + (token_exp - time.time()))
+        with self._lock:
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (principal, expires_at)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._drop(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, token: str) -> None:
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+
+principal_cache = PrincipalCache(settings.auth_cache_size, settings.auth_cache_ttl_s)
+
+# --- invalidation ---
+# Any flushed change to the cached fields (deactivation, admin promotion, ...) drops the
+# user's entries right away and once more after commit, so a request racing the
+# transaction cannot leave a stale principal behind.
+
+_CACHED_FIELDS = ("email", "full_name", "is_active", "is_admin", "password_hash")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    for obj in (*session.dirty, *session.deleted):
+        if not isinstance(obj, UserDB) or obj.id is None:
+            continue
+        state = inspect(obj)
+        if obj in session.deleted or any(state.attrs[f].history.has_changes() for f in _CACHED_FIELDS):
+            principal_cache.invalidate_user(obj.id)
+            session.info.setdefault("invalidated_user_ids", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop("invalidated_user_ids", ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session: Session) -> None:
+    session.info.pop("invalidated_user_ids", None)
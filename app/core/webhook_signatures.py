@@ -0,0 +1,17 @@
+import hashlib
+import hmac
+
+# Provider podpisuje surowe body: X-Webhook-Signature: sha256=<hex HMAC-SHA256(secret, body)>
+SIGNATURE_HEADER = "X-Webhook-Signature"
+_PREFIX = "sha256="
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    return _PREFIX + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str | None, body: bytes, header: str | None) -> bool:
+    """Constant-time check of the signature header; no secret or no header never verifies."""
+    if not secret or not header:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), header.strip())
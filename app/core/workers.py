@@ -0,0 +1,42 @@
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    """Daemon thread calling `fn` every `interval_s` seconds until stopped.
+
+    `fn` may return a truthy value to signal that more work is pending; the next
+    call then runs immediately instead of waiting for the interval.
+    """
+
+    def __init__(self, name: str, interval_s: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval_s = interval_s
+        self._fn = fn
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        busy = False
+        while not self._stop.wait(0 if busy else self.interval_s):
+            try:
+                busy = bool(self._fn())
+            except Exception:
+                busy = False
+                logger.exception("Worker %s failed", self.name)
@@ -2,22 +2,22 @@ import secrets
 from fastapi import Request, Response
 from sqlalchemy.orm import Session
 from app.db.models import CartDB
+from app.db.queries import cart_by_token
 
 COOKIE_NAME = "cart_token"
 
 def get_or_create_cart(db: Session, request: Request, response: Response) -> CartDB:
     token = request.cookies.get(COOKIE_NAME)
     if token:
-        cart = db.query(CartDB).filter(CartDB.token == token).first()
+        cart = db.execute(cart_by_token(token)).scalars().first()
         if cart and not cart.is_checked_out:
             return cart
 
     # Tworzymy nowy koszyk
     token = secrets.token_hex(32)
-    cart = CartDB(token=token)
+    cart = CartDB(token=token, items=[])  # pusta kolekcja jest już "załadowana" - bez SELECT po commicie
     db.add(cart)
     db.commit()
-    db.refresh(cart)
 
     # Ustawiamy ciasteczko
     response.set_cookie(COOKIE_NAME, token, httponly=True, samesite="lax")
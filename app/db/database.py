@@ -1,16 +1,91 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from app.core.config import settings
+from app.db.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.db.sqlite_tuning import install_sqlite_query_only, install_sqlite_tuning
+from app.db.slow_queries import slow_query_log
 
 
 class Base(DeclarativeBase):
-    pass
+    # wartości generowane po stronie bazy wracają w tym samym INSERT/UPDATE ... RETURNING
+    # (SQLite >= 3.35, PostgreSQL), a nie osobnym SELECT-em przy pierwszym odczycie
+    __mapper_args__ = {"eager_defaults": True}
 
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {},
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def pool_options(url: str, poolclass) -> dict:
+    """Pool settings from Settings; in-memory SQLite keeps its default single-connection pool."""
+    if is_memory_sqlite(url):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_s,
+    }
+
+
+# Sterowniki async dla dialektów, których używamy; jawny "+driver" w URL zostaje bez zmian
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """`sqlite:///x.db` -> `sqlite+aiosqlite:///x.db`, `postgresql://...` -> `postgresql+asyncpg://...`."""
+    parsed = make_url(url)
+    if "+" in parsed.drivername or parsed.drivername not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=f"{parsed.drivername}+{ASYNC_DRIVERS[parsed.drivername]}").render_as_string(
+        hide_password=False
+    )
+
+
+def _build_engines(url: str, read_only: bool = False) -> tuple[Engine, AsyncEngine]:
+    sync_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if url.startswith("sqlite") else {},
+        **pool_options(url, InstrumentedQueuePool),
+    )
+    async_engine = create_async_engine(async_database_url(url), **pool_options(url, InstrumentedAsyncQueuePool))
+    for e in (sync_engine, async_engine.sync_engine):
+        if settings.sqlite_tuning_enabled:
+            # WAL + busy_timeout: czytelnicy nie blokują zapisów, a zapisy czekają zamiast "database is locked"
+            install_sqlite_tuning(e)
+        if read_only:
+            install_sqlite_query_only(e)
+    return sync_engine, async_engine
+
+
+engine, async_engine = _build_engines(settings.database_url)
+
+# expire_on_commit=False: po commicie obiekty zachowują stan, bez refresh/leniwego przeładowania
+# (w async to byłby błąd MissingGreenlet)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Odczyty (GET): replika z database_read_url, a dla pliku SQLite osobna pula tylko do odczytu
+# (w WAL czytelnicy nie czekają na zapisy). In-memory SQLite i brak repliki -> ten sam silnik.
+if settings.database_read_url:
+    read_engine, async_read_engine = _build_engines(settings.database_read_url, read_only=True)
+elif settings.database_url.startswith("sqlite") and not is_memory_sqlite(settings.database_url):
+    read_engine, async_read_engine = _build_engines(settings.database_url, read_only=True)
+else:
+    read_engine, async_read_engine = engine, async_engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+if settings.slow_query_log_enabled:
+    # bez repliki silniki odczytu to te same obiekty - każdy instrumentujemy raz
+    for _engine in {engine, async_engine.sync_engine, read_engine, async_read_engine.sync_engine}:
+        slow_query_log.install(_engine)
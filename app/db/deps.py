@@ -1,9 +1,55 @@
-from typing import Generator
-from app.db.database import SessionLocal
+import math
+import time
+from typing import AsyncGenerator, Generator
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.database import AsyncReadSessionLocal, AsyncSessionLocal, ReadSessionLocal, SessionLocal
+
+# znacznik "niedawno pisał" - do kiedy (epoch) odczyty tego klienta idą na primary
+READ_PRIMARY_COOKIE = "db_primary_until"
 
 def get_db() -> Generator:
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+def stick_to_primary(response: Response) -> None:
+    """Route-level dependency for writes: the client's next reads go to the primary for
+    `db_read_your_writes_s`, so a lagging replica never hides what it just wrote."""
+    window = settings.db_read_your_writes_s
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        f"{time.time() + window:.3f}",
+        max_age=math.ceil(window),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def get_read_db(request: Request) -> Generator:
+    db = (SessionLocal if reads_from_primary(request) else ReadSessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with (AsyncSessionLocal if reads_from_primary(request) else AsyncReadSessionLocal)() as db:
+        yield db
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import os
+from datetime import datetime, UTC
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.uploads import content_address, sniff_image_type, SNIFF_BYTES
+from app.db.models import MediaBlobDB, MediaDB, MediaVariantDB, ProductDB
+
+logger = logging.getLogger(__name__)
+
+
+def acquire_blob(db: Session, sha256: str, filename: str, content_type: str, size_bytes: int) -> int:
+    """Add one reference to the blob (creating it if needed); returns the new ref_count.
+
+    Runs in the caller's transaction.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        stmt = dialect_insert(MediaBlobDB).values(
+            sha256=sha256,
+            filename=filename,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            ref_count=1,
+            created_at=datetime.now(UTC),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sha256"], set_={"ref_count": MediaBlobDB.ref_count + 1}
+        ).returning(MediaBlobDB.ref_count)
+        return db.execute(stmt).scalar_one()
+
+    result = db.execute(
+        update(MediaBlobDB).where(MediaBlobDB.sha256 == sha256).values(ref_count=MediaBlobDB.ref_count + 1)
+    )
+    if result.rowcount == 0:
+        try:
+            with db.begin_nested():
+                db.add(MediaBlobDB(
+                    sha256=sha256, filename=filename, content_type=content_type, size_bytes=size_bytes, ref_count=1
+                ))
+            return 1
+        except IntegrityError:
+            return acquire_blob(db, sha256, filename, content_type, size_bytes)
+    return db.execute(select(MediaBlobDB.ref_count).where(MediaBlobDB.sha256 == sha256)).scalar_one()
+
+
+def release_blob(db: Session, sha256: str | None) -> bool:
+    """Drop one reference; returns True when it was the last one (the blob row is deleted).
+
+    Media stored before content addressing has no blob row and counts as its own last
+    reference. The caller unlinks the files only after its transaction commits.
+    """
+    if sha256 is None:
+        return True
+    updated = db.execute(
+        update(MediaBlobDB).where(MediaBlobDB.sha256 == sha256).values(ref_count=MediaBlobDB.ref_count - 1)
+    ).rowcount
+    if updated == 0:
+        return True
+    removed = db.execute(
+        delete(MediaBlobDB).where(MediaBlobDB.sha256 == sha256, MediaBlobDB.ref_count <= 0)
+    ).rowcount
+    return removed == 1
+
+
+def remove_released_files(
+    db: Session, upload_dir: str, sha256: str | None, filenames: list[str], released_at: float
+) -> int:
+    """Unlink the files of a blob released by an already committed transaction; returns how many.
+
+    Between that commit and the unlink an upload of the same content may have found the
+    file on disk: it touches its mtime and then re-creates the blob row. Either sign keeps
+    the files - if they really end up unreferenced, the GC collects them later.
+    """
+    if sha256 is not None and db.execute(select(MediaBlobDB.sha256).where(MediaBlobDB.sha256 == sha256)).first():
+        db.rollback()
+        return 0
+    db.rollback()
+    removed = 0
+    for filename in filenames:
+        path = os.path.join(upload_dir, filename)
+        try:
+            if os.stat(path).st_mtime > released_at:
+                continue
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+    return removed
+
+
+def copy_sibling_variants(db: Session, media: MediaDB) -> bool:
+    """Reuse derivatives already rendered for another upload of the same content."""
+    sibling_id = db.execute(
+        select(MediaVariantDB.media_id)
+        .join(MediaDB, MediaDB.id == MediaVariantDB.media_id)
+        # tylko wiersze wskazujące plik bloba: pliki wiersza sprzed bloba (ten sam sha256, inna nazwa)
+        # kasuje jego delete, niezależnie od licznika referencji
+        .join(MediaBlobDB, (MediaBlobDB.sha256 == MediaDB.sha256) & (MediaBlobDB.filename == MediaDB.filename))
+        .where(MediaDB.sha256 == media.sha256, MediaDB.id != media.id)
+        .limit(1)
+    ).scalar_one_or_none()
+    if sibling_id is None:
+        return False
+    for v in db.execute(select(MediaVariantDB).where(MediaVariantDB.media_id == sibling_id)).scalars():
+        media.variants.append(MediaVariantDB(
+            width=v.width, height=v.height, format=v.format, filename=v.filename, url=v.url, size_bytes=v.size_bytes
+        ))
+    return True
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def adopt_legacy_media(db: Session, upload_dir: str, url_prefix: str = "/static/uploads") -> int:
+    """Move media uploaded before content addressing (no blob row) onto `<sha256>.<ext>`.
+
+    Byte-identical legacy files collapse into one blob; product image URLs pointing at the
+    old names are rewritten. Returns the number of rows adopted.
+    """
+    adopted = 0
+    rows = db.execute(
+        select(MediaDB)
+        .outerjoin(MediaBlobDB, MediaBlobDB.sha256 == MediaDB.sha256)
+        .where(MediaBlobDB.sha256.is_(None))
+    ).scalars().all()
+    for media in rows:
+        old_path = os.path.join(upload_dir, media.filename)
+        if not os.path.exists(old_path):
+            logger.warning("Media %s: file %s missing, skipped", media.id, media.filename)
+            continue
+        with open(old_path, "rb") as f:
+            sniffed = sniff_image_type(f.read(SNIFF_BYTES))
+        if sniffed is None:
+            logger.warning("Media %s: %s is not a supported image, skipped", media.id, media.filename)
+            continue
+        content_type, ext = sniffed
+        sha256 = _sha256_file(old_path)
+        filename = content_address(sha256, ext)
+        new_path = os.path.join(upload_dir, filename)
+        if os.path.exists(new_path):
+            os.remove(old_path)
+        else:
+            os.replace(old_path, new_path)
+
+        old_url, new_url = media.url, f"{url_prefix}/{filename}"
+        size_bytes = os.path.getsize(new_path)
+        acquire_blob(db, sha256, filename, content_type, size_bytes)
+        media.filename, media.url, media.sha256 = filename, new_url, sha256
+        media.content_type, media.size_bytes = content_type, size_bytes
+        db.execute(update(ProductDB).where(ProductDB.image_url == old_url).values(image_url=new_url))
+        db.commit()
+        adopted += 1
+    return adopted
+
+
+if __name__ == "__main__":
+    from app.db.database import SessionLocal
+    from app.api.media import UPLOAD_DIR
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as session:
+        print(f"adopted {adopt_legacy_media(session, UPLOAD_DIR)} legacy media rows")
@@ -0,0 +1,150 @@
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import MediaBlobDB, MediaDB, MediaVariantDB, ProductDB
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_LIMIT = 20
+# produkty mogą wskazywać plik wprost (image_url sprzed tabeli media, bez adopt_legacy_media)
+UPLOADS_URL_PREFIX = "/static/uploads/"
+
+
+@dataclass
+class MediaGcReport:
+    scanned_files: int = 0
+    skipped_recent: int = 0
+    orphaned_files: int = 0
+    deleted_files: int = 0
+    freed_bytes: int = 0
+    scanned_rows: int = 0
+    missing_files: int = 0
+    # tylko próbka nazw/id - pełna lista idzie do logu, raport ma stały rozmiar
+    orphan_samples: list[str] = field(default_factory=list)
+    missing_samples: list[str] = field(default_factory=list)
+
+
+def _referenced(db: Session, names: list[str]) -> set[str]:
+    stmt = union(
+        select(MediaDB.filename).where(MediaDB.filename.in_(names)),
+        select(MediaVariantDB.filename).where(MediaVariantDB.filename.in_(names)),
+        select(MediaBlobDB.filename).where(MediaBlobDB.filename.in_(names)),
+        select(func.substr(ProductDB.image_url, len(UPLOADS_URL_PREFIX) + 1)).where(
+            ProductDB.image_url.in_([UPLOADS_URL_PREFIX + n for n in names])
+        ),
+    )
+    return set(db.execute(stmt).scalars())
+
+
+def _scan_directory(upload_dir: str, batch_size: int):
+    batch = []
+    with os.scandir(upload_dir) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def sweep_orphaned_files(
+    db: Session, upload_dir: str, report: MediaGcReport, delete: bool, grace_s: float, batch_size: int
+) -> None:
+    """Find files no media, variant, blob or product row points at.
+
+    The directory is streamed with scandir and each batch is probed with one IN query,
+    so memory depends on `batch_size`, not on the number of files. Files younger than
+    `grace_s` belong to uploads that may still be in flight and are left alone.
+    """
+    for batch in _scan_directory(upload_dir, batch_size):
+        report.scanned_files += len(batch)
+        referenced = _referenced(db, [e.name for e in batch])
+        cutoff = time.time() - grace_s
+        for entry in batch:
+            if entry.name in referenced:
+                continue
+            st = entry.stat(follow_symlinks=False)
+            if st.st_mtime > cutoff:
+                report.skipped_recent += 1
+                continue
+            report.orphaned_files += 1
+            if len(report.orphan_samples) < SAMPLE_LIMIT:
+                report.orphan_samples.append(entry.name)
+            logger.info("Orphaned upload %s (%d bytes)", entry.name, st.st_size)
+            if not delete:
+                continue
+            # ponowne sprawdzenie tuż przed usunięciem - upload mógł właśnie zdeduplikować się na ten plik
+            if _referenced(db, [entry.name]) or os.stat(entry.path).st_mtime > cutoff:
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError:
+                logger.warning("Could not delete orphaned upload %s", entry.name, exc_info=True)
+                continue
+            report.deleted_files += 1
+            report.freed_bytes += st.st_size
+        db.rollback()  # nie trzymamy snapshotu/transakcji między paczkami
+
+
+def flag_missing_files(db: Session, upload_dir: str, report: MediaGcReport, batch_size: int) -> None:
+    """Report media and variant rows whose file is gone, walking each table in id order (keyset)."""
+    for model, label in ((MediaDB, "media"), (MediaVariantDB, "variant")):
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(model.id, model.filename).where(model.id > last_id).order_by(model.id).limit(batch_size)
+            ).all()
+            db.rollback()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            report.scanned_rows += len(rows)
+            for row in rows:
+                if os.path.exists(os.path.join(upload_dir, row.filename)):
+                    continue
+                report.missing_files += 1
+                if len(report.missing_samples) < SAMPLE_LIMIT:
+                    report.missing_samples.append(f"{label}:{row.id}")
+                logger.warning("File missing for %s %s: %s", label, row.id, row.filename)
+
+
+def collect_media_garbage(
+    db: Session,
+    upload_dir: str,
+    delete: bool = False,
+    grace_s: float | None = None,
+    batch_size: int | None = None,
+) -> MediaGcReport:
+    """Reconcile the upload directory with the media tables; dry run unless `delete`."""
+    grace = settings.media_gc_grace_s if grace_s is None else grace_s
+    size = batch_size or settings.media_gc_batch_size
+    report = MediaGcReport()
+    sweep_orphaned_files(db, upload_dir, report, delete, grace, size)
+    flag_missing_files(db, upload_dir, report, size)
+    return report
+
+
+if __name__ == "__main__":
+    # Uruchamiane z crona: python -m app.db.media_gc [--delete]
+    import sys
+    from dataclasses import asdict
+
+    from app.api.media import UPLOAD_DIR, upload_sessions
+    from app.db.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    delete = "--delete" in sys.argv[1:]
+    with SessionLocal() as session:
+        result = asdict(collect_media_garbage(session, UPLOAD_DIR, delete=delete))
+    if delete:
+        result["expired_upload_sessions"] = upload_sessions.purge_expired()
+    print(result)
@@ -0,0 +1,42 @@
+from collections import defaultdict
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.images import Derivative, build_srcset
+from app.db.models import MediaDB, MediaVariantDB
+
+
+def record_variants(db: Session, media_id: int, derivatives: list[Derivative], url_prefix: str) -> None:
+    """Replace the stored variants of a media row; a no-op if the media was deleted meanwhile."""
+    if db.get(MediaDB, media_id) is None:
+        return
+    db.execute(delete(MediaVariantDB).where(MediaVariantDB.media_id == media_id))
+    db.add_all(
+        MediaVariantDB(
+            media_id=media_id,
+            width=d.width,
+            height=d.height,
+            format=d.format,
+            filename=d.filename,
+            url=f"{url_prefix}/{d.filename}",
+            size_bytes=d.size_bytes,
+        )
+        for d in derivatives
+    )
+
+
+def srcsets_by_url(db: Session, urls) -> dict[str, dict[str, str]]:
+    """srcset per original media URL, for the given URLs, in a single query."""
+    urls = {u for u in urls if u}
+    if not urls:
+        return {}
+    rows = db.execute(
+        select(MediaDB.url, MediaVariantDB)
+        .join(MediaVariantDB, MediaVariantDB.media_id == MediaDB.id)
+        .where(MediaDB.url.in_(urls))
+    ).all()
+    grouped: dict[str, list] = defaultdict(list)
+    for url, variant in rows:
+        grouped[url].append(variant)
+    return {url: build_srcset(variants) for url, variants in grouped.items()}
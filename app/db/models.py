@@ -1,6 +1,6 @@
 from enum import StrEnum
 from datetime import datetime, UTC
-from sqlalchemy import Integer, String, Boolean, Text, DateTime, ForeignKey, UniqueConstraint, Enum
+from sqlalchemy import Integer, String, Boolean, Text, DateTime, ForeignKey, UniqueConstraint, Index, Enum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.database import Base
@@ -135,6 +135,8 @@ class OrderDB(Base):
     shipping_method: Mapped[ShippingMethod] = mapped_column(Enum(ShippingMethod, name="shippingmethod"), nullable=False)
     shipping_cost_pln: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     shipping_country: Mapped[str] = mapped_column(String(2), nullable=False, default="PL")
+    # ostatni seq zdarzenia w outboxie; podbijany UPDATE ... RETURNING (app/db/outbox.py)
+    outbox_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     items: Mapped[list["OrderItemDB"]] = relationship(
         back_populates="order",
@@ -144,11 +146,20 @@ class OrderDB(Base):
 
     __table_args__ = (
         UniqueConstraint("cart_id", name="uq_orders_cart_id"),
+        # historia klienta: WHERE email = ? ORDER BY created_at DESC
+        Index("ix_orders_email_created", "email", "created_at"),
+        # lista w panelu: ORDER BY created_at DESC LIMIT
+        Index("ix_orders_created_at", "created_at"),
+        # archiwizacja: WHERE status IN (...) AND created_at < ?
+        Index("ix_orders_status_created", "status", "created_at"),
+        # id trafia do orders_archive - SQLite nie może go wydać ponownie po usunięciu najnowszego wiersza
+        {"sqlite_autoincrement": True},
     )
 
 
 class OrderItemDB(Base):
     __tablename__ = "order_items"
+    __table_args__ = {"sqlite_autoincrement": True}  # id kopiowane do archiwum, jak w OrderDB
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -164,6 +175,16 @@ class OrderItemDB(Base):
 
 class MediaDB(Base):
     __tablename__ = "media"
+    __table_args__ = (
+        # galeria: WHERE is_public = ? ORDER BY created_at DESC (keyset)
+        Index("ix_media_public_created", "is_public", "created_at"),
+        # lista admina (include_hidden): ORDER BY created_at DESC bez filtra is_public
+        Index("ix_media_created_at", "created_at"),
+        # srcset produktów: WHERE url IN (...)
+        Index("ix_media_url", "url"),
+        # GC plików: WHERE filename IN (...)
+        Index("ix_media_filename", "filename"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     owner_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
@@ -172,10 +193,55 @@ class MediaDB(Base):
     caption: Mapped[str | None] = mapped_column(String(500), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
     is_public: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    content_type: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    size_bytes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+
+    variants: Mapped[list["MediaVariantDB"]] = relationship(
+        back_populates="media", cascade="all, delete-orphan", passive_deletes=True, lazy="selectin"
+    )
+
+
+class MediaBlobDB(Base):
+    """One stored file per distinct content; `ref_count` = number of MediaDB rows pointing at it."""
+
+    __tablename__ = "media_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+
+
+class MediaVariantDB(Base):
+    __tablename__ = "media_variants"
+    __table_args__ = (
+        UniqueConstraint("media_id", "width", "format", name="uq_media_variant"),
+        # GC plików: WHERE filename IN (...)
+        Index("ix_media_variants_filename", "filename"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    media_id: Mapped[int] = mapped_column(ForeignKey("media.id", ondelete="CASCADE"), nullable=False, index=True)
+    width: Mapped[int] = mapped_column(Integer, nullable=False)
+    height: Mapped[int] = mapped_column(Integer, nullable=False)
+    format: Mapped[str] = mapped_column(String(16), nullable=False)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    url: Mapped[str] = mapped_column(String(512), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    media: Mapped["MediaDB"] = relationship(back_populates="variants")
 
 
 class PaymentAttemptDB(Base):
     __tablename__ = "payment_attempts"
+    __table_args__ = (
+        # próba płatności zamówienia u danego providera (start płatności)
+        Index("ix_payment_attempts_order_provider", "order_id", "provider"),
+        {"sqlite_autoincrement": True},  # id kopiowane do archiwum, jak w OrderDB
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -184,3 +250,122 @@ class PaymentAttemptDB(Base):
     idempotency_key: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+
+
+class OrderStatusCounterDB(Base):
+    __tablename__ = "order_status_counters"
+
+    # jeden wiersz na status; utrzymywane transakcyjnie razem ze zmianą OrderDB.status
+    status: Mapped[str] = mapped_column(String(32), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+# --- ARCHIVE ---
+# Zamówienia SHIPPED/CANCELED starsze niż settings.order_archive_after_days są przenoszone
+# tutaj przez app.db.order_archive. Kolumny odpowiadają 1:1 tabelom "gorącym" + archived_at.
+
+class OrderArchiveDB(Base):
+    __tablename__ = "orders_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    cart_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    idempotency_key: Mapped[str | None] = mapped_column(String(128), nullable=True)
+
+    email: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    full_name: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    buyer_first_name: Mapped[str] = mapped_column(String(60), nullable=False)
+    buyer_last_name: Mapped[str] = mapped_column(String(80), nullable=False)
+    buyer_phone: Mapped[str] = mapped_column(String(20), nullable=False)
+    buyer_email: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    shipping_address_line1: Mapped[str] = mapped_column(String(120), nullable=False)
+    shipping_address_line2: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    shipping_city: Mapped[str] = mapped_column(String(80), nullable=False)
+    shipping_postal_code: Mapped[str] = mapped_column(String(10), nullable=False)
+    total_pln: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    shipping_method: Mapped[ShippingMethod] = mapped_column(Enum(ShippingMethod, name="shippingmethod"), nullable=False)
+    shipping_cost_pln: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    shipping_country: Mapped[str] = mapped_column(String(2), nullable=False, default="PL")
+    outbox_seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+
+    items: Mapped[list["OrderItemArchiveDB"]] = relationship(
+        back_populates="order",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+
+
+class OrderItemArchiveDB(Base):
+    __tablename__ = "order_items_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders_archive.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    qty: Mapped[int] = mapped_column(Integer, nullable=False)
+    unit_price_pln: Mapped[int] = mapped_column(Integer, nullable=False)
+    line_total_pln: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    order: Mapped["OrderArchiveDB"] = relationship(back_populates="items")
+
+
+class PaymentAttemptArchiveDB(Base):
+    __tablename__ = "payment_attempts_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders_archive.id", ondelete="CASCADE"), nullable=False, index=True)
+    provider: Mapped[str] = mapped_column(String(50), nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    idempotency_key: Mapped[str] = mapped_column(String(128), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class OutboxEventDB(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        UniqueConstraint("order_id", "seq", name="uq_outbox_order_seq"),
+        Index("ix_outbox_events_pending", "delivered_at", "id"),
+        Index("ix_outbox_events_unhandled", "handled_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # bez FK - zdarzenia przeżywają archiwizację zamówienia; (order_id, seq) pozostaje unikalne,
+    # bo id zamówień nie wracają do obiegu (sqlite_autoincrement na OrderDB)
+    order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)  # kolejny numer zdarzenia w obrębie zamówienia
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # JSON
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    delivered_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # lokalne handlery (app.core.events) przetworzyły zdarzenie - niezależnie od dostarczenia do sinków
+    handled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class PaymentInboxDB(Base):
+    __tablename__ = "payment_inbox"
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_payment_inbox_provider_event"),
+        Index("ix_payment_inbox_pending", "processed_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    provider: Mapped[str] = mapped_column(String(50), nullable=False)
+    event_id: Mapped[str] = mapped_column(String(128), nullable=False)  # id zdarzenia po stronie providera
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    order_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # surowy JSON callbacku
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    result: Mapped[str | None] = mapped_column(String(32), nullable=True)  # applied / ignored / error
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy import select, insert, delete, desc, literal, DateTime
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models import (
+    OrderDB,
+    OrderItemDB,
+    OrderStatus,
+    PaymentAttemptDB,
+    OrderArchiveDB,
+    OrderItemArchiveDB,
+    PaymentAttemptArchiveDB,
+)
+from app.db.queries import archived_orders_for_email, orders_for_email
+
+ARCHIVABLE_STATUSES = (OrderStatus.SHIPPED, OrderStatus.CANCELED)
+
+# (hot table, archive table) in insert order; deletes run in reverse
+_TABLE_PAIRS = (
+    (OrderDB.__table__, OrderArchiveDB.__table__),
+    (OrderItemDB.__table__, OrderItemArchiveDB.__table__),
+    (PaymentAttemptDB.__table__, PaymentAttemptArchiveDB.__table__),
+)
+
+
+def archive_orders(
+    db: Session,
+    older_than_days: int | None = None,
+    batch_size: int | None = None,
+    max_batches: int | None = None,
+) -> int:
+    """Move finished orders older than the cutoff into the archive tables.
+
+    Every batch is copied and deleted in its own transaction, so a long run never
+    holds locks on the hot tables for more than one chunk. Returns the number of
+    archived orders.
+    """
+    days = settings.order_archive_after_days if older_than_days is None else older_than_days
+    size = batch_size or settings.order_archive_batch_size
+    cutoff = datetime.now(UTC) - timedelta(days=days)
+
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.execute(
+            select(OrderDB.id)
+            .where(OrderDB.status.in_(ARCHIVABLE_STATUSES), OrderDB.created_at < cutoff)
+            .order_by(OrderDB.id)
+            .limit(size)
+        ).scalars().all()
+        if not ids:
+            break
+        try:
+            _move_batch(db, ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        archived += len(ids)
+        batches += 1
+    return archived
+
+
+def _move_batch(db: Session, order_ids: list[int]) -> None:
+    now = datetime.now(UTC)
+    for hot, archive in _TABLE_PAIRS:
+        cols = [c.name for c in hot.columns]
+        src = select(*hot.columns).where(_order_id_col(hot).in_(order_ids))
+        if "archived_at" in archive.columns:
+            cols.append("archived_at")
+            src = src.add_columns(literal(now, DateTime(timezone=True)))
+        db.execute(insert(archive).from_select(cols, src))
+
+    for hot, _ in reversed(_TABLE_PAIRS):
+        db.execute(delete(hot).where(_order_id_col(hot).in_(order_ids)))
+
+
+def _order_id_col(table):
+    return table.c.id if table is OrderDB.__table__ else table.c.order_id
+
+
+# --- read-through ---
+
+def find_order(db: Session, order_id: int) -> OrderDB | OrderArchiveDB | None:
+    """Order from the hot table, falling back to the archive."""
+    return db.get(OrderDB, order_id) or db.get(OrderArchiveDB, order_id)
+
+
+def list_orders_for_email(db: Session, email: str) -> list[OrderDB | OrderArchiveDB]:
+    hot = db.execute(orders_for_email(email)).scalars().all()
+    archived = db.execute(archived_orders_for_email(email)).scalars().all()
+    return _merge_newest_first(hot, archived)
+
+
+def list_recent_orders(db: Session, limit: int) -> list[OrderDB | OrderArchiveDB]:
+    hot = db.execute(select(OrderDB).order_by(desc(OrderDB.created_at)).limit(limit)).scalars().all()
+    archived = db.execute(
+        select(OrderArchiveDB).order_by(desc(OrderArchiveDB.created_at)).limit(limit)
+    ).scalars().all()
+    return _merge_newest_first(hot, archived)[:limit]
+
+
+def _merge_newest_first(hot, archived):
+    if not archived:
+        return list(hot)
+    return sorted([*hot, *archived], key=lambda o: o.created_at, reverse=True)
+
+
+if __name__ == "__main__":
+    # Uruchamiane z crona: python -m app.db.order_archive
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as session:
+        moved = archive_orders(session)
+    print({"archived": moved})
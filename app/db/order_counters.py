@@ -0,0 +1,114 @@
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db.models import OrderDB, OrderArchiveDB, OrderStatus, OrderStatusCounterDB
+
+
+def bump_order_status(db: Session, old_status: str | None, new_status: str | None) -> None:
+    """Move one order between status counters inside the caller's transaction."""
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        _add(db, old_status, -1)
+    if new_status is not None:
+        _add(db, new_status, 1)
+
+
+def _dialect_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert
+    if dialect == "postgresql":
+        return pg_insert
+    return None
+
+
+def _add(db: Session, status: str, delta: int) -> None:
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        # jeden upsert - dwie transakcje tworzące ten sam wiersz statusu nie kolidują na PK
+        stmt = dialect_insert(OrderStatusCounterDB).values(status=status, count=delta)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["status"], set_={"count": OrderStatusCounterDB.count + stmt.excluded.count}
+        ))
+        return
+
+    result = db.execute(
+        update(OrderStatusCounterDB)
+        .where(OrderStatusCounterDB.status == status)
+        .values(count=OrderStatusCounterDB.count + delta)
+    )
+    if result.rowcount == 0:
+        # Rows are seeded by the migration; this only happens on a fresh create_all() database.
+        db.add(OrderStatusCounterDB(status=status, count=delta))
+        db.flush()
+
+
+def read_order_counters(db: Session) -> dict[str, int]:
+    """Counts per status, read from the counters table (no scan of orders)."""
+    counts = {s.value: 0 for s in OrderStatus}
+    for status, count in db.execute(select(OrderStatusCounterDB.status, OrderStatusCounterDB.count)):
+        counts[status] = count
+    return counts
+
+
+def count_orders_by_status(db: Session) -> dict[str, int]:
+    """Authoritative counts computed with GROUP BY over the orders tables (slow path).
+
+    Archived orders keep counting, archival only moves rows between tables.
+    """
+    counts = {s.value: 0 for s in OrderStatus}
+    for model in (OrderDB, OrderArchiveDB):
+        stmt = select(model.status, func.count()).group_by(model.status)
+        for status, count in db.execute(stmt):
+            counts[status] = counts.get(status, 0) + count
+    return counts
+
+
+def reconcile_order_counters(db: Session) -> dict[str, int]:
+    """Rewrite counters from the orders tables and return the drift that was fixed.
+
+    Drift is reported as `stored - actual` for every status that was off.
+    """
+    # Lock the counter rows first so concurrent bumps wait until the recount is written.
+    # SQLite ignores FOR UPDATE: there the seeding upsert opens the write transaction, which
+    # holds the database write lock (bumps wait) until the commit below.
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is not None:
+        db.execute(
+            dialect_insert(OrderStatusCounterDB)
+            .values([{"status": s.value, "count": 0} for s in OrderStatus])
+            .on_conflict_do_nothing(index_elements=["status"])
+        )
+    stored = {
+        row.status: row
+        for row in db.execute(select(OrderStatusCounterDB).with_for_update()).scalars()
+    }
+    actual = count_orders_by_status(db)
+
+    drift: dict[str, int] = {}
+    for status in actual.keys() | stored.keys():
+        expected = actual.get(status, 0)
+        row = stored.get(status)
+        current = row.count if row else 0
+        if current == expected:
+            continue
+        drift[status] = current - expected
+        if row:
+            row.count = expected
+        else:
+            db.add(OrderStatusCounterDB(status=status, count=expected))
+
+    db.commit()
+    return drift
+
+
+if __name__ == "__main__":
+    # Uruchamiane z crona: python -m app.db.order_counters
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as session:
+        fixed = reconcile_order_counters(session)
+    print({"drift": fixed})
@@ -0,0 +1,91 @@
+import logging
+from datetime import datetime, UTC
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.events import OrderPlaced, subscribe
+from app.db.models import CustomerProfileDB, OrderDB, ProductDB
+
+logger = logging.getLogger(__name__)
+analytics_logger = logging.getLogger("lanari.analytics")
+
+
+@subscribe(OrderPlaced)
+def upsert_customer_profile(db: Session, event: OrderPlaced) -> None:
+    """Remember the buyer's checkout data from the order snapshot."""
+    order = db.get(OrderDB, event.order_id)
+    if not order:
+        return
+
+    values = dict(
+        first_name=order.buyer_first_name,
+        last_name=order.buyer_last_name,
+        phone=order.buyer_phone,
+        address_line1=order.shipping_address_line1,
+        address_line2=order.shipping_address_line2,
+        city=order.shipping_city,
+        postal_code=order.shipping_postal_code,
+        country=order.shipping_country,
+        updated_at=datetime.now(UTC),
+    )
+    # jeden upsert zamiast SELECT + INSERT - dwa równoległe pierwsze checkouty nie kolidują na user_id
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        db.execute(
+            dialect_insert(CustomerProfileDB)
+            .values(user_id=event.user_id, **values)
+            .on_conflict_do_update(index_elements=["user_id"], set_=values)
+        )
+        return
+
+    profile = db.execute(
+        select(CustomerProfileDB).where(CustomerProfileDB.user_id == event.user_id)
+    ).scalar_one_or_none()
+    if profile is None:
+        profile = CustomerProfileDB(user_id=event.user_id)
+        db.add(profile)
+    for k, v in values.items():
+        setattr(profile, k, v)
+
+
+@subscribe(OrderPlaced)
+def log_order_confirmation(db: Session, event: OrderPlaced) -> None:
+    """Log that the buyer's order confirmation was issued (no mail is sent from here)."""
+    logger.info("Order confirmation for order %s to %s", event.order_id, event.email)
+
+
+@subscribe(OrderPlaced)
+def alert_low_stock(db: Session, event: OrderPlaced) -> None:
+    order = db.get(OrderDB, event.order_id)
+    if not order:
+        return
+    product_ids = [it.product_id for it in order.items]
+    low = db.execute(
+        select(ProductDB.id, ProductDB.name, ProductDB.stock_qty).where(
+            ProductDB.id.in_(product_ids),
+            ProductDB.stock_qty <= settings.low_stock_threshold,
+        )
+    ).all()
+    for product_id, name, qty in low:
+        logger.warning("Low stock: product %s (%s) has %s left", product_id, name, qty)
+
+
+@subscribe(OrderPlaced)
+def record_order_analytics(db: Session, event: OrderPlaced) -> None:
+    order = db.get(OrderDB, event.order_id)
+    if not order:
+        return
+    analytics_logger.info(
+        "order_placed",
+        extra={
+            "order_id": order.id,
+            "total_pln": order.total_pln,
+            "items": sum(it.qty for it in order.items),
+            "shipping_method": str(order.shipping_method),
+        },
+    )
@@ -0,0 +1,178 @@
+import json
+import logging
+from datetime import datetime, UTC
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.events import OrderPlaced, dispatch
+from app.core.outbox_sinks import OutboxSink, sinks_from_settings
+from app.core.workers import PeriodicWorker
+from app.db.database import SessionLocal
+from app.db.models import OrderDB, OutboxEventDB
+
+logger = logging.getLogger(__name__)
+
+ORDER_PLACED = "order.placed"
+ORDER_STATUS_CHANGED = "order.status_changed"
+
+
+def add_order_event(db: Session, order: OrderDB, event_type: str, **extra) -> OutboxEventDB:
+    """Queue an event for `order` in the caller's transaction.
+
+    The event is committed (or rolled back) together with the change it describes.
+    """
+    seq = _next_seq(db, order)
+    payload = {
+        "order_id": order.id,
+        "status": str(order.status),
+        "email": order.email,
+        "total_pln": order.total_pln,
+        **extra,
+    }
+    event = OutboxEventDB(
+        order_id=order.id,
+        seq=seq,
+        event_type=event_type,
+        payload=json.dumps(payload),
+    )
+    db.add(event)
+    db.flush()
+    return event
+
+
+def _next_seq(db: Session, order: OrderDB) -> int:
+    # UPDATE blokuje wiersz zamówienia do końca transakcji, więc równoległe zmiany
+    # statusu (admin, worker płatności) dostają kolejne numery zamiast kolizji na uq_outbox_order_seq
+    bump = (
+        update(OrderDB)
+        .where(OrderDB.id == order.id)
+        .values(outbox_seq=OrderDB.outbox_seq + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        seq = db.execute(bump.returning(OrderDB.outbox_seq)).scalar_one()
+    else:
+        db.execute(bump)
+        seq = db.execute(select(OrderDB.outbox_seq).where(OrderDB.id == order.id)).scalar_one()
+    set_committed_value(order, "outbox_seq", seq)
+    return seq
+
+
+def relay_outbox(db: Session, sinks: list[OutboxSink], batch_size: int | None = None) -> int:
+    """Deliver one batch of pending events to every sink and return how many were sent.
+
+    Rows are marked delivered only after all sinks accepted the batch; on failure the
+    batch stays pending (attempts/last_error are recorded) and is retried as a whole
+    on the next run, which keeps per-order ordering intact.
+    """
+    rows = db.execute(
+        select(OutboxEventDB)
+        .where(OutboxEventDB.delivered_at.is_(None))
+        .order_by(OutboxEventDB.id)
+        .limit(batch_size or settings.outbox_batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not rows:
+        return 0
+
+    envelopes = [_envelope(row) for row in rows]
+    try:
+        for sink in sinks:
+            sink.deliver(envelopes)
+    except Exception as exc:
+        logger.warning("Outbox delivery of %s events failed: %s", len(rows), exc)
+        for row in rows:
+            row.attempts += 1
+            row.last_error = str(exc)[:500]
+        db.commit()
+        return 0
+
+    now = datetime.now(UTC)
+    for row in rows:
+        row.delivered_at = now
+        row.attempts += 1
+        row.last_error = None
+    db.commit()
+    return len(rows)
+
+
+def _envelope(row: OutboxEventDB) -> dict:
+    return {
+        "id": row.id,
+        "order_id": row.order_id,
+        "seq": row.seq,
+        "type": row.event_type,
+        "created_at": row.created_at.isoformat(),
+        "data": json.loads(row.payload),
+    }
+
+
+# --- lokalne handlery (profil klienta, alerty) ---
+# Zdarzenie zapisane w transakcji checkoutu jest trwałe; handled_at znaczy, że handlery już je widziały.
+
+def process_outbox_handlers(db: Session, batch_size: int | None = None) -> int:
+    """Run the post-commit handlers for one batch of unhandled events; returns rows handled.
+
+    Handlers and the `handled_at` marks commit together, so an event interrupted by a
+    crash is picked up again on the next run (at-least-once).
+    """
+    rows = db.execute(
+        select(OutboxEventDB)
+        .where(OutboxEventDB.handled_at.is_(None))
+        .order_by(OutboxEventDB.id)
+        .limit(batch_size or settings.outbox_batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not rows:
+        return 0
+
+    # handlery biorą zamówienie przez db.get - ładujemy paczkę raz i trzymamy referencje,
+    # żeby mapa tożsamości (słabe referencje) nie zgubiła ich między handlerami
+    orders = db.execute(select(OrderDB).where(OrderDB.id.in_({r.order_id for r in rows}))).scalars().all()
+    now = datetime.now(UTC)
+    try:
+        for row in rows:
+            event = _domain_event(row)
+            if event is not None:
+                dispatch(db, event)
+            row.handled_at = now
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+
+async def process_outbox_handlers_async(bind) -> int:
+    """`process_outbox_handlers` on an async engine - the post-response nudge without a worker."""
+    async with async_sessionmaker(bind=bind, autoflush=False)() as db:
+        return await db.run_sync(process_outbox_handlers)
+
+
+def _domain_event(row: OutboxEventDB) -> object | None:
+    if row.event_type == ORDER_PLACED:
+        data = json.loads(row.payload)
+        return OrderPlaced(order_id=row.order_id, user_id=data["user_id"], email=data["email"])
+    return None
+
+
+def build_outbox_handler_worker() -> PeriodicWorker:
+    def run_once() -> int:
+        with SessionLocal() as db:
+            return process_outbox_handlers(db)
+
+    return PeriodicWorker("outbox-handlers", settings.outbox_handler_interval_s, run_once)
+
+
+def build_outbox_worker() -> PeriodicWorker:
+    sinks = sinks_from_settings()
+
+    def run_once() -> int:
+        with SessionLocal() as db:
+            return relay_outbox(db, sinks)
+
+    return PeriodicWorker("outbox-relay", settings.outbox_relay_interval_s, run_once)
@@ -0,0 +1,135 @@
+import json
+import logging
+from datetime import datetime, UTC
+
+from sqlalchemy import select, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.workers import PeriodicWorker
+from app.db.database import SessionLocal
+from app.db.models import OrderDB, OrderStatus, PaymentAttemptDB, PaymentInboxDB, PaymentStatus
+from app.db.order_counters import bump_order_status
+from app.db.outbox import add_order_event, ORDER_STATUS_CHANGED
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_SUCCEEDED = "payment.succeeded"
+PAYMENT_FAILED = "payment.failed"
+
+# statusy, z których płatność może przenieść zamówienie na PAID
+_PAYABLE_STATUSES = (OrderStatus.NEW, OrderStatus.IN_PREPARATION)
+
+
+def ingest_payment_event(
+    db: Session, provider: str, event_id: str, event_type: str, order_id: int, payload: dict
+) -> bool:
+    """Append a provider callback to the inbox. Returns False for an already-seen event id."""
+    values = dict(
+        provider=provider,
+        event_id=event_id,
+        event_type=event_type,
+        order_id=order_id,
+        payload=json.dumps(payload),
+        received_at=datetime.now(UTC),
+    )
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        stmt = dialect_insert(PaymentInboxDB).values(**values).on_conflict_do_nothing(
+            index_elements=["provider", "event_id"]
+        )
+        inserted = db.execute(stmt).rowcount == 1
+        db.commit()
+        return inserted
+
+    try:
+        db.execute(insert(PaymentInboxDB).values(**values))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def process_payment_inbox(db: Session, batch_size: int | None = None) -> int:
+    """Apply one batch of pending callbacks in a single transaction; returns rows handled.
+
+    Payment attempts and orders for the whole batch are loaded with two queries. Each row
+    runs in its own savepoint: one that raises is rolled back alone and marked as an
+    error, so it cannot block the events queued behind it.
+    """
+    rows = db.execute(
+        select(PaymentInboxDB)
+        .where(PaymentInboxDB.processed_at.is_(None))
+        .order_by(PaymentInboxDB.id)
+        .limit(batch_size or settings.payment_inbox_batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not rows:
+        return 0
+
+    order_ids = {r.order_id for r in rows}
+    orders = {
+        o.id: o for o in db.execute(select(OrderDB).where(OrderDB.id.in_(order_ids))).scalars()
+    }
+    attempts = {
+        (p.order_id, p.provider): p
+        for p in db.execute(
+            select(PaymentAttemptDB).where(PaymentAttemptDB.order_id.in_(order_ids))
+        ).scalars()
+    }
+
+    now = datetime.now(UTC)
+    try:
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    result, error = _apply(
+                        db, row, orders.get(row.order_id), attempts.get((row.order_id, row.provider))
+                    )
+            except Exception as exc:
+                logger.exception("Payment inbox event %s/%s failed", row.provider, row.event_id)
+                result, error = "error", f"{type(exc).__name__}: {exc}"
+            row.result, row.error, row.processed_at = result, error, now
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+
+def _apply(db: Session, row: PaymentInboxDB, order: OrderDB | None, attempt: PaymentAttemptDB | None):
+    if order is None:
+        return "error", "Order not found"
+    if attempt is None:
+        return "error", "Payment attempt not found"
+
+    if row.event_type == PAYMENT_FAILED:
+        if attempt.status == PaymentStatus.SUCCEEDED:
+            return "ignored", "Payment already succeeded"
+        attempt.status = PaymentStatus.FAILED
+        return "applied", None
+
+    if row.event_type == PAYMENT_SUCCEEDED:
+        attempt.status = PaymentStatus.SUCCEEDED
+        if order.status not in _PAYABLE_STATUSES:
+            return "ignored", f"Order is {order.status}"
+        old_status = order.status
+        bump_order_status(db, old_status, OrderStatus.PAID)
+        order.status = OrderStatus.PAID
+        add_order_event(db, order, ORDER_STATUS_CHANGED, previous_status=str(old_status))
+        return "applied", None
+
+    return "error", f"Unknown event type {row.event_type}"
+
+
+def build_payment_inbox_worker() -> PeriodicWorker:
+    def run_once() -> int:
+        with SessionLocal() as db:
+            return process_payment_inbox(db)
+
+    return PeriodicWorker("payment-inbox", settings.payment_inbox_interval_s, run_once)
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# granice kubełków czasu oczekiwania na połączenie (ms); ostatni kubełek = powyżej
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """Checkout-wait histogram and timeout counter for one connection pool."""
+
+    def __init__(self, buckets_ms: tuple[float, ...] = WAIT_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(buckets_ms) + 1)
+        self._wait_sum_ms = 0.0
+        self._wait_max_ms = 0.0
+        self._timeouts = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self._counts[bisect_left(self.buckets_ms, ms)] += 1
+            self._wait_sum_ms += ms
+            self._wait_max_ms = max(self._wait_max_ms, ms)
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self._timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            wait_sum, wait_max, timeouts = self._wait_sum_ms, self._wait_max_ms, self._timeouts
+        # kubełki skumulowane ("le"), jak w histogramach Prometheusa
+        buckets, running = {}, 0
+        for bound, n in zip([*map(str, self.buckets_ms), "+Inf"], counts):
+            running += n
+            buckets[bound] = running
+        return {
+            "checkouts": running,
+            "checkout_timeouts": timeouts,
+            "wait_ms": {
+                "buckets": buckets,
+                "sum": round(wait_sum, 3),
+                "max": round(wait_max, 3),
+            },
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets_ms) + 1)
+            self._wait_sum_ms = self._wait_max_ms = 0.0
+            self._timeouts = 0
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout: waiting for a free slot or opening a new connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            logger.warning("DB pool checkout timed out after %ss: %s", self._timeout, self.status())
+            raise
+        self.metrics.observe_wait(time.perf_counter() - start)
+        return conn
+
+    def recreate(self):
+        # engine.dispose() tworzy nową pulę - statystyki zostają ciągłe
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(pool: Pool) -> dict:
+    """Current occupancy of `pool` plus its checkout metrics, when it is instrumented."""
+    out: dict = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        out.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # overflow() startuje od -size; na zewnątrz pokazujemy tylko połączenia ponad size
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout_s=pool.timeout(),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        out.update(metrics.snapshot())
+    return out
@@ -0,0 +1,61 @@
+"""Hot-path statements built with `lambda_stmt`.
+
+A lambda statement is constructed and its cache key computed once per call site;
+later calls only extract the new values of the closure variables as bound
+parameters and hit the compiled cache. Values must come in through closure
+variables (never computed inside the lambda), which is what keeps them parameters.
+"""
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import StatementLambdaElement
+
+from app.db.models import CartDB, CartItemDB, OrderArchiveDB, OrderDB, PaymentAttemptDB, ProductDB, UserDB
+
+
+def user_by_email(email: str) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(UserDB).where(UserDB.email == email))
+
+
+def cart_by_token(token: str) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(CartDB).where(CartDB.token == token))
+
+
+def cart_item(cart_id: int, product_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(CartItemDB).where(CartItemDB.cart_id == cart_id, CartItemDB.product_id == product_id)
+    )
+
+
+def products(active_only: bool) -> StatementLambdaElement:
+    stmt = lambda_stmt(lambda: select(ProductDB))
+    if active_only:
+        stmt += lambda s: s.where(ProductDB.is_active == True)  # noqa: E712
+    return stmt
+
+
+def products_by_ids(product_ids: list[int]) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(ProductDB).where(ProductDB.id.in_(product_ids)))
+
+
+def payment_attempt_by_key(idempotency_key: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(PaymentAttemptDB).where(PaymentAttemptDB.idempotency_key == idempotency_key)
+    )
+
+
+def order_for_cart(cart_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(OrderDB).where(OrderDB.cart_id == cart_id).options(selectinload(OrderDB.items))
+    )
+
+
+def orders_for_email(email: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(OrderDB).where(OrderDB.email == email).order_by(OrderDB.created_at.desc())
+    )
+
+
+def archived_orders_for_email(email: str) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(OrderArchiveDB).where(OrderArchiveDB.email == email).order_by(OrderArchiveDB.created_at.desc())
+    )
@@ -0,0 +1,142 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """SQL with literals replaced by `?` and IN lists collapsed, so the same query with
+    different values (or a different number of IN items) has one fingerprint."""
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class RequestQueryStats:
+    statements: int = 0
+    db_time_s: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+    scope: dict | None = field(default=None, repr=False)
+
+    @property
+    def route(self) -> str | None:
+        """`GET /api/orders/{order_id}` - the route template once routing has matched, else the path."""
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        return f"{self.scope.get('method', '')} {getattr(route, 'path', None) or self.scope.get('path', '')}"
+
+    def record(self, statement: str, elapsed_s: float) -> None:
+        self.statements += 1
+        self.db_time_s += elapsed_s
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n > threshold]
+
+
+# statystyki bieżącego żądania; None poza żądaniem (workery, CLI)
+current_stats: ContextVar[RequestQueryStats | None] = ContextVar("current_query_stats", default=None)
+
+# obserwatorzy zakończonych żądań: (method, path, stats) - używane przez testy budżetów zapytań
+_observers: list[Callable[[str, str, RequestQueryStats], None]] = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_stats_start"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_stats_start"):
+        conn.info["query_stats_start"].pop()
+
+
+class QueryStatsMiddleware:
+    """Counts SQL statements and DB time per HTTP request.
+
+    In debug the totals go out as `Server-Timing: db;dur=...;desc="N statements"`.
+    A statement fingerprint repeated more than `sql_n_plus_one_threshold` times in one
+    request is logged as a likely N+1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope=scope)
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.debug:
+                total_ms = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.db_time_s * 1000:.1f};desc="{stats.statements} statements", '
+                    f"app;dur={total_ms:.1f}"
+                )
+                message.setdefault("headers", []).append((b"server-timing", timing.encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope, stats: RequestQueryStats) -> None:
+        method, path = scope.get("method", ""), scope.get("path", "")
+        threshold = settings.sql_n_plus_one_threshold
+        if threshold:
+            for fp, count in stats.repeated(threshold):
+                logger.warning("Possible N+1 in %s %s: %d x %s", method, path, count, fp[:300])
+        for observer in list(_observers):
+            observer(method, path, stats)
+
+
+@contextmanager
+def record_requests():
+    """Collect `(method, path, stats)` for every request finished inside the block."""
+    records: list[tuple[str, str, RequestQueryStats]] = []
+
+    def observe(method: str, path: str, stats: RequestQueryStats) -> None:
+        records.append((method, path, stats))
+
+    _observers.append(observe)
+    try:
+        yield records
+    finally:
+        _observers.remove(observe)
@@ -0,0 +1,119 @@
+import logging
+import math
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.query_stats import current_stats, fingerprint
+
+logger = logging.getLogger(__name__)
+
+_START_KEY = "slow_query_start"
+
+
+class _FingerprintStats:
+    __slots__ = ("count", "total_s", "max_s", "slow", "samples", "cursor", "routes")
+
+    def __init__(self, samples: int):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.slow = 0
+        self.samples = array("d", [0.0] * samples)  # ostatnie czasy (bufor cykliczny) do p95
+        self.cursor = 0
+        self.routes: Counter = Counter()
+
+
+class SlowQueryLog:
+    """In-memory count/total/p95 per SQL fingerprint; statements slower than
+    `threshold_ms` are logged with the route that issued them.
+
+    p95 is computed over the last `samples` executions of each fingerprint. At most
+    `max_fingerprints` are tracked (least recently seen are dropped first).
+    """
+
+    def __init__(self, threshold_ms: float, max_fingerprints: int = 1000, samples: int = 256):
+        self.threshold_ms = threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._stats: OrderedDict[str, _FingerprintStats] = OrderedDict()
+
+    def record(self, statement: str, elapsed_s: float, route: str | None) -> None:
+        fp = fingerprint(statement)
+        slow = elapsed_s * 1000 >= self.threshold_ms
+        with self._lock:
+            entry = self._stats.get(fp)
+            if entry is None:
+                entry = self._stats[fp] = _FingerprintStats(self.samples)
+                while len(self._stats) > self.max_fingerprints:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(fp)
+            entry.count += 1
+            entry.total_s += elapsed_s
+            entry.max_s = max(entry.max_s, elapsed_s)
+            entry.samples[entry.cursor % self.samples] = elapsed_s
+            entry.cursor += 1
+            entry.routes[route or "-"] += 1
+            if slow:
+                entry.slow += 1
+        if slow:
+            logger.warning("Slow query (%.1f ms) from %s: %s", elapsed_s * 1000, route or "-", fp[:1000])
+
+    def dump(self, limit: int | None = None) -> list[dict]:
+        """Fingerprints ordered by total time, the most expensive first."""
+        with self._lock:
+            rows = [
+                {
+                    "fingerprint": fp,
+                    "count": e.count,
+                    "slow": e.slow,
+                    "total_ms": round(e.total_s * 1000, 3),
+                    "mean_ms": round(e.total_s * 1000 / e.count, 3),
+                    "p95_ms": round(_p95(e.samples[: min(e.cursor, self.samples)]) * 1000, 3),
+                    "max_ms": round(e.max_s * 1000, 3),
+                    "routes": dict(e.routes.most_common(5)),
+                }
+                for fp, e in self._stats.items()
+            ]
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def install(self, engine: Engine) -> None:
+        """Time every statement of `engine` (for an AsyncEngine pass `.sync_engine`)."""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info[_START_KEY].pop()
+            stats = current_stats.get()
+            self.record(statement, elapsed, stats.route if stats else None)
+
+        @event.listens_for(engine, "handle_error")
+        def _error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get(_START_KEY):
+                conn.info[_START_KEY].pop()
+
+
+slow_query_log = SlowQueryLog(settings.slow_query_threshold_ms, settings.slow_query_max_fingerprints)
+
+
+def _p95(values) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * 0.95) - 1, 0)]
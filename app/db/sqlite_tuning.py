@@ -0,0 +1,62 @@
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def sqlite_pragmas() -> dict[str, str]:
+    """The tuning profile from Settings, in the order it is applied (journal mode first)."""
+    pragmas = {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "temp_store": settings.sqlite_temp_store,
+        "foreign_keys": "ON" if settings.sqlite_foreign_keys else "OFF",
+    }
+    # None = zostaw domyślną wartość SQLite
+    return {name: str(value) for name, value in pragmas.items() if value is not None}
+
+
+def install_sqlite_tuning(engine: Engine, pragmas: dict[str, str] | None = None) -> None:
+    """Run the PRAGMA profile on every new DBAPI connection of a SQLite `engine`.
+
+    For an AsyncEngine pass `async_engine.sync_engine`; the aiosqlite adapter runs the
+    statements inside the connect greenlet, so the same listener works for both.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+                if name == "journal_mode":
+                    # WAL nie działa np. dla :memory: - SQLite zwraca faktyczny tryb zamiast błędu
+                    mode = cursor.fetchone()[0]
+                    if mode.lower() != value.lower():
+                        logger.debug("SQLite journal_mode is %s (requested %s)", mode, value)
+        finally:
+            cursor.close()
+
+
+def install_sqlite_query_only(engine: Engine) -> None:
+    """Make every connection of a SQLite `engine` reject writes (PRAGMA query_only)."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _query_only(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
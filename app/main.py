@@ -1,8 +1,8 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+import anyio
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 
 from app.core.config import settings
 from app.api.products import router as products_router  # <- to
@@ -13,8 +13,53 @@ from app.api.media import router as media_router
 from app.api.admin import router as admin_router
 from app.api.shipping import router as shipping_router
 from app.api.profiles import router as profiles_router
+from app.api.payments import router as payments_router
+from app.db import order_events  # noqa: F401  (rejestruje handlery post-commit)
+from app.db.outbox import build_outbox_handler_worker, build_outbox_worker
+from app.db.payment_inbox import build_payment_inbox_worker
+from app.core.payment_provider import HttpPaymentProvider, build_http_client
+from app.core.password_pool import password_hasher
+from app.core.images import image_pipeline
+from app.core.static_files import CachedStaticFiles, precompress_directory
+from app.db.query_stats import QueryStatsMiddleware
 
-app = FastAPI(title=settings.app_name, debug=settings.debug)
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+FRONTEND_DIR = PROJECT_ROOT / "frontend"
+STATIC_DIRS = (PROJECT_ROOT / "app" / "static", FRONTEND_DIR)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Workery w tle startują tylko gdy są włączone w Settings
+    workers = []
+    if settings.outbox_relay_enabled:
+        workers.append(build_outbox_worker())
+    if settings.payment_inbox_worker_enabled:
+        workers.append(build_payment_inbox_worker())
+    if settings.outbox_handler_worker_enabled:
+        workers.append(build_outbox_handler_worker())
+    for w in workers:
+        w.start()
+
+    if settings.static_precompress_on_startup:
+        for directory in STATIC_DIRS:
+            if directory.is_dir():
+                await anyio.to_thread.run_sync(precompress_directory, str(directory))
+
+    # jeden współdzielony, poolowany klient HTTP do providera płatności
+    provider_client = build_http_client()
+    app.state.payment_provider = HttpPaymentProvider(provider_client)
+    try:
+        yield
+    finally:
+        await provider_client.aclose()
+        password_hasher.shutdown()
+        image_pipeline.shutdown()
+        for w in workers:
+            w.stop()
+
+
+app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,10 +76,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*", "Authorization", "Content-Type", "Idempotency-Key"],
+    expose_headers=["X-Next-Cursor", "Retry-After", "Server-Timing"],
 )
 
-# Serwowanie plików statycznych (uploads)
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# liczba zapytań SQL i czas bazy per żądanie (+ wykrywanie N+1)
+app.add_middleware(QueryStatsMiddleware)
+
+# Serwowanie plików statycznych (uploads): Cache-Control, .br/.gz i cache stat
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
 app.include_router(products_router, prefix=settings.api_prefix)  # <- to
 app.include_router(carts_router, prefix=settings.api_prefix)
@@ -44,19 +93,21 @@ app.include_router(shipping_router, prefix=settings.api_prefix)
 app.include_router(auth_router, prefix=settings.api_prefix)
 app.include_router(media_router, prefix=settings.api_prefix)
 app.include_router(profiles_router, prefix=settings.api_prefix)
+app.include_router(payments_router, prefix=settings.api_prefix)
 app.include_router(admin_router) # Bez prefixu api, bo to admin
 
-PROJECT_ROOT = Path(__file__).resolve().parents[1]
-FRONTEND_INDEX = PROJECT_ROOT / "frontend" / "index.html"
+FRONTEND_INDEX = FRONTEND_DIR / "index.html"
+admin_files = CachedStaticFiles(directory="app/static/admin")
+frontend_files = CachedStaticFiles(directory=str(FRONTEND_DIR), check_dir=False)
 
 @app.get("/admin")
-def admin_page():
-    return FileResponse("app/static/admin/index.html")
+async def admin_page(request: Request):
+    return await admin_files.get_response("index.html", request.scope)
 
 @app.get("/store")
-def store_page():
+async def store_page(request: Request):
     if FRONTEND_INDEX.exists():
-        return FileResponse(str(FRONTEND_INDEX))
+        return await frontend_files.get_response("index.html", request.scope)
     return {"detail": "Frontend not found"}
 
 @app.get("/health")
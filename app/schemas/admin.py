@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 from app.schemas.order import OrderItemOut
@@ -23,6 +23,21 @@ class ProductUpdate(BaseModel):
     stock_qty: Optional[int] = Field(default=None, ge=0)
 
 
+class AdminUserUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+
+
+class AdminUserOut(BaseModel):
+    id: int
+    email: str
+    full_name: Optional[str] = None
+    is_active: bool
+    is_admin: bool
+
+    model_config = {"from_attributes": True}
+
+
 class OrderStatusUpdate(BaseModel):
     status: str
 
@@ -48,3 +63,12 @@ class AdminOrderOut(BaseModel):
     shipping_country: str
 
     model_config = {"from_attributes": True}
+
+
+class OrderStatusCountsOut(BaseModel):
+    counts: Dict[str, int]
+    total: int
+
+
+class OrderCountersReconcileOut(OrderStatusCountsOut):
+    drift: Dict[str, int]
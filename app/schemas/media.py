@@ -1,11 +1,45 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 from datetime import datetime
 
+from app.core.images import build_srcset
+
+
+class MediaVariantOut(BaseModel):
+    width: int
+    height: int
+    format: str
+    url: str
+    size_bytes: int
+
+    model_config = {"from_attributes": True}
+
 
 class MediaOut(BaseModel):
     id: int
     url: str
     caption: str | None
     created_at: datetime
+    content_type: str | None = None
+    size_bytes: int | None = None
+    sha256: str | None = None
+    variants: list[MediaVariantOut] = []
+
+    @computed_field
+    @property
+    def srcset(self) -> dict[str, str]:
+        return build_srcset(self.variants)
+
+    model_config = {"from_attributes": True}
+
+
+class UploadSessionCreate(BaseModel):
+    size: int = Field(gt=0, description="Total file size in bytes")
+    caption: str | None = Field(default=None, max_length=500)
+    is_public: bool = True
+
 
-    model_config = {"from_attributes": True}
\ No newline at end of file
+class UploadSessionOut(BaseModel):
+    id: str
+    size: int
+    offset: int
+    expires_at: datetime
@@ -0,0 +1,21 @@
+from typing import Literal
+from pydantic import BaseModel, Field
+
+
+class PaymentWebhookIn(BaseModel):
+    id: str = Field(min_length=1, max_length=128, description="Provider event id (dedupe key)")
+    type: Literal["payment.succeeded", "payment.failed"]
+    order_id: int
+
+
+class PaymentWebhookAck(BaseModel):
+    accepted: bool = True
+    duplicate: bool
+
+
+class PaymentIntentOut(BaseModel):
+    order_id: int
+    provider: str
+    provider_ref: str
+    status: str
+    redirect_url: str | None = None
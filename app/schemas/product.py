@@ -17,6 +17,7 @@ class ProductCreate(ProductBase):
 
 class Product(ProductBase):
     id: int
+    image_srcset: dict[str, str] = Field(default_factory=dict, description="Responsive variants of image_url per format")
 
 
 class ProductUpdate(BaseModel):
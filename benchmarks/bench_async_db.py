@@ -0,0 +1,118 @@
+"""Sync vs async database path: products listing throughput under concurrency.
+
+    python -m benchmarks.bench_async_db --requests 2000 --concurrency 10 100 500 --latency-ms 2
+
+The same query as GET /api/products runs behind a sync `def` endpoint (SessionLocal,
+anyio threadpool) and an `async def` one (AsyncSession on aiosqlite), both driven
+in-process through httpx. `--latency-ms` adds one round trip that waits inside the
+driver (a SQLite function that sleeps) to mimic a networked database: that wait
+holds a threadpool thread on the sync path, but not the event loop on the async one.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.database import Base
+from app.db.models import ProductDB
+
+
+def _build_app(db_path: str, latency_ms: float, pool_size: int) -> tuple[FastAPI, Engine, AsyncEngine]:
+    engine = create_engine(
+        f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, pool_size=pool_size
+    )
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=pool_size)
+
+    def register_sleep(dbapi_connection, _):
+        dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+    event.listen(engine, "connect", register_sleep)
+    event.listen(async_engine.sync_engine, "connect", register_sleep)
+
+    SyncSession = sessionmaker(bind=engine, autoflush=False)
+    AsyncSessionFactory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    stmt = select(ProductDB).where(ProductDB.is_active == True)  # noqa: E712
+    round_trip = select(func.sleep_ms(latency_ms))
+
+    def get_sync_db():
+        with SyncSession() as db:
+            yield db
+
+    async def get_async_db():
+        async with AsyncSessionFactory() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/products")
+    def sync_products(db: Session = Depends(get_sync_db)):
+        db.execute(round_trip)
+        return [{"id": p.id, "name": p.name, "price_pln": p.price_pln} for p in db.scalars(stmt)]
+
+    @app.get("/async/products")
+    async def async_products(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(round_trip)
+        return [{"id": p.id, "name": p.name, "price_pln": p.price_pln} for p in await db.scalars(stmt)]
+
+    Base.metadata.create_all(engine)
+    with SyncSession() as db:
+        db.add_all(
+            ProductDB(name=f"Świeca {i}", description="", price_pln=1000 + i, is_active=True, stock_qty=10)
+            for i in range(50)
+        )
+        db.commit()
+    return app, engine, async_engine
+
+
+async def _run(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(path)  # rozgrzewka puli połączeń
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                r = await client.get(path)
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def _compare(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        app, engine, async_engine = _build_app(os.path.join(tmp, "bench.db"), args.latency_ms, args.pool_size)
+        print(f"{args.requests} requests, latency={args.latency_ms}ms, pool_size={args.pool_size}")
+        try:
+            for concurrency in args.concurrency:
+                sync_rate = await _run(app, "/sync/products", args.requests, concurrency)
+                async_rate = await _run(app, "/async/products", args.requests, concurrency)
+                print(f"concurrency {concurrency:>4}: sync {sync_rate:8.1f} req/s   async {async_rate:8.1f} req/s")
+        finally:
+            engine.dispose()
+            await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--pool-size", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(_compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Per-request statement overhead: select() built on every call vs the lambda_stmt helpers.
+
+    python -m benchmarks.bench_cached_statements --requests 5000
+
+One "request" runs the hot lookups of an authenticated add-to-cart: user by email,
+cart by token, cart item by (cart, product) and the active product list. Both modes
+hit the same compiled cache; the difference is building the construct and its cache
+key in Python every time vs extracting only the new parameter values. In-memory
+SQLite keeps the database side of each query as small as possible.
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.db import queries
+from app.db.database import Base
+from app.db.models import CartDB, CartItemDB, ProductDB, UserDB
+
+USERS = 50
+PRODUCTS = 20
+
+
+def _plain(db: Session, i: int) -> None:
+    email, token, product_id = f"user{i % USERS}@example.com", f"cart-{i % USERS}", i % PRODUCTS + 1
+    db.execute(select(UserDB).where(UserDB.email == email)).scalar_one_or_none()
+    cart = db.execute(select(CartDB).where(CartDB.token == token)).scalars().first()
+    db.execute(
+        select(CartItemDB).where(CartItemDB.cart_id == cart.id, CartItemDB.product_id == product_id)
+    ).scalars().first()
+    db.execute(select(ProductDB).where(ProductDB.is_active == True)).scalars().all()  # noqa: E712
+
+
+def _cached(db: Session, i: int) -> None:
+    email, token, product_id = f"user{i % USERS}@example.com", f"cart-{i % USERS}", i % PRODUCTS + 1
+    db.execute(queries.user_by_email(email)).scalar_one_or_none()
+    cart = db.execute(queries.cart_by_token(token)).scalars().first()
+    db.execute(queries.cart_item(cart.id, product_id)).scalars().first()
+    db.execute(queries.products(True)).scalars().all()
+
+
+def _run(fn, db: Session, requests: int) -> float:
+    for i in range(200):  # rozgrzewka: wypełnia cache skompilowanych zapytań
+        fn(db, i)
+    start = time.perf_counter()
+    for i in range(requests):
+        fn(db, i)
+    return (time.perf_counter() - start) / requests
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(UserDB(email=f"user{i}@example.com", password_hash="x") for i in range(USERS))
+        db.add_all(
+            ProductDB(name=f"Świeca {i}", description="", price_pln=1000 + i, is_active=True, stock_qty=10)
+            for i in range(PRODUCTS)
+        )
+        db.add_all(CartDB(token=f"cart-{i}") for i in range(USERS))
+        db.commit()
+
+    with Session(engine) as db:
+        timings = {label: _run(fn, db, args.requests) for label, fn in (("select()", _plain), ("lambda_stmt", _cached))}
+    engine.dispose()
+
+    print(f"{args.requests} requests x 4 hot queries")
+    for label, per_request in timings.items():
+        print(f"{label:>12}: {per_request * 1e6:8.1f} us/request")
+    saved = timings["select()"] - timings["lambda_stmt"]
+    print(f"{'saved':>12}: {saved * 1e6:8.1f} us/request ({saved / timings['select()']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Login (bcrypt verify) throughput against the size of the hashing process pool.
+
+    python -m benchmarks.bench_login_throughput --rounds 12 --logins 64
+
+Each run pushes `--logins` concurrent verifications through a fresh PasswordHasher
+and reports logins/s; throughput should grow roughly linearly up to the number
+of physical cores.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.core.password_pool import PasswordHasher
+from app.core.security import hash_password, verify_password
+
+
+async def _run(workers: int, rounds: int, logins: int, password_hash: str) -> float:
+    hasher = PasswordHasher(workers=workers, max_pending=logins, rounds=rounds)
+    try:
+        await hasher.verify("warm-up", password_hash)  # start worker processes outside the timing
+        await asyncio.gather(*(hasher.verify("warm-up", password_hash) for _ in range(workers)))
+        start = time.perf_counter()
+        await asyncio.gather(*(hasher.verify("correct horse", password_hash) for _ in range(logins)))
+        return logins / (time.perf_counter() - start)
+    finally:
+        hasher.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    password_hash = hash_password("correct horse", rounds=args.rounds)
+    start = time.perf_counter()
+    for _ in range(8):
+        verify_password("correct horse", password_hash)  # ta sama operacja co w puli: weryfikacja, nie hash
+    inline = 8 / (time.perf_counter() - start)
+    print(f"bcrypt cost={args.rounds}, cores={os.cpu_count()}")
+    print(f"{'inline (request thread)':>24}: {inline:8.1f} logins/s")
+
+    workers = 1
+    while workers <= args.max_workers:
+        rate = asyncio.run(_run(workers, args.rounds, args.logins, password_hash))
+        print(f"{f'process pool x{workers}':>24}: {rate:8.1f} logins/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Mixed read/write throughput on a SQLite file, default settings vs the tuning profile.
+
+    python -m benchmarks.bench_sqlite_pragmas --seconds 5 --readers 8 --writers 4
+
+Readers list active products (like GET /api/products); writers open a cart, add an
+item and decrement stock in one transaction (a stripped-down checkout). Each mode
+gets a fresh database file; "locked" counts writes that gave up with
+"database is locked".
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, exc, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.db.models import CartDB, CartItemDB, ProductDB
+from app.db.sqlite_tuning import install_sqlite_tuning, sqlite_pragmas
+
+PRODUCTS = 200
+
+
+def _run(db_path: str, tuned: bool, seconds: float, readers: int, writers: int) -> dict:
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+        pool_size=readers + writers,
+    )
+    if tuned:
+        install_sqlite_tuning(engine, sqlite_pragmas())
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    Base.metadata.create_all(engine)
+    with Session() as db:
+        db.add_all(
+            ProductDB(name=f"Świeca {i}", description="", price_pln=1000 + i, is_active=True, stock_qty=10**9)
+            for i in range(PRODUCTS)
+        )
+        db.commit()
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        while time.perf_counter() < stop:
+            with Session() as db:
+                db.execute(select(ProductDB).where(ProductDB.is_active == True)).scalars().all()  # noqa: E712
+            count("reads")
+
+    def writer(n):
+        i = 0
+        while time.perf_counter() < stop:
+            i += 1
+            product_id = (n * 7919 + i) % PRODUCTS + 1
+            try:
+                with Session() as db:
+                    cart = CartDB(token=f"bench-{n}-{i}-{time.perf_counter_ns()}")
+                    db.add(cart)
+                    db.flush()
+                    db.add(CartItemDB(cart_id=cart.id, product_id=product_id, qty=1, unit_price_pln=1000))
+                    db.execute(
+                        update(ProductDB).where(ProductDB.id == product_id).values(stock_qty=ProductDB.stock_qty - 1)
+                    )
+                    db.commit()
+                count("writes")
+            except exc.OperationalError:
+                count("locked")
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return {k: v / elapsed if k != "locked" else v for k, v in counts.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers + {args.writers} writers, {args.seconds}s per mode")
+    print(f"profile: {sqlite_pragmas()}")
+    for label, tuned in (("default", False), ("tuned", True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            r = _run(os.path.join(tmp, "bench.db"), tuned, args.seconds, args.readers, args.writers)
+        print(f"{label:>8}: {r['reads']:8.1f} reads/s  {r['writes']:8.1f} writes/s  locked={r['locked']}")
+
+
+if __name__ == "__main__":
+    main()
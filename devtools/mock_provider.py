@@ -0,0 +1,58 @@
+"""Local stand-in for the payment provider's REST API.
+
+Run next to the shop for manual testing:
+
+    uvicorn devtools.mock_provider:app --port 9100
+
+Tests talk to it in-process through ``httpx.ASGITransport``. Behaviour is steered
+through ``app.state``: ``delay_s`` (latency per call) and ``fail_next`` (how many of
+the next calls answer 503).
+"""
+import asyncio
+from uuid import uuid4
+
+from fastapi import FastAPI, Header, Response
+from pydantic import BaseModel
+
+app = FastAPI(title="Mock payment provider")
+app.state.delay_s = 0.0
+app.state.fail_next = 0
+app.state.calls = 0
+app.state.payments = {}  # Idempotency-Key -> payment
+
+
+class CreatePayment(BaseModel):
+    order_id: int
+    amount: int
+    currency: str = "PLN"
+
+
+@app.post("/payments", status_code=201)
+async def create_payment(
+    payload: CreatePayment,
+    response: Response,
+    idempotency_key: str = Header(alias="Idempotency-Key"),
+):
+    app.state.calls += 1
+    if app.state.delay_s:
+        await asyncio.sleep(app.state.delay_s)
+    if app.state.fail_next > 0:
+        app.state.fail_next -= 1
+        response.status_code = 503
+        return {"error": "temporarily unavailable"}
+
+    existing = app.state.payments.get(idempotency_key)
+    if existing:
+        response.status_code = 200
+        return existing
+
+    payment_id = f"pay_{uuid4().hex[:16]}"
+    payment = {
+        "id": payment_id,
+        "status": "PENDING",
+        "order_id": payload.order_id,
+        "amount": payload.amount,
+        "redirect_url": f"http://127.0.0.1:9100/checkout/{payment_id}",
+    }
+    app.state.payments[idempotency_key] = payment
+    return payment
@@ -1,25 +1,26 @@
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 
 from app.main import app as fastapi_app
 from app.db.database import Base
-from app.db.deps import get_db
+from app.db.deps import get_async_db, get_async_read_db, get_db, get_read_db
 from app.api.deps import get_current_user
 from app.db.models import UserDB
 
 
 @pytest.fixture()
-def client():
-    # Jedna wspólna baza SQLite in-memory dla całego testu (to samo połączenie)
-    engine = create_engine(
-        "sqlite://",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def client(tmp_path_factory):
+    # Jedna wspólna baza SQLite na test - plik, żeby widziały ją oba silniki (sync i async)
+    db_path = tmp_path_factory.mktemp("db") / "test.db"
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+    TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
     # Tworzymy tabele z modeli na tej testowej bazie
     Base.metadata.create_all(bind=engine)
@@ -32,13 +33,22 @@ def client():
         finally:
             db.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     fastapi_app.dependency_overrides[get_db] = override_get_db
+    fastapi_app.dependency_overrides[get_async_db] = override_get_async_db
+    # odczyty (replika) w testach idą na tę samą bazę
+    fastapi_app.dependency_overrides[get_read_db] = override_get_db
+    fastapi_app.dependency_overrides[get_async_read_db] = override_get_async_db
 
     with TestClient(fastapi_app) as c:
         yield c
 
     fastapi_app.dependency_overrides.clear()
     engine.dispose()
+    asyncio.run(async_engine.dispose())
 
 
 def test_products_crud_basic(client: TestClient):
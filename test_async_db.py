@@ -0,0 +1,30 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.db.database import async_database_url
+
+
+def test_async_database_url_picks_async_driver():
+    assert async_database_url("sqlite:///local.db") == "sqlite+aiosqlite:///local.db"
+    assert async_database_url("postgresql://shop:secret@db/shop") == "postgresql+asyncpg://shop:secret@db/shop"
+    # jawnie wybrany sterownik zostaje
+    assert async_database_url("postgresql+psycopg://shop@db/shop") == "postgresql+psycopg://shop@db/shop"
+
+
+def test_concurrent_requests_on_async_session(client: TestClient):
+    for i in range(5):
+        r = client.post("/api/products", json={"name": f"Świeca {i}", "price_pln": 1000 + i, "stock_qty": 3})
+        assert r.status_code == 201, r.text
+
+    async def burst():
+        transport = httpx.ASGITransport(app=fastapi_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.get("/api/products") for _ in range(50)))
+
+    responses = asyncio.run(burst())
+    assert {r.status_code for r in responses} == {200}
+    assert all(len(r.json()) == 5 for r in responses)
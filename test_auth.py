@@ -0,0 +1,172 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, event
+from sqlalchemy.engine import Engine
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.core.password_pool import password_hasher
+from app.core.user_cache import principal_cache
+from app.core.config import settings
+from app.core.rate_limit import client_ip, login_throttle, MemoryLimiterStore, SqliteLimiterStore
+from app.db.deps import get_db
+from app.db.models import UserDB
+
+
+@pytest.fixture()
+def fast_bcrypt(monkeypatch):
+    monkeypatch.setattr(password_hasher, "rounds", 4)
+    return password_hasher
+
+
+def _stored_hash(email: str) -> str:
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    try:
+        return db.execute(select(UserDB.password_hash).where(UserDB.email == email)).scalar_one()
+    finally:
+        db.close()
+
+
+def test_register_login_and_rehash(client: TestClient, fast_bcrypt, monkeypatch):
+    creds = {"email": "anna@lanari.pl", "password": "swieczki123"}
+    r = client.post("/api/auth/register", json={**creds, "full_name": "Anna"})
+    assert r.status_code == 201, r.text
+    assert _stored_hash(creds["email"]).startswith("$2b$04$")
+
+    assert client.post("/api/auth/login", json={**creds, "password": "zle-haslo"}).status_code == 401
+
+    # cost raised in settings -> transparent rehash on the next successful login
+    monkeypatch.setattr(password_hasher, "rounds", 5)
+    r = client.post("/api/auth/login", json=creds)
+    assert r.status_code == 200, r.text
+    assert _stored_hash(creds["email"]).startswith("$2b$05$")
+
+    token = r.json()["access_token"]
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.json()["email"] == creds["email"]
+
+
+def test_saturated_hasher_returns_503(client: TestClient, fast_bcrypt, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    r = client.post("/api/auth/register", json={"email": "busy@lanari.pl", "password": "swieczki123"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_current_user_cached_and_invalidated(client: TestClient, fast_bcrypt):
+    principal_cache.clear()
+    for email in ("boss@lanari.pl", "klient@lanari.pl"):
+        client.post("/api/auth/register", json={"email": email, "password": "swieczki123"})
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.execute(select(UserDB).where(UserDB.email == "boss@lanari.pl")).scalar_one().is_admin = True
+    db.commit()
+    customer_id = db.execute(select(UserDB.id).where(UserDB.email == "klient@lanari.pl")).scalar_one()
+    db.close()
+
+    def token(email):
+        r = client.post("/api/auth/login", json={"email": email, "password": "swieczki123"})
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    admin_h, customer_h = token("boss@lanari.pl"), token("klient@lanari.pl")
+
+    user_queries = []
+
+    def count(conn, cursor, statement, params, context, executemany):
+        if "FROM users" in statement:
+            user_queries.append(statement)
+
+    # wszystkie silniki - lookup użytkownika idzie przez async sesję (jej sync_engine)
+    event.listen(Engine, "before_cursor_execute", count)
+    try:
+        for _ in range(3):
+            assert client.get("/api/auth/me", headers=customer_h).status_code == 200
+        assert len(user_queries) == 1
+
+        r = client.patch(f"/admin/api/users/{customer_id}", json={"is_active": False}, headers=admin_h)
+        assert r.status_code == 200, r.text
+        assert client.get("/api/auth/me", headers=customer_h).status_code == 401
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+
+
+def test_user_lookup_stays_off_the_sync_pool(client: TestClient, fast_bcrypt):
+    principal_cache.clear()
+    client.post("/api/auth/register", json={"email": "async@lanari.pl", "password": "swieczki123"})
+    r = client.post("/api/auth/login", json={"email": "async@lanari.pl", "password": "swieczki123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    sync_engine = db.get_bind()
+    db.close()
+    checkouts = []
+
+    def on_checkout(dbapi_conn, record, proxy):
+        checkouts.append(record)
+
+    event.listen(sync_engine, "checkout", on_checkout)
+    try:
+        # chybienie cache w async handlerze: lookup przez async sesję, bez połączenia z puli sync
+        assert client.get("/api/orders", headers=headers).status_code == 200
+    finally:
+        event.remove(sync_engine, "checkout", on_checkout)
+    assert checkouts == []
+
+
+def test_login_throttled_before_bcrypt(client: TestClient, fast_bcrypt, monkeypatch):
+    monkeypatch.setattr(login_throttle, "store", MemoryLimiterStore())
+    monkeypatch.setattr(login_throttle, "email_limit", 2)
+    login_throttle.reset_metrics()
+
+    creds = {"email": "bf@lanari.pl", "password": "swieczki123"}
+    client.post("/api/auth/register", json=creds)
+
+    verified = []
+    real_verify = password_hasher.verify
+
+    async def counting_verify(*args):
+        verified.append(args)
+        return await real_verify(*args)
+
+    monkeypatch.setattr(password_hasher, "verify", counting_verify)
+
+    for _ in range(2):
+        assert client.post("/api/auth/login", json={**creds, "password": "zle-haslo"}).status_code == 401
+    r = client.post("/api/auth/login", json=creds)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
+    assert len(verified) == 2
+
+    metrics = login_throttle.metrics()
+    assert metrics["throttled_email"] == 1
+    assert metrics["allowed"] == 2
+
+
+def test_sqlite_store_shared_between_workers(tmp_path):
+    path = str(tmp_path / "throttle.db")
+    worker_a, worker_b = SqliteLimiterStore(path), SqliteLimiterStore(path)
+
+    assert worker_a.hit("ip:1.2.3.4", 2, 60, now=100.0) is None
+    assert worker_b.hit("ip:1.2.3.4", 2, 60, now=101.0) is None
+    assert worker_a.hit("ip:1.2.3.4", 2, 60, now=102.0) == 58.0
+    assert worker_b.hit("ip:1.2.3.4", 2, 60, now=161.0) is None
+
+
+def test_sqlite_store_purges_stale_keys(tmp_path):
+    store = SqliteLimiterStore(str(tmp_path / "throttle.db"))
+    for i in range(50):
+        assert store.hit(f"email:once-{i}@lanari.pl", 5, 60, now=100.0 + i / 100) is None
+    assert len(store) == 50
+
+    # pierwszy zapis po upływie okna sprząta wszystkie wygasłe klucze, nie tylko własny
+    assert store.hit("ip:9.9.9.9", 5, 60, now=200.0) is None
+    assert len(store) == 1
+
+
+def test_client_ip_behind_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(settings, "login_throttle_trusted_proxies", ["10.0.0.1", "10.0.0.2"])
+    assert client_ip("10.0.0.1", "203.0.113.7") == "203.0.113.7"
+    # lewe wpisy dopisuje klient - liczy się pierwszy od prawej, który nie jest naszym proxy
+    assert client_ip("10.0.0.1", "1.1.1.1, 203.0.113.7, 10.0.0.2") == "203.0.113.7"
+    assert client_ip("198.51.100.9", "1.1.1.1") == "198.51.100.9"  # nieznany peer - nagłówek ignorowany
+    assert client_ip("10.0.0.1", None) == "10.0.0.1"
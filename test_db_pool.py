@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.models import UserDB
+from app.db.pool_metrics import InstrumentedQueuePool, pool_stats
+
+
+def test_pool_metrics_track_in_use_overflow_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    first, second = engine.connect(), engine.connect()
+    stats = pool_stats(engine.pool)
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+
+    stats = pool_stats(engine.pool)
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["checkout_timeouts"] == 1
+    assert stats["wait_ms"]["buckets"]["+Inf"] == 2
+
+    engine.dispose()  # nowa pula, te same liczniki
+    assert pool_stats(engine.pool)["checkouts"] == 2
+
+
+def test_db_pool_metrics_endpoint(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    r = client.get("/admin/api/metrics/db-pool")
+    assert r.status_code == 200, r.text
+    assert {"sync", "async"} <= set(r.json())
+    assert "pool" in r.json()["sync"]
+
+    del fastapi_app.dependency_overrides[get_current_user]
@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import select, text
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.api import media as media_api
+from app.core import uploads as uploads_core
+from app.api.deps import get_current_user, get_current_user_optional
+from app.db.deps import get_db
+from app.db.media_blobs import adopt_legacy_media, remove_released_files
+from app.db.models import MediaBlobDB, MediaDB, MediaVariantDB, ProductDB, UserDB
+from app.core.config import settings
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+
+
+@pytest.fixture()
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_api, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_upload_streams_sniffs_and_hashes(client: TestClient, upload_dir):
+    r = client.post(
+        "/api/media",
+        files={"file": ("photo.jpg", PNG, "image/jpeg")},
+        data={"caption": "Świeca sojowa", "is_public": "false"},
+    )
+    assert r.status_code == 201, r.text
+    body = r.json()
+    # rozszerzenie i typ z magic bytes, nie z nazwy/nagłówka klienta
+    assert body["content_type"] == "image/png"
+    assert body["url"].endswith(".png")
+    assert body["caption"] == "Świeca sojowa"
+    assert body["size_bytes"] == len(PNG)
+    assert body["sha256"] == hashlib.sha256(PNG).hexdigest()
+
+    (stored,) = os.listdir(upload_dir)
+    assert (upload_dir / stored).read_bytes() == PNG
+    assert client.get("/api/media").json() == []  # is_public=false
+
+
+def test_upload_finalized_off_the_event_loop(client: TestClient, upload_dir, monkeypatch):
+    on_loop = []
+    place = uploads_core.place_content_addressed
+
+    def spy(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return place(*args)
+
+    monkeypatch.setattr(uploads_core, "place_content_addressed", spy)
+    assert client.post("/api/media", files={"file": ("a.png", PNG, "image/png")}).status_code == 201
+    assert on_loop == [False]
+
+
+def test_upload_rejects_oversize_and_non_images(client: TestClient, upload_dir, monkeypatch):
+    monkeypatch.setattr(settings, "media_max_upload_bytes", 100)
+    r = client.post("/api/media", files={"file": ("big.png", PNG, "image/png")})
+    assert r.status_code == 413
+
+    r = client.post("/api/media", files={"file": ("fake.jpg", b"<?php echo 1; ?>", "image/jpeg")})
+    assert r.status_code == 400
+
+    assert client.post("/api/media", data={"caption": "bez pliku"}).status_code == 415
+    assert os.listdir(upload_dir) == []
+
+
+def test_upload_rejects_decompression_bombs(client: TestClient, upload_dir, monkeypatch):
+    monkeypatch.setattr(settings, "media_max_image_pixels", 100)
+    buf = io.BytesIO()
+    Image.new("RGB", (20, 20)).save(buf, "PNG")
+    r = client.post("/api/media", files={"file": ("bomb.png", buf.getvalue(), "image/png")})
+    assert r.status_code == 413, r.text
+
+    # powyżej 2x limitu PIL sam rzuca DecompressionBombError już przy odczycie nagłówka
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    r = client.post("/api/media", files={"file": ("bomb.png", buf.getvalue(), "image/png")})
+    assert r.status_code == 413, r.text
+    assert os.listdir(upload_dir) == []
+
+
+def test_upload_generates_responsive_variants(client: TestClient, upload_dir, monkeypatch):
+    monkeypatch.setattr(settings, "media_derivative_widths", [320, 640, 4000])
+    buf = io.BytesIO()
+    Image.new("RGB", (1200, 800), (200, 120, 40)).save(buf, "JPEG", quality=95)
+
+    r = client.post("/api/media", files={"file": ("candle.jpg", buf.getvalue(), "image/jpeg")})
+    assert r.status_code == 201, r.text
+    url = r.json()["url"]
+
+    (media,) = client.get("/api/media").json()
+    # 4000 > szerokość oryginału -> bez upscalingu
+    assert {(v["width"], v["format"]) for v in media["variants"]} == {
+        (320, "webp"), (640, "webp"), (320, "jpeg"), (640, "jpeg"),
+    }
+    assert all(v["height"] == round(v["width"] * 2 / 3) for v in media["variants"])
+    stem = url.rsplit("/", 1)[1].rsplit(".", 1)[0]
+    assert media["srcset"]["webp"] == f"/static/uploads/{stem}-320w.webp 320w, /static/uploads/{stem}-640w.webp 640w"
+    assert len(os.listdir(upload_dir)) == 5
+
+    # ten sam plik drugi raz: bez nowego zapisu i renderowania, pochodne od razu w odpowiedzi
+    again = client.post("/api/media", files={"file": ("copy.jpg", buf.getvalue(), "image/jpeg")}).json()
+    assert again["srcset"] == media["srcset"]
+    assert len(os.listdir(upload_dir)) == 5
+
+    p = client.post("/api/products", json={"name": "Świeca", "price_pln": 4900, "image_url": url}).json()
+    assert client.get(f"/api/products/{p['id']}").json()["image_srcset"] == media["srcset"]
+
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="a@a.pl", is_admin=True)
+    for media_id in (media["id"], again["id"]):
+        assert client.delete(f"/api/media/{media_id}").status_code == 204
+    assert os.listdir(upload_dir) == []
+
+
+def test_duplicate_uploads_share_one_file(client: TestClient, upload_dir):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="a@a.pl", is_admin=True)
+    first, second = (
+        client.post("/api/media", files={"file": (name, PNG, "image/png")}).json()
+        for name in ("a.png", "b.png")
+    )
+    assert first["id"] != second["id"]
+    assert first["url"] == second["url"] == f"/static/uploads/{hashlib.sha256(PNG).hexdigest()}.png"
+    assert len(os.listdir(upload_dir)) == 1
+
+    assert client.delete(f"/api/media/{first['id']}").status_code == 204
+    assert len(os.listdir(upload_dir)) == 1  # druga referencja trzyma plik
+    assert client.delete(f"/api/media/{second['id']}").status_code == 204
+    assert os.listdir(upload_dir) == []
+
+
+def test_released_files_kept_when_content_is_reuploaded(client: TestClient, upload_dir):
+    sha = hashlib.sha256(PNG).hexdigest()
+    for name in (f"{sha}.png", f"{sha}-320w.webp"):
+        (upload_dir / name).write_bytes(PNG)
+    names = sorted(os.listdir(upload_dir))
+    db = next(fastapi_app.dependency_overrides[get_db]())
+
+    # upload tej samej treści zdążył odtworzyć wiersz bloba po commicie delete
+    db.add(MediaBlobDB(sha256=sha, filename=f"{sha}.png", content_type="image/png", size_bytes=len(PNG), ref_count=1))
+    db.commit()
+    assert remove_released_files(db, str(upload_dir), sha, names, time.time()) == 0
+    db.delete(db.get(MediaBlobDB, sha))
+    db.commit()
+
+    # ...albo dopiero znalazł plik na dysku (odświeżony mtime), wiersza jeszcze nie ma
+    released_at = time.time() - 60
+    assert remove_released_files(db, str(upload_dir), sha, names, released_at) == 0
+    assert sorted(os.listdir(upload_dir)) == names
+
+    assert remove_released_files(db, str(upload_dir), sha, names, time.time()) == 2
+    assert os.listdir(upload_dir) == []
+    db.close()
+
+
+def test_duplicate_upload_does_not_share_variants_of_legacy_rows(client: TestClient, upload_dir):
+    sha = hashlib.sha256(PNG).hexdigest()
+    assert client.post("/api/media", files={"file": ("a.png", PNG, "image/png")}).status_code == 201
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    legacy = MediaDB(filename="old.png", url="/static/uploads/old.png", is_public=True, sha256=sha)
+    legacy.variants.append(MediaVariantDB(
+        width=320, height=200, format="webp", filename="old-320w.webp", url="/static/uploads/old-320w.webp", size_bytes=1
+    ))
+    db.add(legacy)
+    db.commit()
+    db.close()
+
+    # blob już ma referencję, ale pochodne ma tylko wiersz sprzed bloba - tych nie współdzielimy
+    r = client.post("/api/media", files={"file": ("b.png", PNG, "image/png")})
+    assert r.status_code == 201, r.text
+    assert r.json()["variants"] == []
+
+
+def test_adopt_legacy_media_collapses_duplicates(client: TestClient, upload_dir):
+    for name in ("old-1.png", "old-2.png"):
+        (upload_dir / name).write_bytes(PNG)
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.add_all([
+        MediaDB(filename=name, url=f"/static/uploads/{name}", is_public=True) for name in ("old-1.png", "old-2.png")
+    ])
+    db.add(ProductDB(name="Świeca", price_pln=4900, image_url="/static/uploads/old-2.png"))
+    db.commit()
+
+    assert adopt_legacy_media(db, str(upload_dir)) == 2
+    sha = hashlib.sha256(PNG).hexdigest()
+    assert os.listdir(upload_dir) == [f"{sha}.png"]
+    assert db.get(MediaBlobDB, sha).ref_count == 2
+    assert db.execute(select(ProductDB.image_url)).scalar_one() == f"/static/uploads/{sha}.png"
+    db.close()
+
+
+def test_media_gc_reports_and_deletes_orphans(client: TestClient, upload_dir):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="a@a.pl", is_admin=True)
+    kept = client.post("/api/media", files={"file": ("a.png", PNG, "image/png")}).json()
+    (upload_dir / "stale.jpg").write_bytes(b"x" * 10)
+    (upload_dir / "0000.png.part").write_bytes(b"y" * 5)
+    old = time.time() - 7200
+    for name in ("stale.jpg", "0000.png.part", kept["url"].rsplit("/", 1)[1]):
+        os.utime(upload_dir / name, (old, old))
+    (upload_dir / "in-flight.png.part").write_bytes(b"z")
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.add(MediaDB(filename="gone.png", url="/static/uploads/gone.png", is_public=True))
+    db.commit()
+    db.close()
+
+    report = client.post("/api/media/gc", params={"grace_s": 3600}).json()
+    assert report["scanned_files"] == 4
+    assert report["skipped_recent"] == 1
+    assert sorted(report["orphan_samples"]) == ["0000.png.part", "stale.jpg"]
+    assert report["deleted_files"] == 0
+    assert report["missing_files"] == 1
+
+    report = client.post("/api/media/gc", params={"grace_s": 3600, "delete": True}).json()
+    assert report["deleted_files"] == 2 and report["freed_bytes"] == 15
+    assert sorted(os.listdir(upload_dir)) == sorted([kept["url"].rsplit("/", 1)[1], "in-flight.png.part"])
+
+
+def test_media_gc_keeps_files_only_products_point_at(client: TestClient, upload_dir):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="a@a.pl", is_admin=True)
+    (upload_dir / "legacy.jpg").write_bytes(b"x" * 10)
+    (upload_dir / "stale.jpg").write_bytes(b"y" * 10)
+    old = time.time() - 7200
+    for name in ("legacy.jpg", "stale.jpg"):
+        os.utime(upload_dir / name, (old, old))
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.add(ProductDB(name="Świeca", price_pln=1000, stock_qty=1, image_url="/static/uploads/legacy.jpg"))
+    db.commit()
+    db.close()
+
+    report = client.post("/api/media/gc", params={"grace_s": 3600, "delete": True}).json()
+    assert report["orphan_samples"] == ["stale.jpg"] and report["deleted_files"] == 1
+    assert os.listdir(upload_dir) == ["legacy.jpg"]
+
+
+def test_list_media_keyset_pages_and_filters(client: TestClient):
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.add_all([UserDB(id=7, email="o@lanari.pl", password_hash="x"), UserDB(id=8, email="p@lanari.pl", password_hash="x")])
+    same_moment = datetime(2026, 10, 1, 12, 0, tzinfo=UTC)
+    for i in range(7):
+        db.add(MediaDB(
+            filename=f"{i}.jpg", url=f"/static/uploads/{i}.jpg", is_public=i != 3, owner_id=7 if i % 2 else 8,
+            # trzy wiersze z identycznym created_at - kursor musi rozstrzygać po id
+            created_at=same_moment if i < 3 else same_moment + timedelta(minutes=i),
+        ))
+    db.commit()
+    db.close()
+
+    seen, cursor = [], None
+    while True:
+        r = client.get("/api/media", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        seen += [m["url"] for m in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [f"/static/uploads/{i}.jpg" for i in (6, 5, 4, 2, 1, 0)]
+
+    owned = client.get("/api/media", params={"owner_id": 7}).json()
+    assert [m["url"] for m in owned] == [f"/static/uploads/{i}.jpg" for i in (5, 1)]
+    assert client.get("/api/media", params={"cursor": "nie-kursor"}).status_code == 400
+    assert client.get("/api/media", params={"include_hidden": True}).status_code == 403
+
+    fastapi_app.dependency_overrides[get_current_user_optional] = lambda: UserDB(id=1, email="a@a.pl", is_admin=True)
+    assert len(client.get("/api/media", params={"include_hidden": True}).json()) == 7
+
+
+def test_media_gallery_query_uses_composite_index(client: TestClient):
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT * FROM media WHERE is_public = 1 ORDER BY created_at DESC, id DESC LIMIT 50"
+    )).all()
+    db.close()
+    detail = " ".join(row[-1] for row in plan)
+    assert "ix_media_public_created" in detail
+    assert "TEMP B-TREE" not in detail
+
+
+def test_resumable_upload_survives_dropped_chunk(client: TestClient, upload_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(media_api.upload_sessions, "directory", str(tmp_path / "sessions"))
+    data = PNG + bytes(range(256)) * 4
+
+    r = client.post("/api/media/uploads", json={"size": len(data), "caption": "Partia zdjęć"})
+    assert r.status_code == 201, r.text
+    session_id = r.json()["id"]
+    assert r.headers["Location"].endswith(f"/media/uploads/{session_id}")
+
+    def patch(offset, chunk):
+        return client.patch(f"/api/media/uploads/{session_id}", content=chunk, headers={"Upload-Offset": str(offset)})
+
+    assert patch(0, data[:500]).json()["offset"] == 500
+    # klient nie dostał odpowiedzi i ponawia od zera -> 409 z bieżącym offsetem
+    r = patch(0, data[:500])
+    assert r.status_code == 409 and r.headers["Upload-Offset"] == "500"
+
+    assert client.post(f"/api/media/uploads/{session_id}/complete").status_code == 409  # niekompletny
+    offset = int(client.get(f"/api/media/uploads/{session_id}").headers["Upload-Offset"])
+    assert patch(offset, data[offset:] + b"!").status_code == 413  # ponad zadeklarowany rozmiar
+    assert patch(offset, data[offset:]).json()["offset"] == len(data)
+
+    r = client.post(f"/api/media/uploads/{session_id}/complete")
+    assert r.status_code == 201, r.text
+    media = r.json()
+    assert media["caption"] == "Partia zdjęć"
+    assert media["sha256"] == hashlib.sha256(data).hexdigest()
+    assert (upload_dir / f"{media['sha256']}.png").read_bytes() == data
+    assert os.listdir(tmp_path / "sessions") == []
+    assert client.get(f"/api/media/uploads/{session_id}").status_code == 404
+
+
+def test_upload_sessions_live_hidden_inside_upload_dir(client: TestClient, upload_dir, monkeypatch):
+    assert media_api.upload_sessions.directory == os.path.join("app/static/uploads", ".sessions")
+    # niedokończone uploady nie wyciekają przez /static
+    session_id = client.post("/api/media/uploads", json={"size": len(PNG)}).json()["id"]
+    assert client.get(f"/static/uploads/.sessions/{session_id}.json").status_code == 404
+    assert client.delete(f"/api/media/uploads/{session_id}").status_code == 204
+
+    # finalizacja to rename w obrębie jednego systemu plików
+    monkeypatch.setattr(media_api.upload_sessions, "directory", str(upload_dir / ".sessions"))
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: (replaced.append(dst), real_replace(src, dst)))
+    session_id = client.post("/api/media/uploads", json={"size": len(PNG)}).json()["id"]
+    client.patch(f"/api/media/uploads/{session_id}", content=PNG, headers={"Upload-Offset": "0"})
+    r = client.post(f"/api/media/uploads/{session_id}/complete")
+    assert r.status_code == 201, r.text
+    assert str(upload_dir / f"{r.json()['sha256']}.png") in replaced
+    assert os.listdir(upload_dir / ".sessions") == []
+
+
+def test_resumable_upload_rejects_non_image_on_first_chunk(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(media_api.upload_sessions, "directory", str(tmp_path / "sessions"))
+    session_id = client.post("/api/media/uploads", json={"size": 100}).json()["id"]
+    r = client.patch(f"/api/media/uploads/{session_id}", content=b"MZ" + b"\x00" * 20, headers={"Upload-Offset": "0"})
+    assert r.status_code == 400
+    assert client.get(f"/api/media/uploads/{session_id}").status_code == 404
+    assert client.post("/api/media/uploads", json={"size": settings.media_max_upload_bytes + 1}).status_code == 413
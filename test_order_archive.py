@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, UTC
+
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from test_order_counters import _place_order
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.deps import get_db
+from app.db.models import UserDB, OrderDB, OrderArchiveDB
+from app.db.order_archive import archive_orders, find_order
+
+
+def test_archived_orders_are_read_through(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    old_id = _place_order(client)
+    fresh_id = _place_order(client)
+    client.patch(f"/admin/api/orders/{old_id}/status", json={"status": "SHIPPED"})
+    client.patch(f"/admin/api/orders/{fresh_id}/status", json={"status": "SHIPPED"})
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.get(OrderDB, old_id).created_at = datetime.now(UTC) - timedelta(days=400)
+    db.commit()
+
+    assert archive_orders(db, older_than_days=180, batch_size=1) == 1
+    assert db.get(OrderDB, old_id) is None
+    assert db.get(OrderArchiveDB, old_id) is not None
+    assert db.get(OrderDB, fresh_id) is not None
+    db.close()
+
+    r = client.get(f"/api/orders/{old_id}")
+    assert r.status_code == 200, r.text
+    assert r.json()["status"] == "SHIPPED"
+    assert len(r.json()["items"]) == 1
+
+    r = client.get(f"/admin/api/orders/{old_id}")
+    assert r.status_code == 200, r.text
+
+    ids = [o["id"] for o in client.get("/admin/api/orders").json()]
+    assert ids == [fresh_id, old_id]
+    ids = [o["id"] for o in client.get("/api/orders").json()]
+    assert ids == [fresh_id, old_id]
+
+    r = client.patch(f"/admin/api/orders/{old_id}/status", json={"status": "NEW"})
+    assert r.status_code == 409
+
+    # counters keep archived orders
+    assert client.post("/admin/api/orders/stats/reconcile").json()["drift"] == {}
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_archiving_newest_order_does_not_free_its_id(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    archived_id = _place_order(client)
+    client.patch(f"/admin/api/orders/{archived_id}/status", json={"status": "CANCELED"})
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.get(OrderDB, archived_id).created_at = datetime.now(UTC) - timedelta(days=400)
+    db.commit()
+    assert archive_orders(db, older_than_days=180) == 1
+
+    # SQLite bez AUTOINCREMENT oddałby to samo id -> kolizja z archiwum (i z outboxem)
+    new_id = _place_order(client)
+    assert new_id > archived_id
+    db.expire_all()
+    assert isinstance(find_order(db, new_id), OrderDB)
+    assert isinstance(find_order(db, archived_id), OrderArchiveDB)
+    db.close()
+
+    del fastapi_app.dependency_overrides[get_current_user]
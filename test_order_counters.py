@@ -0,0 +1,159 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, insert
+from sqlalchemy.orm import Session
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.deps import get_db
+from app.db.models import UserDB, OrderDB, OrderStatusCounterDB
+from app.db.order_counters import (
+    bump_order_status,
+    count_orders_by_status,
+    read_order_counters,
+    reconcile_order_counters,
+)
+
+
+def _place_order(client: TestClient, headers: dict | None = None) -> int:
+    r = client.post(
+        "/api/products",
+        json={"name": "Licznik", "description": "", "price_pln": 1000, "is_active": True, "stock_qty": 10},
+    )
+    assert r.status_code == 201, r.text
+    pid = r.json()["id"]
+    client.get("/api/cart")
+    r = client.post("/api/cart/items", json={"product_id": pid, "qty": 1})
+    assert r.status_code == 201, r.text
+
+    r = client.post(
+        "/api/checkout",
+        json={
+            "first_name": "Jan",
+            "last_name": "Kowalski",
+            "phone": "+48500100200",
+            "address_line1": "Kwiatowa 1",
+            "city": "Warszawa",
+            "postal_code": "00-001",
+            "country": "PL",
+            "shipping_method": "PICKUP",
+        },
+        headers=headers,
+    )
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+def test_counters_follow_checkout_and_status_changes(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    first = _place_order(client)
+    _place_order(client)
+
+    r = client.get("/admin/api/orders/stats")
+    assert r.status_code == 200, r.text
+    assert r.json()["counts"]["NEW"] == 2
+    assert r.json()["total"] == 2
+
+    r = client.patch(f"/admin/api/orders/{first}/status", json={"status": "SHIPPED"})
+    assert r.status_code == 200, r.text
+
+    counts = client.get("/admin/api/orders/stats").json()["counts"]
+    assert counts["NEW"] == 1
+    assert counts["SHIPPED"] == 1
+    assert counts["PAID"] == 0
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_reconcile_fixes_drift(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    order_id = _place_order(client)
+
+    # status changed behind the counters' back
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.get(OrderDB, order_id).status = "CANCELED"
+    db.commit()
+    db.close()
+
+    r = client.post("/admin/api/orders/stats/reconcile")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["drift"] == {"NEW": 1, "CANCELED": -1}
+    assert body["counts"]["NEW"] == 0
+    assert body["counts"]["CANCELED"] == 1
+
+    r = client.post("/admin/api/orders/stats/reconcile")
+    assert r.json()["drift"] == {}
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_counter_row_created_by_a_concurrent_transaction(client: TestClient):
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    engine = db.get_bind()
+    db.execute(delete(OrderStatusCounterDB))
+    db.commit()
+    raced = []
+
+    def competitor(conn, cursor, statement, params, context, executemany):
+        # inny checkout tworzy wiersz statusu tuż przed naszym INSERT-em
+        if statement.startswith("INSERT INTO order_status_counters") and not raced:
+            raced.append(True)
+            with engine.begin() as other:
+                other.execute(insert(OrderStatusCounterDB).values(status="NEW", count=5))
+
+    event.listen(engine, "before_cursor_execute", competitor)
+    try:
+        bump_order_status(db, None, "NEW")
+        db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", competitor)
+    assert raced
+    assert read_order_counters(db)["NEW"] == 6
+    db.close()
+
+
+def test_reconcile_blocks_status_changes_until_it_commits(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+    order_id = _place_order(client)
+    del fastapi_app.dependency_overrides[get_current_user]
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    engine = db.get_bind()
+    db.merge(OrderStatusCounterDB(status="PAID", count=7))  # dryf, który reconcile nadpisze
+    db.commit()
+
+    def pay():
+        with Session(engine) as other:
+            bump_order_status(other, "NEW", "PAID")
+            other.get(OrderDB, order_id).status = "PAID"
+            other.commit()
+
+    payer = threading.Thread(target=pay)
+
+    def after_recount(conn, cursor, statement, params, context, executemany):
+        # zmiana statusu między przeliczeniem a zapisem liczników nie może zostać nadpisana
+        if "FROM orders_archive GROUP BY" in statement and payer.ident is None:
+            payer.start()
+            time.sleep(0.3)
+
+    event.listen(engine, "after_cursor_execute", after_recount)
+    try:
+        reconcile_order_counters(db)
+    finally:
+        event.remove(engine, "after_cursor_execute", after_recount)
+    payer.join()
+
+    db.expire_all()
+    counters = read_order_counters(db)
+    assert counters == count_orders_by_status(db)
+    assert counters["PAID"] == 1
+    db.close()
@@ -0,0 +1,121 @@
+import json
+import threading
+from datetime import datetime, timedelta, UTC
+
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from test_order_counters import _place_order
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.deps import get_db
+from sqlalchemy import select
+
+from app.db.models import OrderDB, OutboxEventDB, UserDB
+from app.db.order_archive import archive_orders
+from app.db.outbox import ORDER_STATUS_CHANGED, add_order_event, relay_outbox
+from app.core.outbox_sinks import JsonlFileSink
+
+
+class ListSink:
+    name = "list"
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.events: list[dict] = []
+
+    def deliver(self, events):
+        if self.fail:
+            raise RuntimeError("sink down")
+        self.events.extend(events)
+
+
+def test_order_events_relayed_in_order(client: TestClient, tmp_path):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    order_id = _place_order(client)
+    client.patch(f"/admin/api/orders/{order_id}/status", json={"status": "IN_PREPARATION"})
+    client.patch(f"/admin/api/orders/{order_id}/status", json={"status": "SHIPPED"})
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+
+    # failing sink -> nothing marked delivered, retried later
+    broken = ListSink(fail=True)
+    assert relay_outbox(db, [broken]) == 0
+
+    sink = ListSink()
+    file_sink = JsonlFileSink(str(tmp_path / "outbox.jsonl"))
+    assert relay_outbox(db, [sink, file_sink], batch_size=2) == 2
+    assert relay_outbox(db, [sink, file_sink], batch_size=2) == 1
+    assert relay_outbox(db, [sink, file_sink]) == 0
+    db.close()
+
+    assert [(e["type"], e["seq"]) for e in sink.events] == [
+        ("order.placed", 1),
+        ("order.status_changed", 2),
+        ("order.status_changed", 3),
+    ]
+    assert sink.events[2]["data"]["status"] == "SHIPPED"
+    assert sink.events[2]["data"]["previous_status"] == "IN_PREPARATION"
+
+    lines = (tmp_path / "outbox.jsonl").read_text().splitlines()
+    assert [json.loads(line)["seq"] for line in lines] == [1, 2, 3]
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_concurrent_events_for_one_order_get_distinct_seq(client: TestClient):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="admin@lanari.pl", is_active=True)
+    order_id = _place_order(client)
+    sessions = fastapi_app.dependency_overrides[get_db]
+    errors = []
+    start = threading.Barrier(4)
+
+    def change_status():
+        start.wait()
+        for _ in range(5):
+            db = next(sessions())
+            try:
+                # odczyt zamówienia przed zapisem - tak jak admin PATCH i worker płatności
+                add_order_event(db, db.get(OrderDB, order_id), ORDER_STATUS_CHANGED)
+                db.commit()
+            except Exception as exc:  # pragma: no cover - to właśnie ma się nie zdarzyć
+                errors.append(exc)
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=change_status) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+    db = next(sessions())
+    seqs = db.execute(select(OutboxEventDB.seq).where(OutboxEventDB.order_id == order_id)).scalars().all()
+    assert sorted(seqs) == list(range(1, 22))  # order.placed + 20 zmian
+    assert db.get(OrderDB, order_id).outbox_seq == 21
+    db.close()
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_events_keyed_on_ids_that_archiving_never_frees(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    old_id = _place_order(client)
+    client.patch(f"/admin/api/orders/{old_id}/status", json={"status": "CANCELED"})
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.get(OrderDB, old_id).created_at = datetime.now(UTC) - timedelta(days=400)
+    db.commit()
+    assert archive_orders(db, older_than_days=180) == 1
+
+    # zdarzenia zarchiwizowanego zamówienia zostają w outboxie; nowe nie może trafić na jego (order_id, seq)
+    new_id = _place_order(client)
+    assert new_id != old_id
+    keys = db.execute(select(OutboxEventDB.order_id, OutboxEventDB.seq).order_by(OutboxEventDB.id)).all()
+    assert keys == [(old_id, 1), (old_id, 2), (new_id, 1)]
+    db.close()
+
+    del fastapi_app.dependency_overrides[get_current_user]
@@ -0,0 +1,178 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from test_api_flow import client  # noqa: F401
+from test_order_counters import _place_order
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.deps import get_db
+from app.db.models import UserDB, OrderDB, PaymentAttemptDB, PaymentInboxDB, OutboxEventDB
+from app.db import payment_inbox
+from app.db.payment_inbox import process_payment_inbox
+from app.core.config import settings
+from app.core.webhook_signatures import SIGNATURE_HEADER, sign_payload
+
+SECRET = "whsec-test"
+
+
+@pytest.fixture(autouse=True)
+def webhook_secret(monkeypatch):
+    monkeypatch.setattr(settings, "payment_webhook_secrets", {"mockpay": SECRET})
+
+
+def _post_webhook(client: TestClient, event: dict, signature: str | None = "sign", provider: str = "mockpay"):
+    body = json.dumps(event).encode()
+    headers = {"Content-Type": "application/json"}
+    if signature == "sign":
+        signature = sign_payload(SECRET, body)
+    if signature is not None:
+        headers[SIGNATURE_HEADER] = signature
+    return client.post(f"/api/payments/webhooks/{provider}", content=body, headers=headers)
+
+
+class MockProvider:
+    """Local stand-in for a payment provider that retries callbacks."""
+
+    def __init__(self, client: TestClient, retries: int = 3):
+        self.client = client
+        self.retries = retries
+        self._seq = 0
+
+    def send(self, event_type: str, order_id: int) -> list[dict]:
+        self._seq += 1
+        event = {"id": f"evt_{self._seq}", "type": event_type, "order_id": order_id}
+        acks = []
+        for _ in range(self.retries):
+            r = _post_webhook(self.client, event)
+            assert r.status_code == 202, r.text
+            acks.append(r.json())
+        return acks
+
+
+def test_webhooks_deduped_and_applied_in_batch(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "payment_inbox_worker_enabled", True)
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+
+    paid_id = _place_order(client, headers={"Idempotency-Key": "pay-1"})
+    failed_id = _place_order(client, headers={"Idempotency-Key": "pay-2"})
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    for attempt in db.execute(select(PaymentAttemptDB)).scalars():
+        attempt.provider = "mockpay"
+    db.commit()
+
+    provider = MockProvider(client)
+    acks = provider.send("payment.succeeded", paid_id)
+    assert [a["duplicate"] for a in acks] == [False, True, True]
+    provider.send("payment.failed", failed_id)
+    provider.send("payment.succeeded", 999)
+
+    # nothing applied until the worker runs
+    assert db.get(OrderDB, paid_id).status == "NEW"
+    assert len(db.execute(select(PaymentInboxDB)).scalars().all()) == 3
+
+    assert process_payment_inbox(db, batch_size=10) == 3
+    assert process_payment_inbox(db) == 0
+    db.expire_all()
+
+    assert db.get(OrderDB, paid_id).status == "PAID"
+    assert db.get(OrderDB, failed_id).status == "NEW"
+    statuses = {p.order_id: p.status for p in db.execute(select(PaymentAttemptDB)).scalars()}
+    assert statuses == {paid_id: "SUCCEEDED", failed_id: "FAILED"}
+    results = [r.result for r in db.execute(select(PaymentInboxDB).order_by(PaymentInboxDB.id)).scalars()]
+    assert results == ["applied", "applied", "error"]
+
+    changes = db.execute(
+        select(OutboxEventDB).where(OutboxEventDB.event_type == "order.status_changed")
+    ).scalars().all()
+    assert [e.order_id for e in changes] == [paid_id]
+    db.close()
+
+    assert client.get("/admin/api/orders/stats").json()["counts"]["PAID"] == 1
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_webhook_requires_valid_signature(client: TestClient):
+    event = {"id": "evt_forged", "type": "payment.succeeded", "order_id": 1}
+    assert _post_webhook(client, event, signature=None).status_code == 401
+    assert _post_webhook(client, event, signature="sha256=" + "0" * 64).status_code == 401
+    # podpis innym sekretem / dla providera bez skonfigurowanego sekretu
+    body = json.dumps(event).encode()
+    assert _post_webhook(client, event, signature=sign_payload("other", body)).status_code == 401
+    assert _post_webhook(client, event, provider="unknown").status_code == 401
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    assert db.execute(select(PaymentInboxDB)).scalars().all() == []
+    db.close()
+    assert _post_webhook(client, event).status_code == 202
+
+
+def test_mock_confirm_admin_only(client: TestClient):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=2, email="u@test.com", is_active=True)
+    assert client.post("/api/payments/mock/confirm", json={"order_id": 5}).status_code == 403
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_mock_confirm_goes_through_inbox(client: TestClient):
+    admin = UserDB(id=1, email="admin@lanari.pl", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+    r = client.post("/api/payments/mock/confirm", json={"order_id": 5})
+    assert r.status_code == 202
+    assert r.json()["duplicate"] is False
+    r = client.post("/api/payments/mock/confirm", json={"order_id": 5})
+    assert r.json()["duplicate"] is True
+    assert client.post("/api/payments/mock/confirm", json={}).status_code == 400
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_failing_event_does_not_block_the_rest(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "payment_inbox_worker_enabled", True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="admin@lanari.pl", is_active=True)
+    broken_id = _place_order(client, headers={"Idempotency-Key": "pay-b"})
+    paid_id = _place_order(client, headers={"Idempotency-Key": "pay-p"})
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    for attempt in db.execute(select(PaymentAttemptDB)).scalars():
+        attempt.provider = "mockpay"
+    db.commit()
+
+    real_add_event = payment_inbox.add_order_event
+
+    def add_order_event(db, order, *args, **kwargs):
+        if order.id == broken_id:
+            raise ValueError("bad payload")
+        return real_add_event(db, order, *args, **kwargs)
+
+    monkeypatch.setattr(payment_inbox, "add_order_event", add_order_event)
+    provider = MockProvider(client, retries=1)
+    provider.send("payment.succeeded", broken_id)
+    provider.send("payment.succeeded", paid_id)
+
+    assert process_payment_inbox(db) == 2
+    db.expire_all()
+    assert db.get(OrderDB, broken_id).status == "NEW"  # savepoint wiersza wycofany w całości
+    assert db.get(OrderDB, paid_id).status == "PAID"
+    rows = db.execute(select(PaymentInboxDB).order_by(PaymentInboxDB.id)).scalars().all()
+    assert [(r.result, r.error) for r in rows] == [("error", "ValueError: bad payload"), ("applied", None)]
+    assert all(r.processed_at is not None for r in rows)
+    db.close()
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_webhook_applied_inline_without_worker(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "payment_inbox_worker_enabled", False)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="admin@lanari.pl", is_active=True)
+    order_id = _place_order(client, headers={"Idempotency-Key": "pay-i"})
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    db.execute(select(PaymentAttemptDB)).scalar_one().provider = "mockpay"
+    db.commit()
+
+    MockProvider(client, retries=2).send("payment.succeeded", order_id)
+    db.expire_all()
+    assert db.get(OrderDB, order_id).status == "PAID"
+    db.close()
+    del fastapi_app.dependency_overrides[get_current_user]
@@ -0,0 +1,133 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from test_order_counters import _place_order
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.api.payments import _prepare_attempt, get_payment_provider
+from app.core.config import DEV_PAYMENT_PROVIDER_URL, Settings
+from devtools import mock_provider
+from app.core.payment_provider import (
+    CircuitBreaker,
+    HttpPaymentProvider,
+    PaymentProviderError,
+    ProviderUnavailable,
+    build_http_client,
+)
+from app.db.deps import get_db
+from app.db.models import UserDB
+
+
+@pytest.fixture()
+def provider_app():
+    state = mock_provider.app.state
+    state.delay_s, state.fail_next, state.calls, state.payments = 0.0, 0, 0, {}
+    return mock_provider.app
+
+
+def _provider(**kwargs) -> HttpPaymentProvider:
+    http = build_http_client("http://provider.test", transport=httpx.ASGITransport(app=mock_provider.app))
+    kwargs.setdefault("backoff_base_s", 0.0)
+    return HttpPaymentProvider(http, name="mockpay", **kwargs)
+
+
+def test_retries_transient_errors(provider_app):
+    provider_app.state.fail_next = 2
+
+    intent = asyncio.run(_provider(retries=2).create_payment(1, 1000, "k-1"))
+
+    assert intent.status == "PENDING"
+    assert provider_app.state.calls == 3
+
+
+def test_circuit_opens_and_recovers(provider_app):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=30, clock=lambda: now[0])
+    provider = _provider(retries=0, breaker=breaker)
+    provider_app.state.fail_next = 10
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(PaymentProviderError):
+                await provider.create_payment(1, 1000, "k-1")
+        calls = provider_app.state.calls
+        with pytest.raises(ProviderUnavailable):
+            await provider.create_payment(1, 1000, "k-1")
+        assert provider_app.state.calls == calls  # provider not touched while open
+
+        now[0] = 31
+        provider_app.state.fail_next = 0
+        await provider.create_payment(1, 1000, "k-1")
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_bounded_concurrency_fails_fast(provider_app):
+    provider_app.state.delay_s = 0.2
+    provider = _provider(max_concurrency=1, acquire_timeout_s=0.05)
+
+    async def scenario():
+        return await asyncio.gather(
+            provider.create_payment(1, 1000, "k-1"),
+            provider.create_payment(2, 1000, "k-2"),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert sum(isinstance(r, ProviderUnavailable) for r in results) == 1
+    assert provider.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_start_payment_endpoint(client: TestClient, provider_app):
+    user = UserDB(id=1, email="pay@test.com", full_name="Payer", is_active=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: user
+    fastapi_app.dependency_overrides[get_payment_provider] = lambda: _provider()
+
+    order_id = _place_order(client)
+    r1 = client.post(f"/api/payments/{order_id}/start")
+    assert r1.status_code == 200, r1.text
+    r2 = client.post(f"/api/payments/{order_id}/start")
+    assert r2.json()["provider_ref"] == r1.json()["provider_ref"]
+
+    provider_app.state.fail_next = 10
+    fastapi_app.dependency_overrides[get_payment_provider] = lambda: _provider(retries=0)
+    order_id = _place_order(client)
+    assert client.post(f"/api/payments/{order_id}/start").status_code == 502
+
+    del fastapi_app.dependency_overrides[get_payment_provider]
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_prepare_attempt_releases_connection_on_every_path(client: TestClient):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="pay@test.com", is_active=True)
+    order_id = _place_order(client)
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    pool = db.get_bind().pool
+    try:
+        for email, expected in (("pay@test.com", None), ("pay@test.com", None), ("other@test.com", 404)):
+            try:
+                _prepare_attempt(db, order_id, email, "mockpay")
+            except HTTPException as exc:
+                assert exc.status_code == expected
+            else:
+                assert expected is None
+            assert not db.in_transaction()
+            assert pool.checkedout() == 0
+    finally:
+        db.close()
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_provider_url_required_outside_development(monkeypatch):
+    monkeypatch.delenv("PAYMENT_PROVIDER_URL", raising=False)
+    assert Settings(_env_file=None, app_env="development").payment_provider_url == DEV_PAYMENT_PROVIDER_URL
+    with pytest.raises(ValueError, match="PAYMENT_PROVIDER_URL"):
+        Settings(_env_file=None, app_env="production")
+    url = "https://pay.example.com"
+    assert Settings(_env_file=None, app_env="production", payment_provider_url=url).payment_provider_url == url
@@ -0,0 +1,100 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, insert, select
+
+from test_api_flow import client  # noqa: F401
+from test_order_counters import _place_order
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.core import events
+from app.core.config import settings
+from app.core.events import OrderPlaced
+from app.db.deps import get_db
+from app.db.models import CustomerProfileDB, OutboxEventDB, UserDB
+from app.db.order_events import upsert_customer_profile
+from app.db.outbox import process_outbox_handlers
+
+
+def test_checkout_profile_upserted_after_commit(client: TestClient):
+    user = UserDB(id=7, email="async@test.com", full_name="Async", is_active=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: user
+
+    _place_order(client)
+
+    profile = client.get("/api/me/checkout-profile").json()
+    assert profile["first_name"] == "Jan"
+    assert profile["postal_code"] == "00-001"
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_failing_handler_does_not_affect_order(client: TestClient):
+    user = UserDB(id=8, email="broken@test.com", full_name="Broken", is_active=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: user
+
+    def broken(db, event):
+        raise RuntimeError("smtp down")
+
+    events._handlers[OrderPlaced].insert(0, broken)
+    try:
+        order_id = _place_order(client)
+    finally:
+        events._handlers[OrderPlaced].remove(broken)
+
+    assert client.get(f"/api/orders/{order_id}").status_code == 200
+    # remaining handlers still ran
+    assert client.get("/api/me/checkout-profile").json()["first_name"] == "Jan"
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_handlers_run_from_the_outbox_after_a_lost_nudge(client: TestClient, monkeypatch):
+    user = UserDB(id=9, email="crash@test.com", full_name="Crash", is_active=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: user
+    # worker "włączony", ale nie działa - jak proces, który padł zaraz po commicie
+    monkeypatch.setattr(settings, "outbox_handler_worker_enabled", True)
+
+    _place_order(client)
+    assert client.get("/api/me/checkout-profile").json() is None
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    assert process_outbox_handlers(db) == 1
+    assert process_outbox_handlers(db) == 0
+    assert db.execute(select(func.count()).where(OutboxEventDB.handled_at.is_(None))).scalar_one() == 0
+    db.close()
+    assert client.get("/api/me/checkout-profile").json()["first_name"] == "Jan"
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_profile_upsert_survives_a_concurrent_first_checkout(client: TestClient, monkeypatch):
+    user = UserDB(id=10, email="race@test.com", full_name="Race", is_active=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: user
+    monkeypatch.setattr(settings, "outbox_handler_worker_enabled", True)
+    order_id = _place_order(client)
+
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    engine = db.get_bind()
+    raced = []
+
+    def competitor(conn, cursor, statement, params, context, executemany):
+        # drugi checkout tego samego klienta zapisuje profil tuż przed naszym INSERT-em
+        if statement.startswith("INSERT INTO customer_profiles") and not raced:
+            raced.append(True)
+            with engine.begin() as other:
+                other.execute(insert(CustomerProfileDB).values(
+                    user_id=10, first_name="Inny", last_name="Checkout", phone="+48500000000",
+                    address_line1="Polna 2", city="Kraków", postal_code="30-001", country="PL",
+                ))
+
+    event.listen(engine, "before_cursor_execute", competitor)
+    try:
+        upsert_customer_profile(db, OrderPlaced(order_id=order_id, user_id=10, email="race@test.com"))
+        db.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", competitor)
+    assert raced
+    profile = db.execute(select(CustomerProfileDB).where(CustomerProfileDB.user_id == 10)).scalar_one()
+    assert profile.first_name == "Jan"
+    db.close()
+
+    del fastapi_app.dependency_overrides[get_current_user]
@@ -0,0 +1,50 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db import queries
+from app.db.database import Base
+from app.db.models import CartDB, CartItemDB, ProductDB, UserDB
+
+
+def _seeded_session() -> Session:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add_all([UserDB(email="a@example.com", password_hash="x"), UserDB(email="b@example.com", password_hash="x")])
+    db.add_all(ProductDB(name=f"P{i}", price_pln=100, is_active=i % 2 == 0, stock_qty=5) for i in range(4))
+    db.add_all([CartDB(token="t1"), CartDB(token="t2")])
+    db.flush()
+    db.add_all([CartItemDB(cart_id=1, product_id=1, qty=1, unit_price_pln=100), CartItemDB(cart_id=2, product_id=3, qty=2, unit_price_pln=100)])
+    db.commit()
+    return db
+
+
+def test_cached_statements_bind_fresh_values_per_call():
+    # lambda_stmt cache'uje konstrukcję, ale wartości z domknięcia muszą trafiać jako parametry
+    with _seeded_session() as db:
+        assert db.execute(queries.user_by_email("a@example.com")).scalar_one().email == "a@example.com"
+        assert db.execute(queries.user_by_email("b@example.com")).scalar_one().email == "b@example.com"
+        assert db.execute(queries.user_by_email("c@example.com")).scalar_one_or_none() is None
+
+        assert db.execute(queries.cart_by_token("t1")).scalar_one().id == 1
+        assert db.execute(queries.cart_by_token("t2")).scalar_one().id == 2
+
+        assert db.execute(queries.cart_item(1, 1)).scalar_one().qty == 1
+        assert db.execute(queries.cart_item(2, 3)).scalar_one().qty == 2
+        assert db.execute(queries.cart_item(1, 3)).scalar_one_or_none() is None
+
+        assert sorted(p.id for p in db.scalars(queries.products_by_ids([1, 2]))) == [1, 2]
+        assert sorted(p.id for p in db.scalars(queries.products_by_ids([3, 4, 2]))) == [2, 3, 4]
+
+
+def test_optional_criteria_use_separate_cache_entries():
+    with _seeded_session() as db:
+        assert len(db.scalars(queries.products(active_only=True)).all()) == 2
+        assert len(db.scalars(queries.products(active_only=False)).all()) == 4
+        assert len(db.scalars(queries.products(active_only=True)).all()) == 2
+
+
+def test_order_lookups_without_rows():
+    with _seeded_session() as db:
+        assert db.scalars(queries.orders_for_email("a@example.com")).all() == []
+        assert db.execute(queries.order_for_cart(1)).scalar_one_or_none() is None
@@ -0,0 +1,284 @@
+"""EXPLAIN QUERY PLAN for every statement the routers issue on a seeded database.
+
+Fails when a statement would read a large table with a `SCAN` - plain or over an index.
+The only index scan accepted is keyset access: the index supplies ORDER BY and the
+statement stops at LIMIT. New queries on these tables need a supporting index (and an
+Alembic migration).
+"""
+import asyncio
+import io
+import json
+import re
+from types import SimpleNamespace
+from datetime import datetime, timedelta, UTC
+
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import event, insert
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.api import media as media_api
+from app.api.deps import get_current_user, get_current_user_optional
+from app.api.payments import get_payment_provider
+from app.core.config import settings
+from app.core.password_pool import password_hasher
+from app.core.webhook_signatures import SIGNATURE_HEADER, sign_payload
+from app.db.deps import get_async_db, get_db
+from app.db.models import MediaDB, OrderDB, OrderArchiveDB, PaymentAttemptDB, UserDB
+from app.db.payment_inbox import process_payment_inbox
+
+# tabele, które w produkcji rosną bez ograniczeń - tu pełny skan to regresja
+LARGE_TABLES = {
+    "orders",
+    "order_items",
+    "orders_archive",
+    "order_items_archive",
+    "payment_attempts",
+    "cart_items",
+    "media",
+    "media_variants",
+    "outbox_events",
+    "payment_inbox",
+}
+
+SEED_ROWS = 300
+
+# świadome pełne przejścia - rekoncyliacja liczników z definicji liczy wszystkie zamówienia
+INTENTIONAL_SCANS = [
+    re.compile(r"^SELECT .* FROM (orders|orders_archive) GROUP BY \1\.status$"),
+]
+
+
+def _seed(db) -> None:
+    now = datetime.now(UTC)
+    order = {
+        "full_name": "Jan Kowalski",
+        "buyer_first_name": "Jan",
+        "buyer_last_name": "Kowalski",
+        "buyer_phone": "+48500100200",
+        "shipping_address_line1": "Kwiatowa 1",
+        "shipping_city": "Warszawa",
+        "shipping_postal_code": "00-001",
+        "total_pln": 1000,
+        "shipping_method": "PICKUP",
+        "shipping_cost_pln": 0,
+        "shipping_country": "PL",
+        "status": "SHIPPED",
+    }
+    rows = []
+    for i in range(SEED_ROWS):
+        email = f"seed{i % 50}@lanari.pl"
+        rows.append({**order, "id": 100000 + i, "cart_id": -1 - i, "email": email, "buyer_email": email,
+                     "created_at": now - timedelta(days=i)})
+    db.execute(insert(OrderDB), rows)
+    db.execute(insert(OrderArchiveDB), [{**r, "id": 200000 + i, "archived_at": now} for i, r in enumerate(rows)])
+    db.execute(insert(PaymentAttemptDB), [
+        {"order_id": r["id"], "provider": "mockpay", "status": "PENDING", "idempotency_key": f"seed-{r['id']}",
+         "created_at": now}
+        for r in rows
+    ])
+    db.execute(insert(MediaDB), [
+        {"filename": f"{i}.png", "url": f"/static/uploads/{i}.png", "is_public": i % 3 > 0, "owner_id": i % 7,
+         "created_at": now - timedelta(minutes=i)}
+        for i in range(SEED_ROWS)
+    ])
+    db.commit()
+
+
+def _async_engine():
+    async def bind():
+        gen = fastapi_app.dependency_overrides[get_async_db]()
+        db = await gen.__anext__()
+        engine = db.bind
+        await gen.aclose()
+        return engine
+
+    return asyncio.run(bind())
+
+
+class _StubProvider:
+    name = "mockpay"
+
+    async def create_payment(self, order_id, amount, idempotency_key):
+        return SimpleNamespace(provider=self.name, provider_ref=f"ref-{order_id}", status="PENDING", redirect_url=None)
+
+
+def _exercise_routers(client: TestClient) -> None:
+    # auth przed nadpisaniem get_current_user - /me ma zrobić prawdziwy lookup
+    client.post("/api/auth/register", json={"email": "plan@lanari.pl", "password": "swieczki123"})
+    token = client.post("/api/auth/login", json={"email": "plan@lanari.pl", "password": "swieczki123"}).json()
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token['access_token']}"})
+    assert me.status_code == 200, me.text
+
+    admin = UserDB(id=1, email="seed1@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+    fastapi_app.dependency_overrides[get_current_user_optional] = lambda: admin
+
+    client.get("/admin/api/products")
+    r = client.post("/admin/api/products", json={"name": "Do usunięcia", "description": "", "price_pln": 500})
+    assert r.status_code == 200, r.text
+    client.patch(f"/admin/api/products/{r.json()['id']}", json={"price_pln": 700})
+    assert client.delete(f"/admin/api/products/{r.json()['id']}").status_code == 200
+    client.patch(f"/admin/api/users/{me.json()['id']}", json={"is_active": True})
+
+    r = client.post("/api/products", json={
+        "name": "Świeca", "description": "", "price_pln": 1000, "is_active": True, "stock_qty": 50,
+        "image_url": "/static/uploads/1.png",
+    })
+    assert r.status_code == 201, r.text
+    pid = r.json()["id"]
+    client.get("/api/products")
+    client.get(f"/api/products/{pid}")
+    client.patch(f"/api/products/{pid}", json={"price_pln": 1200})
+
+    cart = client.get("/api/cart").json()
+    item = client.post("/api/cart/items", json={"product_id": pid, "qty": 2}).json()["items"][0]
+    client.patch(f"/api/cart/items/{item['id']}", json={"qty": 1})
+    extra = client.post("/api/products", json={
+        "name": "Knot", "description": "", "price_pln": 100, "is_active": True, "stock_qty": 5,
+    }).json()["id"]
+    extra_item = next(
+        i for i in client.post("/api/cart/items", json={"product_id": extra, "qty": 1}).json()["items"]
+        if i["product_id"] == extra
+    )
+    assert client.delete(f"/api/cart/items/{extra_item['id']}").status_code == 204
+    client.get("/api/shipping/methods", params={"cart_id": cart["id"]})
+    client.post("/api/cart/shipping", params={"cart_id": cart["id"]}, json={"shipping_method": "PICKUP"})
+    r = client.post(
+        "/api/checkout",
+        json={
+            "first_name": "Jan", "last_name": "Kowalski", "phone": "+48500100200", "address_line1": "Kwiatowa 1",
+            "city": "Warszawa", "postal_code": "00-001", "country": "PL",
+        },
+        headers={"Idempotency-Key": "plan-1"},
+    )
+    assert r.status_code == 201, r.text
+    order_id = r.json()["id"]
+
+    client.get("/api/orders")
+    client.get(f"/api/orders/{order_id}")
+    client.get("/api/orders/200005")  # z archiwum
+    client.get("/api/me/checkout-profile")
+
+    client.get("/api/media")
+    page = client.get("/api/media", params={"include_hidden": True, "limit": 10})
+    client.get("/api/media", params={"cursor": page.headers["X-Next-Cursor"], "owner_id": 3})
+    _exercise_media(client)
+
+    fastapi_app.dependency_overrides[get_payment_provider] = lambda: _StubProvider()
+    r = client.post(f"/api/payments/{order_id}/start")
+    assert r.status_code == 200, r.text
+    client.post("/api/payments/mock/confirm", json={"order_id": order_id})
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    process_payment_inbox(db)
+    db.close()
+    body = json.dumps({"id": "evt-plan-1", "type": "payment.succeeded", "order_id": order_id}).encode()
+    r = client.post(
+        "/api/payments/webhooks/mockpay",
+        content=body,
+        headers={"Content-Type": "application/json", SIGNATURE_HEADER: sign_payload("plan-secret", body)},
+    )
+    assert r.status_code == 202, r.text
+
+    client.get("/admin/api/orders")
+    client.get("/admin/api/orders/stats")
+    client.get(f"/admin/api/orders/{order_id}")
+    client.patch(f"/admin/api/orders/{order_id}/status", json={"status": "SHIPPED"})
+    client.post("/admin/api/orders/archive", params={"older_than_days": 30})
+    client.post("/admin/api/orders/stats/reconcile")
+
+    for path in ("login-throttle", "db-pool", "slow-queries"):
+        client.get(f"/admin/api/metrics/{path}")
+    client.post("/admin/api/metrics/slow-queries/reset")
+
+
+def _exercise_media(client: TestClient) -> None:
+    buf = io.BytesIO()
+    Image.new("RGB", (40, 30), (200, 120, 40)).save(buf, "PNG")
+    png = buf.getvalue()
+    r = client.post("/api/media", files={"file": ("a.png", png, "image/png")}, data={"caption": "plan"})
+    assert r.status_code == 201, r.text
+    media_id = r.json()["id"]
+    client.post("/api/media", files={"file": ("b.png", png, "image/png")})  # duplikat -> wspólny blob
+
+    session_id = client.post("/api/media/uploads", json={"size": len(png)}).json()["id"]
+    client.patch(f"/api/media/uploads/{session_id}", content=png, headers={"Upload-Offset": "0"})
+    client.get(f"/api/media/uploads/{session_id}")
+    assert client.post(f"/api/media/uploads/{session_id}/complete").status_code == 201
+    session_id = client.post("/api/media/uploads", json={"size": len(png)}).json()["id"]
+    client.delete(f"/api/media/uploads/{session_id}")
+
+    assert client.delete(f"/api/media/{media_id}").status_code == 204
+    client.post("/api/media/gc", params={"delete": True, "grace_s": 0})
+
+
+def _keyset(statement: str, plan_details: list[str]) -> bool:
+    """Index walk that returns rows already ordered and stops at LIMIT."""
+    sql = " ".join(statement.upper().split())
+    return (
+        " ORDER BY " in sql
+        and re.search(r"\bLIMIT\b", sql) is not None
+        and not any("TEMP B-TREE FOR ORDER BY" in d for d in plan_details)
+    )
+
+
+def _full_scans(conn, statement: str, params) -> list[str]:
+    if isinstance(params, list):
+        params = params[0] if params else ()
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params).all()
+    details = [row[-1] for row in plan]
+    scans = []
+    for detail in details:
+        words = detail.split()
+        if words[:1] != ["SCAN"] or len(words) < 2 or words[1] not in LARGE_TABLES:
+            continue
+        # "SCAN orders" i "SCAN orders USING (COVERING) INDEX ..." czytają całą tabelę / cały indeks;
+        # wyjątek to keyset - indeks daje ORDER BY, a LIMIT kończy przejście po kilku wierszach
+        if "USING" in words and _keyset(statement, details):
+            continue
+        scans.append(detail)
+    return scans
+
+
+def test_router_queries_do_not_scan_large_tables(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(password_hasher, "rounds", 4)
+    monkeypatch.setattr(settings, "payment_webhook_secrets", {"mockpay": "plan-secret"})
+    monkeypatch.setattr(media_api, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(media_api.upload_sessions, "directory", str(tmp_path / ".sessions"))
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    _seed(db)
+    engine = db.get_bind()
+    db.close()
+    async_engine = _async_engine()
+
+    statements: dict[str, object] = {}
+
+    def capture(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            statements.setdefault(statement, params)
+
+    targets = [engine, async_engine.sync_engine]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", capture)
+    try:
+        _exercise_routers(client)
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", capture)
+        fastapi_app.dependency_overrides.pop(get_current_user, None)
+        fastapi_app.dependency_overrides.pop(get_current_user_optional, None)
+        fastapi_app.dependency_overrides.pop(get_payment_provider, None)
+
+    assert len(statements) > 40
+    offenders = {}
+    with engine.connect() as conn:
+        for statement, params in statements.items():
+            flat = " ".join(statement.split())
+            if any(pattern.match(flat) for pattern in INTENTIONAL_SCANS):
+                continue
+            scans = _full_scans(conn, statement, params)
+            if scans:
+                # lista kolumn nic nie mówi - pokazujemy od FROM
+                offenders[re.sub(r"^SELECT .*? FROM ", "SELECT ... FROM ", " ".join(statement.split()))] = scans
+    assert not offenders, "\n".join(f"{s}\n  -> {p}" for s, p in offenders.items())
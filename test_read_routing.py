@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from starlette.requests import Request
+
+from test_api_flow import client  # noqa: F401
+from test_order_counters import _place_order
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db import deps
+from app.db.models import UserDB
+from app.db.sqlite_tuning import install_sqlite_query_only
+
+
+def _request(cookie: str | None = None) -> Request:
+    headers = [(b"cookie", f"{deps.READ_PRIMARY_COOKIE}={cookie}".encode())] if cookie else []
+    return Request({"type": "http", "headers": headers})
+
+
+class _FakeSession(str):
+    def close(self):
+        pass
+
+
+def test_reads_go_to_primary_right_after_a_write(monkeypatch):
+    monkeypatch.setattr(deps, "SessionLocal", lambda: _FakeSession("primary"))
+    monkeypatch.setattr(deps, "ReadSessionLocal", lambda: _FakeSession("replica"))
+
+    def session_for(request):
+        gen = deps.get_read_db(request)
+        db = next(gen)
+        gen.close()
+        return db
+
+    assert session_for(_request()) == "replica"
+    assert session_for(_request(f"{time.time() + 5:.3f}")) == "primary"
+    assert session_for(_request(f"{time.time() - 1:.3f}")) == "replica"
+    assert session_for(_request("garbage")) == "replica"
+
+
+def test_read_only_pool_rejects_writes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ro.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    install_sqlite_query_only(engine)
+    engine.dispose()  # nowe połączenia dostają query_only
+    try:
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("INSERT INTO t VALUES (1)"))
+    finally:
+        engine.dispose()
+
+
+def test_checkout_pins_reads_to_primary(client: TestClient):
+    user = UserDB(id=9, email="rw@test.com", full_name="RW", is_active=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: user
+
+    r = client.get("/api/products")
+    assert deps.READ_PRIMARY_COOKIE not in r.cookies
+
+    order_id = _place_order(client)
+    assert float(client.cookies[deps.READ_PRIMARY_COOKIE]) > time.time()
+    assert client.get(f"/api/orders/{order_id}").status_code == 200
+
+    del fastapi_app.dependency_overrides[get_current_user]
@@ -0,0 +1,60 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.deps import get_db
+from app.db.models import UserDB
+from app.db.slow_queries import SlowQueryLog, slow_query_log
+
+
+def test_aggregates_per_fingerprint_with_p95():
+    log = SlowQueryLog(threshold_ms=1000, samples=100)
+    for i in range(1, 101):
+        log.record(f"SELECT * FROM products WHERE id = {i}", i / 1000, "GET /api/products/{product_id}")
+    log.record("SELECT * FROM carts WHERE token = ?", 0.5, None)
+
+    products, carts = log.dump()
+    assert products["fingerprint"] == "SELECT * FROM products WHERE id = ?"
+    assert products["count"] == 100
+    assert products["total_ms"] == 5050.0
+    assert products["p95_ms"] == 95.0
+    assert products["max_ms"] == 100.0
+    assert products["routes"] == {"GET /api/products/{product_id}": 100}
+    assert carts["count"] == 1 and carts["slow"] == 0
+
+    log.reset()
+    assert log.dump() == []
+
+
+def test_fingerprints_are_bounded():
+    log = SlowQueryLog(threshold_ms=1000, max_fingerprints=2)
+    for table in ("a", "b", "a", "c"):
+        log.record(f"SELECT * FROM {table}", 0.001, None)
+    assert {r["fingerprint"] for r in log.dump()} == {"SELECT * FROM a", "SELECT * FROM c"}
+
+
+def test_slow_statements_logged_with_route(client: TestClient, monkeypatch, caplog):
+    db = next(fastapi_app.dependency_overrides[get_db]())
+    engine = db.get_bind()
+    db.close()
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 0)
+    slow_query_log.reset()
+    slow_query_log.install(engine)
+
+    with caplog.at_level(logging.WARNING, logger="app.db.slow_queries"):
+        client.get("/api/media")  # sync handler na silniku testowym
+
+    assert any("from GET /api/media:" in r.getMessage() for r in caplog.records)
+    assert any(r["routes"].get("GET /api/media") for r in slow_query_log.dump())
+
+    admin = UserDB(id=1, email="admin@lanari.pl", full_name="Admin", is_active=True, is_admin=True)
+    fastapi_app.dependency_overrides[get_current_user] = lambda: admin
+    body = client.get("/admin/api/metrics/slow-queries").json()
+    assert body["queries"][0]["count"] >= 1
+    assert client.post("/admin/api/metrics/slow-queries/reset").json() == {"ok": True}
+    assert client.get("/admin/api/metrics/slow-queries").json()["queries"] == []
+
+    del fastapi_app.dependency_overrides[get_current_user]
@@ -0,0 +1,102 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.models import UserDB
+from app.db.query_stats import QueryStatsMiddleware, RequestQueryStats, fingerprint, record_requests
+from app.core.config import settings
+
+
+def request_stats(client: TestClient, method: str, url: str, **kwargs) -> RequestQueryStats:
+    """SQL stats of one request (including its post-commit background tasks)."""
+    with record_requests() as records:
+        r = client.request(method, url, **kwargs)
+    assert r.status_code < 400, r.text
+    ((_, _, stats),) = records
+    return stats
+
+
+def selects(stats: RequestQueryStats) -> int:
+    return sum(n for fp, n in stats.fingerprints.items() if fp.startswith("SELECT"))
+
+
+def _product(client: TestClient, i: int) -> int:
+    r = client.post("/api/products", json={"name": f"Świeca {i}", "price_pln": 1000, "stock_qty": 20})
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+CHECKOUT = {
+    "first_name": "Jan",
+    "last_name": "Kowalski",
+    "phone": "+48500100200",
+    "address_line1": "Kwiatowa 1",
+    "city": "Warszawa",
+    "postal_code": "00-001",
+    "country": "PL",
+    "shipping_method": "PICKUP",
+}
+
+
+def test_fingerprint_ignores_values_and_in_list_length():
+    a = fingerprint("SELECT * FROM products WHERE id IN (?, ?, ?) AND name = 'x'")
+    b = fingerprint("SELECT *  FROM products\n WHERE id IN (?) AND name = 'it''s'")
+    assert a == b == "SELECT * FROM products WHERE id IN (...) AND name = ?"
+
+
+def _checkout_stats(client: TestClient, product_ids: list[int]) -> RequestQueryStats:
+    client.cookies.clear()
+    client.get("/api/cart")
+    for pid in product_ids:
+        client.post("/api/cart/items", json={"product_id": pid, "qty": 1})
+    return request_stats(client, "POST", "/api/checkout", json=CHECKOUT)
+
+
+def test_statement_budgets_do_not_grow_with_rows(client: TestClient):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=5, email="n1@test.com", is_active=True)
+
+    ids = [_product(client, i) for i in range(6)]
+    assert request_stats(client, "GET", "/api/products").statements <= 2
+
+    client.get("/api/cart")
+    client.post("/api/cart/items", json={"product_id": ids[0], "qty": 1})
+    one_line_cart = request_stats(client, "GET", "/api/cart").statements
+    client.post("/api/cart/items", json={"product_id": ids[1], "qty": 1})
+    assert request_stats(client, "GET", "/api/cart").statements == one_line_cart
+
+    _checkout_stats(client, ids[:1])  # pierwsze zamówienie tworzy profil i liczniki statusów
+    one_line = _checkout_stats(client, ids[:1])
+    five_lines = _checkout_stats(client, ids[1:])
+    # odczyty stałe; rośnie tylko INSERT pozycji (SQLite: RETURNING wiersz po wierszu)
+    assert selects(five_lines) == selects(one_line)
+    assert five_lines.statements <= one_line.statements + 4
+    assert one_line.statements <= 25
+
+    del fastapi_app.dependency_overrides[get_current_user]
+
+
+def test_server_timing_header_in_debug(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "debug", True)
+    r = client.get("/api/products")
+    assert r.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="' in r.headers["Server-Timing"]
+
+    monkeypatch.setattr(settings, "debug", False)
+    assert "Server-Timing" not in client.get("/api/products").headers
+
+
+def test_repeated_fingerprint_is_logged_as_n_plus_one(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "sql_n_plus_one_threshold", 3)
+    stats = RequestQueryStats()
+    for i in range(5):
+        stats.record(f"SELECT * FROM products WHERE id = {i}", 0.001)
+    stats.record("SELECT * FROM carts WHERE token = ?", 0.001)
+
+    with caplog.at_level(logging.WARNING, logger="app.db.query_stats"):
+        QueryStatsMiddleware._report({"method": "GET", "path": "/api/cart"}, stats)
+
+    (warning,) = caplog.records
+    assert "GET /api/cart: 5 x SELECT * FROM products WHERE id = ?" in warning.getMessage()
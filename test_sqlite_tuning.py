@@ -0,0 +1,70 @@
+import asyncio
+
+from sqlalchemy import create_engine, text
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from test_api_flow import client  # noqa: F401
+from app.main import app as fastapi_app
+from app.api.deps import get_current_user
+from app.db.deps import get_db
+from app.db.models import UserDB
+from app.db.sqlite_tuning import install_sqlite_tuning, sqlite_pragmas
+
+CHECK = "SELECT * FROM pragma_journal_mode, pragma_synchronous, pragma_busy_timeout, pragma_foreign_keys"
+
+
+def test_profile_applied_to_every_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    install_sqlite_tuning(engine)
+    assert sqlite_pragmas()["journal_mode"] == "WAL"
+    try:
+        with engine.connect() as conn:
+            # synchronous: 1 = NORMAL
+            assert tuple(conn.execute(text(CHECK)).one()) == ("wal", 1, 5000, 1)
+            assert conn.execute(text("PRAGMA temp_store")).scalar() == 2
+    finally:
+        engine.dispose()
+
+
+def test_profile_applied_on_aiosqlite(tmp_path):
+    async def check():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'tuned.db'}")
+        install_sqlite_tuning(engine.sync_engine, {"journal_mode": "WAL", "busy_timeout": "250"})
+        try:
+            async with engine.connect() as conn:
+                return (
+                    await conn.scalar(text("PRAGMA journal_mode")),
+                    await conn.scalar(text("PRAGMA busy_timeout")),
+                )
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(check()) == ("wal", 250)
+
+
+def test_admin_hard_delete_of_referenced_product_is_409(client: TestClient):
+    # fixture nie stroi SQLite - tu włączamy egzekwowanie FK jak w profilu produkcyjnym
+    plain_get_db = fastapi_app.dependency_overrides[get_db]
+
+    def get_db_with_fk():
+        for db in plain_get_db():
+            db.execute(text("PRAGMA foreign_keys=ON"))
+            yield db
+
+    fastapi_app.dependency_overrides[get_db] = get_db_with_fk
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=1, email="a@a.pl", is_admin=True)
+    try:
+        ids = [
+            client.post("/api/products", json={"name": f"Świeca {i}", "price_pln": 1000, "stock_qty": 5}).json()["id"]
+            for i in range(2)
+        ]
+        client.get("/api/cart")
+        assert client.post("/api/cart/items", json={"product_id": ids[0], "qty": 1}).status_code == 201
+
+        assert client.delete(f"/admin/api/products/{ids[0]}").status_code == 409
+        assert client.get(f"/api/products/{ids[0]}").status_code == 200
+        assert client.delete(f"/admin/api/products/{ids[1]}").json() == {"ok": True}
+    finally:
+        fastapi_app.dependency_overrides[get_db] = plain_get_db
+        del fastapi_app.dependency_overrides[get_current_user]
@@ -0,0 +1,52 @@
+import gzip
+import os
+
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from app.core.static_files import CachedStaticFiles, StatCache, cache_control_for, precompress_directory
+from app.main import FRONTEND_INDEX
+
+
+def test_store_serves_precompressed_html_with_revalidation(client: TestClient):
+    # lifespan wygenerował index.html.gz obok pliku
+    assert os.path.exists(f"{FRONTEND_INDEX}.gz")
+
+    r = client.get("/store", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["cache-control"] == "no-cache"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.headers["content-type"].startswith("text/html")
+    assert r.content == FRONTEND_INDEX.read_bytes()
+
+    r = client.get("/store", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert int(r.headers["content-length"]) == FRONTEND_INDEX.stat().st_size
+
+    etag = r.headers["etag"]
+    assert client.get("/store", headers={"If-None-Match": etag, "Accept-Encoding": "identity"}).status_code == 304
+
+
+def test_hashed_assets_are_immutable_and_stats_cached(tmp_path, monkeypatch):
+    sha = "ab" * 32
+    assert cache_control_for(f"/x/{sha}.jpg") == "public, max-age=31536000, immutable"
+    assert cache_control_for(f"/x/{sha}-640w.webp") == "public, max-age=31536000, immutable"
+    assert cache_control_for("/x/app.3f9a1c2b.js") == "public, max-age=31536000, immutable"
+    assert cache_control_for("/x/soft_roses_1.jpeg").startswith("public, max-age=")
+
+    (tmp_path / "app.css").write_text("body{color:red}" * 200)
+    assert precompress_directory(str(tmp_path)) >= 1
+    assert gzip.decompress((tmp_path / "app.css.gz").read_bytes()) == (tmp_path / "app.css").read_bytes()
+    assert precompress_directory(str(tmp_path)) == 0  # aktualne rodzeństwo nie jest generowane ponownie
+
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda p, *a, **kw: stats.append(p) or real_stat(p, *a, **kw))
+    static = TestClient(CachedStaticFiles(directory=str(tmp_path), stat_cache=StatCache(ttl_s=60)))
+    assert static.get("/app.css", headers={"Accept-Encoding": "gzip, br"}).headers["content-encoding"] == "gzip"
+    first = len(stats)
+    for _ in range(3):
+        r = static.get("/app.css", headers={"Accept-Encoding": "gzip, br"})
+        assert r.headers["content-encoding"] == "gzip"
+    assert len(stats) == first  # kolejne żądania (plik, brak .br, .gz) idą z cache'u stat
@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+
+from test_api_flow import client  # noqa: F401
+from test_sql_stats import CHECKOUT, request_stats, selects
+from app.main import app as fastapi_app
+from app.api import media as media_api
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.password_pool import password_hasher
+from app.db.models import UserDB
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+
+
+def _count(stats, fragment: str) -> int:
+    return sum(n for fp, n in stats.fingerprints.items() if fragment in fp)
+
+
+def test_inserts_are_not_followed_by_a_reload(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(password_hasher, "rounds", 4)
+    monkeypatch.setattr(media_api, "UPLOAD_DIR", str(tmp_path))
+
+    # id i wartości domyślne wracają z INSERT ... RETURNING, obiekt nie wygasa po commicie
+    stats = request_stats(client, "POST", "/api/products", json={"name": "Świeca", "price_pln": 1000, "stock_qty": 20})
+    assert stats.statements == 1
+
+    stats = request_stats(client, "PATCH", f"/api/products/{1}", json={"price_pln": 1200})
+    assert selects(stats) == 1  # tylko db.get przed zmianą
+
+    stats = request_stats(client, "POST", "/api/auth/register", json={"email": "rt@test.com", "password": "swieczki123"})
+    assert selects(stats) == 1  # sprawdzenie, czy email jest wolny
+    assert stats.statements == 2
+
+    stats = request_stats(client, "POST", "/api/media", files={"file": ("a.png", PNG, "image/png")})
+    assert selects(stats) == 0
+
+    client.cookies.clear()
+    stats = request_stats(client, "GET", "/api/cart")  # nowy koszyk
+    assert stats.statements == 1
+
+
+def test_cart_and_checkout_writes_skip_refresh(client: TestClient, monkeypatch):
+    fastapi_app.dependency_overrides[get_current_user] = lambda: UserDB(id=7, email="rt@test.com", is_active=True)
+    # handlery order.placed przejmuje worker outboxa - tu liczymy tylko transakcję checkoutu
+    monkeypatch.setattr(settings, "outbox_handler_worker_enabled", True)
+
+    pid = client.post("/api/products", json={"name": "Świeca", "price_pln": 1000, "stock_qty": 20}).json()["id"]
+    client.get("/api/cart")
+    for _ in range(2):  # nowa pozycja, potem zwiększenie qty
+        stats = request_stats(client, "POST", "/api/cart/items", json={"product_id": pid, "qty": 1})
+        # pozycje ładowane raz (selectin razem z koszykiem), bez przeładowania po commicie
+        assert _count(stats, "WHERE cart_items.cart_id IN") == 1
+    item = client.get("/api/cart").json()["items"][0]
+    assert item["qty"] == 2 and item["name"] == "Świeca"
+
+    stats = request_stats(client, "POST", "/api/checkout", json=CHECKOUT)
+    assert _count(stats, "FROM orders WHERE orders.id = ?") == 0
+
+    del fastapi_app.dependency_overrides[get_current_user]